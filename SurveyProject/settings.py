@@ -140,6 +140,64 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# Mặc định dùng bộ nhớ của từng process; đặt REDIS_URL để các worker gunicorn dùng chung cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'surveyform',
+    }
+}
+
+if os.getenv('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Thời gian cache payload thống kê kết quả (giây). Cache tự làm mới khi có phản hồi/câu hỏi thay đổi.
+SURVEY_STATS_CACHE_TIMEOUT = int(os.getenv('SURVEY_STATS_CACHE_TIMEOUT', 300))
+
+# Bộ đếm tổng ở trang chủ/dashboard: làm mới tối đa mỗi SITE_COUNTERS_TTL giây.
+# Trên PostgreSQL, bảng lớn hơn ngưỡng dưới đây được ước lượng từ pg_class thay vì COUNT(*).
+SITE_COUNTERS_TTL = int(os.getenv('SITE_COUNTERS_TTL', 300))
+SITE_COUNTERS_ESTIMATE_THRESHOLD = int(os.getenv('SITE_COUNTERS_ESTIMATE_THRESHOLD', 1_000_000))
+
+# Dashboard trang quản trị (/admin/): cache số liệu thống kê trong thời gian ngắn.
+ADMIN_STATS_CACHE_TIMEOUT = int(os.getenv('ADMIN_STATS_CACHE_TIMEOUT', 60))
+
+# Ảnh chụp (snapshot) câu hỏi của phiên bản đã xuất bản và đoạn HTML danh sách câu hỏi
+# trên trang làm khảo sát. Mỗi phiên bản là bất biến nên có thể cache lâu.
+SURVEY_SNAPSHOT_CACHE_TIMEOUT = int(os.getenv('SURVEY_SNAPSHOT_CACHE_TIMEOUT', 86400))
+
+# Xuất bản tĩnh: trang làm khảo sát được dựng sẵn vào STATIC_TAKE_ROOT/<id>/index.html.
+# Cấu hình proxy (nginx, ...) phục vụ thư mục này tại STATIC_TAKE_URL. Để trống STATIC_TAKE_URL
+# thì tính năng tắt và trang làm khảo sát luôn được render động (khi DEBUG có thể đặt /media/take/).
+STATIC_TAKE_ROOT = Path(os.getenv('STATIC_TAKE_ROOT', BASE_DIR / 'media' / 'take'))
+STATIC_TAKE_URL = os.getenv('STATIC_TAKE_URL', '')
+
+# Giới hạn tần suất (bộ đếm cửa sổ trượt trong cache) cho đăng nhập, đăng ký, quên mật khẩu và gửi khảo sát.
+# Ghi đè theo scope, ví dụ {'login': '5/m', 'survey_submit': '60/m'}; giá trị None để tắt scope đó.
+# Scope: register, login, login_username, password_reset, survey_view, survey_submit (theo trình duyệt),
+# survey_submit_ip (theo IP, mức cao vì cả lớp học có thể dùng chung một IP NAT).
+# Khi chạy nhiều worker cần REDIS_URL để các worker dùng chung bộ đếm.
+RATE_LIMITS = {}
+
+# Số lượt gửi khảo sát được xử lý đồng thời cho mỗi khảo sát (0 = không giới hạn).
+# Lượt vượt quá nhận phản hồi 503 "đang xếp hàng" và trình duyệt tự gửi lại sau.
+# Nên nhỏ hơn số worker gunicorn để một khảo sát "nóng" không chiếm hết worker.
+SURVEY_SUBMIT_CONCURRENCY = int(os.getenv('SURVEY_SUBMIT_CONCURRENCY', 4))
+# Token cho Prometheus đọc /metrics/admission/ (Authorization: Bearer <token>); tài khoản staff luôn xem được.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Khảo sát bật "Ghi phản hồi theo lô": số phản hồi mỗi lô khi lệnh flush_pending_responses ghi vào bảng Response.
+RESPONSE_BUFFER_BATCH_SIZE = int(os.getenv('RESPONSE_BUFFER_BATCH_SIZE', 1000))
+
+# API kiosk (/api/kiosk/): số phản hồi và dung lượng tối đa của một lần tải lên.
+KIOSK_MAX_BATCH = int(os.getenv('KIOSK_MAX_BATCH', 5000))
+KIOSK_MAX_BODY_SIZE = int(os.getenv('KIOSK_MAX_BODY_SIZE', 20 * 1024 * 1024))
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
@@ -170,6 +228,11 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 
 DEFAULT_FROM_EMAIL = 'SurveyForm <support@survey.xloc.id.vn>'
 
+# Gửi email mời (lệnh send_invitations): số email mỗi lô dùng chung một kết nối SMTP
+# và tốc độ tối đa (email/giây) để không vượt giới hạn của nhà cung cấp.
+INVITE_MAIL_BATCH_SIZE = int(os.getenv('INVITE_MAIL_BATCH_SIZE', 100))
+INVITE_MAIL_RATE = float(os.getenv('INVITE_MAIL_RATE', 10))
+
 SESSION_COOKIE_NAME = 'survey_sessionid'
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 7  # 7 ngày
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
@@ -178,6 +241,10 @@ SESSION_COOKIE_SAMESITE = 'Lax'
 # Để False cho môi trường dev localhost; bật True khi dùng HTTPS prod
 SESSION_COOKIE_SECURE = False
 
+# Trạng thái người trả lời (đã nhập mật khẩu / đã trả lời khảo sát nào) lưu trong cookie có chữ ký,
+# không dùng session nên người dùng ẩn danh không tạo bản ghi django_session.
+RESPONDENT_COOKIE_AGE = 60 * 60 * 24 * 365  # 1 năm
+
 
 LOGOUT_REDIRECT_URL = '/'
 
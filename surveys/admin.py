@@ -1,13 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.utils.html import format_html
-from django.db.models import Count
-from django.utils import timezone
-from datetime import timedelta
 import json
 
 # Chỉ import những model còn tồn tại
-from .models import Survey, Question, Response, UserProfile, SurveyCollaborator, ResponseAttachment
+from .models import Survey, Question, Response, UserProfile, SurveyCollaborator, SurveyInvite, InviteCampaign, KioskDevice, PendingResponse, ResponseAttachment
+from .admin_stats import get_admin_stats
+from .bulk import delete_responses
+from .pagination import EstimatedCountPaginator
 
 # Inline để thêm câu hỏi ngay trong trang chi tiết Khảo sát
 class QuestionInline(admin.StackedInline):
@@ -25,13 +25,61 @@ class SurveyAdmin(admin.ModelAdmin):
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     list_display = ('text', 'survey', 'question_type', 'is_required')
+    list_select_related = ('survey',)
     list_filter = ('survey', 'question_type')
     # Quiz mode is disabled in this project
     exclude = ('correct_answers', 'score')
 
+class InputFilter(admin.SimpleListFilter):
+    """Bộ lọc dạng ô nhập (template admin/input_filter.html) thay vì danh sách lựa chọn."""
+
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        # No lookups to list: the text box is always shown
+        return True
+
+    def choices(self, changelist):
+        # Only the "All" entry; its query_parts keep the other active filters in the form
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = [
+            (key, value)
+            for key, values in changelist.get_filters_params().items()
+            if key != self.parameter_name
+            for value in values
+        ]
+        yield all_choice
+
+
+class SurveyIdFilter(InputFilter):
+    """Lọc theo ID khảo sát (ô nhập) thay vì liệt kê toàn bộ khảo sát."""
+
+    title = 'khảo sát (ID)'
+    parameter_name = 'survey_id'
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(survey_id=int(value))
+        return queryset
+
+
 @admin.register(Response)
 class ResponseAdmin(admin.ModelAdmin):
     list_display = ('id', 'survey', 'respondent', 'submitted_at')
+    list_select_related = ('survey', 'respondent')
+    list_filter = (SurveyIdFilter,)
+    raw_id_fields = ('survey', 'respondent')
+    # Tuned for very large tables: no exact COUNT(*) for the unfiltered
+    # changelist, and only the primary key is sortable (index-backed).
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    ordering = ('-id',)
+    sortable_by = ('id',)
     readonly_fields = ('response_data_pretty',) # Chỉ đọc field này
     inlines = ()
 
@@ -43,6 +91,9 @@ class ResponseAdmin(admin.ModelAdmin):
 
     response_data_pretty.short_description = "Dữ liệu trả lời (Chi tiết)"
 
+    def delete_queryset(self, request, queryset):
+        delete_responses(queryset)
+
 
 class ResponseAttachmentInline(admin.TabularInline):
     model = ResponseAttachment
@@ -61,9 +112,46 @@ class UserProfileAdmin(admin.ModelAdmin):
 @admin.register(SurveyCollaborator)
 class SurveyCollaboratorAdmin(admin.ModelAdmin):
     list_display = ('survey', 'user', 'role', 'created_at')
+    list_select_related = ('survey', 'user')
     list_filter = ('role',)
+    raw_id_fields = ('survey', 'user')
     search_fields = ('survey__title', 'user__username', 'user__email')
 
+
+@admin.register(SurveyInvite)
+class SurveyInviteAdmin(admin.ModelAdmin):
+    list_display = ('email', 'survey', 'status', 'sent_at', 'responded_at')
+    list_select_related = ('survey',)
+    list_filter = (SurveyIdFilter, 'status')
+    raw_id_fields = ('survey',)
+    search_fields = ('email',)
+
+
+@admin.register(InviteCampaign)
+class InviteCampaignAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'survey', 'status', 'sent_count', 'failed_count', 'total', 'created_at')
+    list_select_related = ('survey',)
+    list_filter = ('status',)
+    raw_id_fields = ('survey', 'created_by')
+    readonly_fields = ('sent_count', 'failed_count', 'last_invite_id', 'started_at', 'finished_at')
+
+
+@admin.register(KioskDevice)
+class KioskDeviceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'survey', 'uploaded_count', 'last_used_at', 'revoked_at')
+    list_select_related = ('survey',)
+    list_filter = (SurveyIdFilter,)
+    raw_id_fields = ('survey', 'created_by')
+    readonly_fields = ('uploaded_count', 'last_used_at')
+
+
+@admin.register(PendingResponse)
+class PendingResponseAdmin(admin.ModelAdmin):
+    list_display = ('id', 'survey', 'respondent', 'submitted_at')
+    list_select_related = ('survey', 'respondent')
+    list_filter = (SurveyIdFilter,)
+    raw_id_fields = ('survey', 'revision', 'respondent')
+
 # Custom Admin Site
 from django.contrib.admin import AdminSite
 from django.urls import path
@@ -84,49 +172,17 @@ class CustomAdminSite(AdminSite):
     def custom_index(self, request):
         context = self.each_context(request)
         
-        # Get statistics
-        total_surveys = Survey.objects.count()
-        total_responses = Response.objects.count()
-        active_surveys = Survey.objects.filter(is_active=True).count()
-        inactive_surveys = Survey.objects.filter(is_active=False).count()
-        total_users = User.objects.count()
-        
-        # Surveys per month (last 6 months)
-        today = timezone.now()
-        survey_months = []
-        survey_counts = []
-        for i in range(5, -1, -1):
-            month_start = today - timedelta(days=30 * i)
-            month_name = month_start.strftime('%m/%Y')
-            count = Survey.objects.filter(
-                created_at__year=month_start.year,
-                created_at__month=month_start.month
-            ).count()
-            survey_months.append(month_name)
-            survey_counts.append(count)
-        
-        # Responses per day (last 7 days)
-        response_days = []
-        response_counts = []
-        for i in range(6, -1, -1):
-            day = today - timedelta(days=i)
-            day_name = day.strftime('%d/%m')
-            count = Response.objects.filter(
-                submitted_at__date=day.date()
-            ).count()
-            response_days.append(day_name)
-            response_counts.append(count)
-        
+        stats = get_admin_stats()
         context.update({
-            'total_surveys': total_surveys,
-            'total_responses': total_responses,
-            'active_surveys': active_surveys,
-            'inactive_surveys': inactive_surveys,
-            'total_users': total_users,
-            'survey_months': json.dumps(survey_months),
-            'survey_counts': json.dumps(survey_counts),
-            'response_days': json.dumps(response_days),
-            'response_counts': json.dumps(response_counts),
+            'total_surveys': stats['total_surveys'],
+            'total_responses': stats['total_responses'],
+            'active_surveys': stats['active_surveys'],
+            'inactive_surveys': stats['inactive_surveys'],
+            'total_users': stats['total_users'],
+            'survey_months': json.dumps(stats['survey_months']),
+            'survey_counts': json.dumps(stats['survey_counts']),
+            'response_days': json.dumps(stats['response_days']),
+            'response_counts': json.dumps(stats['response_counts']),
         })
         
         return render(request, 'admin/index.html', context)
@@ -0,0 +1,100 @@
+"""
+Aggregates for the admin dashboard and the `get_admin_stats` template tag.
+
+Everything is computed with a few GROUP BY / conditional-aggregate queries and
+cached for ADMIN_STATS_CACHE_TIMEOUT seconds, so reloading the admin index
+does not hit the big tables again.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .counters import count_rows
+from .models import Response, Survey
+
+CACHE_KEY = "admin_stats"
+MONTHS = 6
+DAYS = 7
+RECENT_USERS = 10
+
+
+def _month_starts(today, months):
+    """First day of the last `months` calendar months, oldest first."""
+    year, month = today.year, today.month
+    starts = []
+    for _ in range(months):
+        starts.append(today.replace(year=year, month=month, day=1))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return list(reversed(starts))
+
+
+def compute_admin_stats(now=None):
+    now = timezone.localtime(now or timezone.now())
+    tz = timezone.get_current_timezone()
+    today = now.date()
+
+    surveys = Survey.objects.order_by().aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        inactive=Count('id', filter=Q(is_active=False)),
+    )
+    users = User.objects.order_by().aggregate(
+        total=Count('id'),
+        staff=Count('id', filter=Q(is_staff=True)),
+        superusers=Count('id', filter=Q(is_superuser=True)),
+    )
+    total_responses, _ = count_rows(Response)
+
+    months = _month_starts(today, MONTHS)
+    per_month = dict(
+        Survey.objects
+        .filter(created_at__gte=timezone.make_aware(datetime.combine(months[0], time.min)))
+        .order_by()
+        .annotate(month=TruncMonth('created_at', tzinfo=tz))
+        .values('month')
+        .annotate(n=Count('id'))
+        .values_list('month', 'n')
+    )
+    per_month = {timezone.localtime(m).date() if isinstance(m, datetime) else m: n for m, n in per_month.items()}
+
+    days = [today - timedelta(days=i) for i in range(DAYS - 1, -1, -1)]
+    per_day = dict(
+        Response.objects
+        .filter(submitted_at__gte=timezone.make_aware(datetime.combine(days[0], time.min)))
+        .order_by()
+        .annotate(day=TruncDate('submitted_at', tzinfo=tz))
+        .values('day')
+        .annotate(n=Count('id'))
+        .values_list('day', 'n')
+    )
+
+    return {
+        'total_surveys': surveys['total'],
+        'active_surveys': surveys['active'],
+        'inactive_surveys': surveys['inactive'],
+        'total_responses': total_responses,
+        'total_users': users['total'],
+        'total_staff': users['staff'],
+        'total_superusers': users['superusers'],
+        'recent_users': list(User.objects.order_by('-date_joined')[:RECENT_USERS]),
+        'survey_months': [m.strftime('%m/%Y') for m in months],
+        'survey_counts': [per_month.get(m, 0) for m in months],
+        'response_days': [d.strftime('%d/%m') for d in days],
+        'response_counts': [per_day.get(d, 0) for d in days],
+    }
+
+
+def get_admin_stats():
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_admin_stats()
+        cache.set(CACHE_KEY, stats, timeout=getattr(settings, 'ADMIN_STATS_CACHE_TIMEOUT', 60))
+    return stats
@@ -0,0 +1,144 @@
+"""
+Per-survey admission control for submissions.
+
+At most SURVEY_SUBMIT_CONCURRENCY submissions of the same survey are
+processed at once; the counter lives in the cache (incr/decr are atomic on
+Redis), so a hot survey cannot tie up every worker on row locks and captcha
+calls. Excess submissions are answered immediately with a light 503
+"queued, retrying" response: JSON for the static page's fetch, otherwise a
+small page that re-posts the answers itself after a backoff.
+
+Waiting clients are counted per WAIT_WINDOW seconds and exported, together
+with the in-flight count, by the `admission_metrics` view. Counters are
+per-process with the default local-memory cache: set REDIS_URL in production.
+"""
+
+import math
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+
+SLOTS_KEY = "admission:{}:slots"
+WAITING_KEY = "admission:{}:waiting:{}"
+ACTIVE_KEY = "admission:active"
+# A slot leaked by a killed worker is forgotten after this long without traffic
+SLOTS_TIMEOUT = 120
+WAIT_WINDOW = 10
+# Surveys stay listed in the metrics this long after their last submission
+ACTIVE_TTL = 300
+
+
+def concurrency_limit():
+    return getattr(settings, 'SURVEY_SUBMIT_CONCURRENCY', 4)
+
+
+def _window(now):
+    return int(now // WAIT_WINDOW)
+
+
+def _remember_active(survey_id, now):
+    # Rewritten at most every few seconds per survey; lost updates only affect the metrics list
+    active = cache.get(ACTIVE_KEY) or {}
+    if now - active.get(survey_id, 0) > WAIT_WINDOW:
+        active = {pk: ts for pk, ts in active.items() if now - ts < ACTIVE_TTL}
+        active[survey_id] = now
+        cache.set(ACTIVE_KEY, active, timeout=ACTIVE_TTL)
+
+
+def acquire(survey_id, now=None):
+    """Take a processing slot; returns False when the survey is at its concurrency limit."""
+    now = time.time() if now is None else now
+    key = SLOTS_KEY.format(survey_id)
+    cache.add(key, 0, timeout=SLOTS_TIMEOUT)
+    try:
+        in_flight = cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, timeout=SLOTS_TIMEOUT)
+        in_flight = 1
+    cache.touch(key, SLOTS_TIMEOUT)
+    _remember_active(survey_id, now)
+
+    if in_flight <= concurrency_limit():
+        return True
+    release(survey_id)
+    waiting_key = WAITING_KEY.format(survey_id, _window(now))
+    cache.add(waiting_key, 0, timeout=WAIT_WINDOW * 3)
+    try:
+        cache.incr(waiting_key)
+    except ValueError:
+        pass
+    return False
+
+
+def release(survey_id):
+    try:
+        cache.decr(SLOTS_KEY.format(survey_id))
+    except ValueError:
+        pass
+
+
+def queue_depth(survey_id, now=None):
+    """Submissions turned away in the current or previous window: roughly how many clients are backing off."""
+    now = time.time() if now is None else now
+    window = _window(now)
+    counts = cache.get_many([WAITING_KEY.format(survey_id, w) for w in (window, window - 1)])
+    return max(counts.values(), default=0)
+
+
+def retry_after(survey_id, now=None):
+    """Suggested wait in seconds: grows with the queue, with jitter so retries spread out."""
+    base = 1 + queue_depth(survey_id, now) / max(concurrency_limit(), 1)
+    return min(30, math.ceil(base + random.random() * base))
+
+
+def snapshot(now=None):
+    """{survey_id: (in_flight, queue_depth)} for surveys with recent submissions."""
+    now = time.time() if now is None else now
+    active = cache.get(ACTIVE_KEY) or {}
+    survey_ids = sorted(pk for pk, ts in active.items() if now - ts < ACTIVE_TTL)
+    slots = cache.get_many([SLOTS_KEY.format(pk) for pk in survey_ids])
+    return {
+        pk: (max(slots.get(SLOTS_KEY.format(pk), 0), 0), queue_depth(pk, now))
+        for pk in survey_ids
+    }
+
+
+def _queued_response(request, survey_id):
+    wait = retry_after(survey_id)
+    message = 'Khảo sát đang có nhiều người gửi cùng lúc. Câu trả lời của bạn sẽ được gửi lại tự động.'
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        response = JsonResponse({'success': False, 'queued': True, 'error': message, 'retry_after': wait}, status=503)
+    else:
+        # Re-post the same answers after the backoff; uploads cannot be carried over
+        fields = [(name, value) for name in request.POST for value in request.POST.getlist(name)]
+        response = HttpResponse(render_to_string('errors/queued.html', {
+            'message': message,
+            'retry_after': wait,
+            'action': request.get_full_path(),
+            'fields': fields,
+            'has_files': bool(request.FILES),
+        }), status=503)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def admission_control(view):
+    """Limit concurrent POSTs per survey (the `pk` URL argument); other methods pass through."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        survey_id = kwargs.get('pk')
+        if request.method != 'POST' or survey_id is None or not concurrency_limit():
+            return view(request, *args, **kwargs)
+        if not acquire(survey_id):
+            return _queued_response(request, survey_id)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            release(survey_id)
+    return wrapper
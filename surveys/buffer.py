@@ -0,0 +1,118 @@
+"""
+Write-behind submissions for surveys with `buffer_responses` enabled.
+
+The take view validates the answers and appends one narrow row to the
+`PendingResponse` staging table (no signals, no counter update on the survey
+row, no term counting), so a burst of submissions is not serialized on the
+survey's row lock. `flush_pending` (the `flush_pending_responses` command)
+moves the staged rows into `Response` with `bulk_create` in large batches and
+applies the counters and term counts once per batch.
+
+Uploads need a Response to attach to, so submissions with files are always
+written directly. Until they are flushed, buffered submissions count towards
+`max_responses` through `is_full`.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .bulk import insert_responses
+from .models import PendingResponse, Question, Response, SurveyRevision
+from .revisions import revision_questions
+
+
+def _batch_size():
+    return getattr(settings, 'RESPONSE_BUFFER_BATCH_SIZE', 1000)
+
+
+def buffer_response(survey, snapshot, respondent, ip_address, response_data):
+    return PendingResponse.objects.create(
+        survey=survey,
+        revision_id=snapshot.revision_id,
+        respondent=respondent,
+        ip_address=ip_address,
+        response_data=response_data,
+    )
+
+
+def has_pending(survey, user, ip_address):
+    """One-response-only check for answers that are still waiting in the buffer."""
+    pending = PendingResponse.objects.filter(survey=survey)
+    if user.is_authenticated:
+        return pending.filter(respondent=user).exists()
+    return pending.filter(respondent__isnull=True, ip_address=ip_address).exists()
+
+
+def pending_count(survey):
+    """Buffered submissions not flushed yet (always 0 for surveys that do not buffer)."""
+    if not survey.buffer_responses:
+        return 0
+    return PendingResponse.objects.filter(survey=survey).count()
+
+
+def is_full(survey):
+    """max_responses check that also counts the submissions still in the buffer."""
+    if not survey.max_responses:
+        return False
+    if survey.response_count >= survey.max_responses:
+        return True
+    return survey.response_count + pending_count(survey) >= survey.max_responses
+
+
+def _questions(survey_id, revision):
+    if revision is not None:
+        return revision_questions(revision)
+    return list(Question.objects.filter(survey_id=survey_id))
+
+
+def flush_batch(batch_size=None):
+    """Move up to `batch_size` staged submissions into Response; returns how many were moved."""
+    with transaction.atomic():
+        # skip_locked lets several flushers run side by side on PostgreSQL
+        batch = list(
+            PendingResponse.objects.select_for_update(skip_locked=True)
+            .order_by('pk')[:batch_size or _batch_size()]
+        )
+        if not batch:
+            return 0
+
+        groups = defaultdict(list)
+        for pending in batch:
+            groups[(pending.survey_id, pending.revision_id)].append(pending)
+        revisions = SurveyRevision.objects.in_bulk({rid for _, rid in groups if rid})
+
+        for (survey_id, revision_id), rows in groups.items():
+            insert_responses(
+                survey_id,
+                [
+                    Response(
+                        survey_id=survey_id,
+                        revision_id=revision_id,
+                        respondent_id=row.respondent_id,
+                        ip_address=row.ip_address,
+                        response_data=row.response_data,
+                        submitted_at=row.submitted_at,
+                    )
+                    for row in rows
+                ],
+                _questions(survey_id, revisions.get(revision_id)),
+            )
+        PendingResponse.objects.filter(pk__in=[p.pk for p in batch]).delete()
+    return len(batch)
+
+
+def flush_pending(batch_size=None, limit=None, log=None):
+    """Flush batches until the buffer is empty (or `limit` rows were moved)."""
+    batch_size = batch_size or _batch_size()
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        count = flush_batch(size)
+        if not count:
+            break
+        moved += count
+        if log:
+            log(f"Đã ghi {moved} phản hồi")
+    return moved
@@ -0,0 +1,426 @@
+"""
+Survey definition (questions + options) serialization, batched edits and
+portable JSON templates.
+
+The builder can send an ordered list of operations — the same ones exposed
+one-by-one in `views/api.py` — which are applied in memory and written back in
+a single transaction with bulk_create / bulk_update / one DELETE. Templates
+(export, import, clone) are likewise created with a single bulk_create.
+"""
+
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import Question, Survey, SurveyCollaborator
+
+MAX_OPERATIONS = 500
+
+QUESTION_TYPES = {value for value, _ in Question.QUESTION_TYPES}
+
+# Fields written by bulk_update for edited questions
+UPDATE_FIELDS = ['text', 'question_type', 'order', 'is_required', 'subtitle', 'media_url', 'options', 'correct_answers']
+
+
+class BatchError(Exception):
+    def __init__(self, message, index=None):
+        super().__init__(message)
+        self.index = index
+
+
+class RevisionConflict(Exception):
+    """The client edited an older revision than the one stored (If-Match failed)."""
+
+    def __init__(self, revision):
+        super().__init__(f'Khảo sát đã được cập nhật (phiên bản {revision})')
+        self.revision = revision
+
+
+def definition_etag(survey_id, revision):
+    return f'"survey-{survey_id}-r{revision}"'
+
+
+def current_revision(survey_id):
+    return Survey.objects.values_list('revision', flat=True).get(pk=survey_id)
+
+
+def check_revision(survey_id, etags):
+    """
+    Lock the survey row and compare its revision with the If-Match ETags.
+
+    Must run inside a transaction so that no other write can slip in between
+    the check and the caller's own changes.
+    """
+    revision = Survey.objects.select_for_update().values_list('revision', flat=True).get(pk=survey_id)
+    if '*' not in etags and definition_etag(survey_id, revision) not in etags:
+        raise RevisionConflict(revision)
+    return revision
+
+
+def question_payload(question):
+    return {
+        'id': question.id,
+        'text': question.text,
+        'question_type': question.question_type,
+        'is_required': question.is_required,
+        'order': question.order,
+        'options': question.options or [],
+        'subtitle': question.subtitle,
+        'media_url': question.media_url,
+    }
+
+
+def survey_definition(survey, questions=None):
+    """JSON-serializable structure of a survey: settings and ordered questions."""
+    if questions is None:
+        questions = survey.questions.all().order_by('order', 'pk')
+    return {
+        'id': survey.pk,
+        'revision': survey.revision,
+        'title': survey.title,
+        'description': survey.description,
+        'header_image': survey.header_image.url if survey.header_image else None,
+        'starts_at': survey.starts_at.isoformat() if survey.starts_at else None,
+        'expires_at': survey.expires_at.isoformat() if survey.expires_at else None,
+        'max_responses': survey.max_responses,
+        'allow_review_response': survey.allow_review_response,
+        'send_confirmation_email': survey.send_confirmation_email,
+        'one_response_only': survey.one_response_only,
+        'questions': [question_payload(q) for q in questions],
+    }
+
+
+def _clean_options(values):
+    if not isinstance(values, list):
+        raise BatchError('Danh sách lựa chọn không hợp lệ')
+    return [opt.strip() for opt in values if isinstance(opt, str) and opt.strip()]
+
+
+def _set_fields(question, op):
+    if 'text' in op:
+        question.text = str(op['text'] or '')
+    if 'question_type' in op:
+        if op['question_type'] not in QUESTION_TYPES:
+            raise BatchError('Loại câu hỏi không hợp lệ')
+        question.question_type = op['question_type']
+    if 'order' in op:
+        try:
+            question.order = int(op['order'])
+        except (TypeError, ValueError):
+            raise BatchError('Thứ tự không hợp lệ')
+    if 'is_required' in op:
+        question.is_required = bool(op['is_required'])
+    if 'subtitle' in op:
+        question.subtitle = str(op['subtitle'] or '')
+    if 'media_url' in op:
+        question.media_url = str(op['media_url'] or '')
+    if 'choices' in op or 'options' in op:
+        question.options = _clean_options(op.get('choices') or op.get('options') or [])
+
+
+def parse_orders(orders):
+    """[{'id': 3, 'order': 1}, ...] -> {3: 1, ...}; raises BatchError if malformed."""
+    if not isinstance(orders, list):
+        raise BatchError('Danh sách thứ tự không hợp lệ')
+    parsed = {}
+    for item in orders:
+        try:
+            parsed[int(item['id'])] = int(item['order'])
+        except (KeyError, TypeError, ValueError):
+            raise BatchError('Danh sách thứ tự không hợp lệ')
+    return parsed
+
+
+def reorder_questions(survey, orders):
+    """
+    Set the order of several questions with one UPDATE ... CASE WHEN statement.
+
+    Every id must belong to `survey`, otherwise nothing is written.
+    """
+    orders = parse_orders(orders)
+    if not orders:
+        return 0
+    with transaction.atomic():
+        questions = list(
+            Question.objects.select_for_update()
+            .filter(survey=survey, pk__in=orders)
+            .only('id', 'order')
+            .order_by('pk')
+        )
+        if len(questions) != len(orders):
+            raise BatchError('Có câu hỏi không thuộc khảo sát này')
+        for question in questions:
+            question.order = orders[question.pk]
+        updated = Question.objects.bulk_update(questions, ['order'])
+        Survey.bump_revision(survey.pk)
+        return updated
+
+
+class _Batch:
+    def __init__(self, survey):
+        self.survey = survey
+        self.existing = {q.pk: q for q in survey.questions.select_for_update().order_by('pk')}
+        self.next_order = len(self.existing) + 1
+        self.created = []
+        self.refs = {}
+        self.changed = set()
+        self.deleted = set()
+
+    def resolve(self, ref):
+        """An existing question id of this survey, or the `ref` of a question added earlier in the batch."""
+        if isinstance(ref, str) and ref in self.refs:
+            return self.refs[ref]
+        try:
+            pk = int(ref)
+        except (TypeError, ValueError):
+            raise BatchError('Câu hỏi không tồn tại')
+        question = self.existing.get(pk)
+        if question is None:
+            raise BatchError('Câu hỏi không tồn tại')
+        return question
+
+    def touch(self, question):
+        if question.pk is not None:
+            self.changed.add(question.pk)
+
+    def question_add(self, op):
+        question = Question(
+            survey=self.survey,
+            text='',
+            question_type='single',
+            order=self.next_order,
+            is_required=True,
+        )
+        _set_fields(question, op)
+        question.options = question.options or []
+        self.next_order = max(self.next_order, question.order) + 1
+        self.created.append(question)
+        if op.get('ref') is not None:
+            self.refs[str(op['ref'])] = question
+        return {'ref': op.get('ref'), 'question': question}
+
+    def question_update(self, op):
+        question = self.resolve(op.get('id'))
+        _set_fields(question, op)
+        if getattr(question, 'correct_answers', None):
+            question.correct_answers = []
+        self.touch(question)
+        return {'question': question}
+
+    def question_delete(self, op):
+        question = self.resolve(op.get('id'))
+        if question.pk is None:
+            self.created.remove(question)
+            self.refs = {k: q for k, q in self.refs.items() if q is not question}
+        else:
+            del self.existing[question.pk]
+            self.changed.discard(question.pk)
+            self.deleted.add(question.pk)
+        return {}
+
+    def question_reorder(self, op):
+        orders = op.get('orders')
+        if not isinstance(orders, list):
+            raise BatchError('Danh sách thứ tự không hợp lệ')
+        for item in orders:
+            if not isinstance(item, dict):
+                raise BatchError('Danh sách thứ tự không hợp lệ')
+            question = self.resolve(item.get('id'))
+            _set_fields(question, {'order': item.get('order')})
+            self.touch(question)
+        return {}
+
+    def choice_add(self, op):
+        question = self.resolve(op.get('question'))
+        option_text = str(op.get('text') or '').strip()
+        if not option_text:
+            raise BatchError('Vui lòng nhập nội dung lựa chọn!')
+        if question.options is None:
+            question.options = []
+        question.options.append(option_text)
+        self.touch(question)
+        return {'index': len(question.options) - 1}
+
+    def choice_delete(self, op):
+        question = self.resolve(op.get('question'))
+        if not isinstance(question.options, list) or not question.options:
+            raise BatchError('Không có lựa chọn nào')
+        try:
+            index = int(op.get('index'))
+        except (TypeError, ValueError):
+            raise BatchError('Index không hợp lệ')
+        if not 0 <= index < len(question.options):
+            raise BatchError('Index không hợp lệ')
+        removed = question.options.pop(index)
+        self.touch(question)
+        return {'removed_option': removed}
+
+    def save(self):
+        if self.deleted:
+            Question.objects.filter(survey=self.survey, pk__in=self.deleted).delete()
+        if self.created:
+            Question.objects.bulk_create(self.created)
+        changed = [self.existing[pk] for pk in sorted(self.changed)]
+        if changed:
+            Question.objects.bulk_update(changed, UPDATE_FIELDS)
+
+        if self.deleted or self.created or changed:
+            # bulk_create / bulk_update (and batch deletes, see models) do not
+            # send the signals that bump the revision and invalidate cached stats
+            from .stats import invalidate_survey_stats
+
+            survey_id = self.survey.pk
+            Survey.bump_revision(survey_id)
+            transaction.on_commit(lambda: invalidate_survey_stats(survey_id))
+
+    def questions(self):
+        return sorted([*self.existing.values(), *self.created], key=lambda q: (q.order, q.pk))
+
+
+OPERATIONS = ('question_add', 'question_update', 'question_delete', 'question_reorder', 'choice_add', 'choice_delete')
+
+
+def apply_operations(survey, operations):
+    """
+    Apply [{'op': 'question_update', 'id': 3, 'text': '...'}, ...] in order.
+
+    Added questions may carry a client `ref` that later operations use in
+    place of an id. Returns (per-operation results, final ordered questions);
+    raises BatchError (with the failing index) and rolls back on any error.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('Danh sách thao tác không hợp lệ')
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f'Tối đa {MAX_OPERATIONS} thao tác mỗi lần')
+
+    with transaction.atomic():
+        batch = _Batch(survey)
+        results = []
+        for index, op in enumerate(operations):
+            name = op.get('op') if isinstance(op, dict) else None
+            if name not in OPERATIONS:
+                raise BatchError('Thao tác không hợp lệ', index)
+            try:
+                results.append({'op': name, **getattr(batch, name)(op)})
+            except BatchError as e:
+                raise BatchError(str(e), index)
+        batch.save()
+
+    for result in results:
+        # ids of added questions are only known after bulk_create
+        question = result.pop('question', None)
+        if question is not None:
+            result['id'] = question.pk
+    return results, batch.questions()
+
+
+# Survey templates: portable JSON definitions used for export/import and cloning
+TEMPLATE_FORMAT = 'surveyform.survey'
+TEMPLATE_VERSION = 1
+MAX_TEMPLATE_QUESTIONS = 2000
+
+# Settings carried by a template (password and invite list are never exported)
+TEMPLATE_SETTINGS = (
+    'description', 'max_responses', 'allow_review_response',
+    'send_confirmation_email', 'one_response_only',
+)
+
+
+def export_definition(survey, questions=None):
+    if questions is None:
+        questions = survey.questions.all().order_by('order', 'pk')
+    return {
+        'format': TEMPLATE_FORMAT,
+        'version': TEMPLATE_VERSION,
+        'survey': {
+            'title': survey.title,
+            **{name: getattr(survey, name) for name in TEMPLATE_SETTINGS},
+        },
+        'questions': [
+            {
+                'text': q.text,
+                'question_type': q.question_type,
+                'order': q.order,
+                'is_required': q.is_required,
+                'subtitle': q.subtitle,
+                'media_url': q.media_url,
+                'options': q.options or [],
+            }
+            for q in questions
+        ],
+    }
+
+
+def _template_survey(data, creator, title):
+    settings = data.get('survey')
+    if not isinstance(settings, dict):
+        raise BatchError('Thiếu thông tin khảo sát')
+
+    survey = Survey(
+        creator=creator,
+        title=str(title or settings.get('title') or 'Khảo sát không tên')[:200],
+        description=str(settings.get('description') or ''),
+        is_active=False,
+        is_quiz=False,
+    )
+    max_responses = settings.get('max_responses')
+    if max_responses is not None:
+        if not isinstance(max_responses, int) or max_responses < 1:
+            raise BatchError('Giới hạn số phản hồi không hợp lệ')
+        survey.max_responses = max_responses
+    for name in ('allow_review_response', 'send_confirmation_email', 'one_response_only'):
+        if name in settings:
+            setattr(survey, name, bool(settings[name]))
+    # A template never points at stored files (header_image is ignored): any
+    # path would do, including another user's uploads
+    return survey
+
+
+def import_definition(data, creator, title=None):
+    """
+    Create a draft survey owned by `creator` from an `export_definition`
+    payload, with all questions in one bulk_create. Raises BatchError.
+    """
+    if not isinstance(data, dict) or data.get('format') != TEMPLATE_FORMAT:
+        raise BatchError('Không phải file mẫu khảo sát hợp lệ')
+    if data.get('version') != TEMPLATE_VERSION:
+        raise BatchError('Phiên bản file mẫu không được hỗ trợ')
+    items = data.get('questions')
+    if not isinstance(items, list):
+        raise BatchError('Danh sách câu hỏi không hợp lệ')
+    if len(items) > MAX_TEMPLATE_QUESTIONS:
+        raise BatchError(f'Tối đa {MAX_TEMPLATE_QUESTIONS} câu hỏi')
+
+    survey = _template_survey(data, creator, title)
+    questions = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise BatchError('Câu hỏi không hợp lệ', index)
+        question = Question(survey=survey, text='', question_type='single', order=index + 1, is_required=True)
+        try:
+            _set_fields(question, item)
+        except BatchError as e:
+            raise BatchError(str(e), index)
+        question.options = question.options or []
+        questions.append(question)
+
+    with transaction.atomic():
+        survey.save()
+        SurveyCollaborator.objects.create(survey=survey, user=creator, role=SurveyCollaborator.ROLE_OWNER)
+        for question in questions:
+            question.survey = survey
+        Question.objects.bulk_create(questions, batch_size=500)
+    return survey
+
+
+def clone_survey(survey, creator):
+    """Copy a survey's settings, questions and header image into a new draft owned by `creator`."""
+    clone = import_definition(export_definition(survey), creator, title=f'{survey.title} (bản sao)')
+    if survey.header_image and default_storage.exists(survey.header_image.name):
+        # The clone gets its own copy, so deleting either survey's image leaves the other intact
+        with survey.header_image.open('rb') as source:
+            clone.header_image.save(os.path.basename(survey.header_image.name), File(source), save=False)
+        Survey.objects.filter(pk=clone.pk).update(header_image=clone.header_image.name)
+    return clone
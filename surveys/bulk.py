@@ -0,0 +1,71 @@
+"""
+Insert many responses at once.
+
+`Response.objects.create` fires post_save for every row: a response_count
+UPDATE on the (hot) survey row, a stats cache bump and a term-count update.
+`insert_responses` writes a whole batch with `bulk_create` and then applies
+those side effects once per batch. Used by the write-behind buffer, the kiosk
+upload API and the CSV import command.
+
+Deletes are the mirror image: a queryset delete skips the per-row receivers
+and `delete_responses` recounts, rebuilds and invalidates once per survey.
+"""
+
+from django.db import transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .counters import recount_survey_responses
+from .models import Response, Survey
+from .stats import invalidate_survey_stats
+from .terms import rebuild_survey_terms, record_responses_terms
+from .timeline import invalidate_timeline, is_backdated
+
+BATCH_SIZE = 1000
+
+
+def insert_responses(survey_id, responses, questions, batch_size=BATCH_SIZE):
+    """
+    bulk_create unsaved `Response` objects of one survey (answered against
+    `questions`) and update the counters and caches the signals would have.
+    Call inside a transaction.
+    """
+    if not responses:
+        return []
+    Response.objects.bulk_create(responses, batch_size=batch_size)
+    Survey.objects.filter(pk=survey_id).update(response_count=F('response_count') + len(responses))
+    record_responses_terms(questions, [r.response_data for r in responses])
+
+    oldest = min(r.submitted_at for r in responses)
+    if is_backdated(oldest, timezone.now()):
+        invalidate_timeline(survey_id, since=oldest)
+    transaction.on_commit(lambda: invalidate_survey_stats(survey_id))
+    return responses
+
+
+def delete_responses(responses):
+    """
+    Delete a `Response` queryset (possibly spanning surveys) and fix the
+    response counts, term counts and stored timeline buckets once per survey.
+    Returns the number of deleted responses.
+    """
+    with transaction.atomic():
+        oldest = dict(
+            responses.order_by().values('survey_id').annotate(oldest=Min('submitted_at'))
+            .values_list('survey_id', 'oldest')
+        )
+        if not oldest:
+            return 0
+        deleted = responses.delete()[1].get(Response._meta.label, 0)
+
+        recount_survey_responses(list(oldest))
+        for survey in Survey.objects.filter(pk__in=oldest):
+            rebuild_survey_terms(survey)
+            invalidate_timeline(survey.pk, since=oldest[survey.pk])
+
+        def invalidate():
+            for survey_id in oldest:
+                invalidate_survey_stats(survey_id)
+
+        transaction.on_commit(invalidate)
+    return deleted
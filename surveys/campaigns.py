@@ -0,0 +1,222 @@
+"""
+Invitation campaigns: email the survey link to every pending invite.
+
+Messages are rendered from templates compiled once per run and sent in
+batches over a single SMTP connection (`send_messages`), throttled to
+INVITE_MAIL_RATE messages per second. Progress is committed after every
+batch (invite statuses plus the campaign's `last_invite_id` cursor), so an
+interrupted run resumes where it stopped; at worst the messages of the batch
+in flight are sent again. A lease on the campaign row, taken with a
+conditional UPDATE and extended after every batch, keeps two runs (on any
+host) from sending the same campaign.
+"""
+
+import time
+import uuid
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import InviteCampaign, SurveyInvite
+from .tokens import make_invite_token, make_survey_token
+
+# Extended after every batch, so it only runs out when the sender has died
+LOCK_TIMEOUT = 15 * 60
+
+
+def _batch_size():
+    return getattr(settings, 'INVITE_MAIL_BATCH_SIZE', 100)
+
+
+def _rate():
+    return getattr(settings, 'INVITE_MAIL_RATE', 10)
+
+
+def create_campaign(survey, user, subject, message, base_url, retry_failed=False):
+    """Queue a campaign for the survey's pending invites (optionally re-queueing failed ones)."""
+    if retry_failed:
+        SurveyInvite.objects.filter(survey=survey, status=SurveyInvite.STATUS_FAILED).update(
+            status=SurveyInvite.STATUS_PENDING
+        )
+    return InviteCampaign.objects.create(
+        survey=survey,
+        created_by=user,
+        subject=subject,
+        message=message,
+        base_url=base_url.rstrip('/'),
+        total=SurveyInvite.objects.filter(survey=survey, status=SurveyInvite.STATUS_PENDING).count(),
+    )
+
+
+def invite_link(base_url, survey_id, invite_id):
+    """Personal link: the public survey token plus a signed invite id."""
+    path = reverse('surveys:survey_take_token', args=[make_survey_token(survey_id)])
+    return f"{base_url}{path}?{urlencode({'invite': make_invite_token(invite_id)})}"
+
+
+class _Renderer:
+    """Templates are loaded (compiled) once; only the per-recipient context changes."""
+
+    def __init__(self, campaign):
+        self.campaign = campaign
+        self.html = get_template('surveys/email/survey_invitation.html')
+        self.text = get_template('surveys/email/survey_invitation.txt')
+        self.base_context = {
+            'survey': campaign.survey,
+            'message': campaign.message,
+        }
+
+    def build(self, invite, connection):
+        context = {
+            **self.base_context,
+            'email': invite.email,
+            'link': invite_link(self.campaign.base_url, self.campaign.survey_id, invite.pk),
+        }
+        msg = EmailMultiAlternatives(
+            subject=self.campaign.subject,
+            body=self.text.render(context),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[invite.email],
+            connection=connection,
+        )
+        msg.attach_alternative(self.html.render(context), 'text/html')
+        return msg
+
+
+def _claim(campaign, owner, renew=False):
+    """
+    Take the campaign's lease (or, with `renew`, extend the one this run
+    holds) in a single conditional UPDATE; False when another run holds it.
+    """
+    now = timezone.now()
+    campaigns = InviteCampaign.objects.filter(pk=campaign.pk)
+    if renew:
+        campaigns = campaigns.filter(locked_by=owner)
+    else:
+        campaigns = campaigns.filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now)).exclude(
+            status=InviteCampaign.STATUS_DONE
+        )
+    return bool(campaigns.update(locked_by=owner, locked_until=now + timedelta(seconds=LOCK_TIMEOUT)))
+
+
+def _release(campaign, owner):
+    InviteCampaign.objects.filter(pk=campaign.pk, locked_by=owner).update(locked_by='', locked_until=None)
+
+
+def _send_batch(connection, messages):
+    """
+    Send a batch one message at a time over the open connection, so a rejected
+    recipient neither hides nor repeats the messages already delivered. After a
+    failure the connection is reopened; if that fails too, the rest of the
+    batch is left pending and the error is returned as `aborted`.
+    """
+    sent, failed, error, aborted = [], [], '', None
+    for invite_id, msg in messages:
+        try:
+            if connection.send_messages([msg]):
+                sent.append(invite_id)
+                continue
+            exc = 'không gửi được'
+        except Exception as send_exc:
+            exc = send_exc
+        failed.append(invite_id)
+        error = f"{msg.to[0]}: {exc}"
+        try:
+            connection.close()
+            connection.open()
+        except Exception as open_exc:
+            aborted = open_exc
+            break
+    return sent, failed, error, aborted
+
+
+def send_campaign(campaign, batch_size=None, rate=None, limit=None, log=None):
+    """
+    Send (or resume) a campaign. Returns the number of messages handled in
+    this run; `limit` stops early so a cron job can spread a large campaign.
+    """
+    batch_size = batch_size or _batch_size()
+    rate = _rate() if rate is None else rate
+    owner = uuid.uuid4().hex
+    if not _claim(campaign, owner):
+        if log:
+            log(f"Đợt #{campaign.pk} đang được gửi bởi tiến trình khác, bỏ qua.")
+        return 0
+    # Resume from the cursor and counters the previous run committed
+    campaign.refresh_from_db()
+
+    handled = 0
+    connection = get_connection()
+    try:
+        renderer = _Renderer(campaign)
+        InviteCampaign.objects.filter(pk=campaign.pk).update(
+            status=InviteCampaign.STATUS_RUNNING,
+            started_at=campaign.started_at or timezone.now(),
+        )
+        connection.open()
+
+        while limit is None or handled < limit:
+            size = batch_size if limit is None else min(batch_size, limit - handled)
+            invites = list(
+                SurveyInvite.objects.filter(
+                    survey_id=campaign.survey_id,
+                    status=SurveyInvite.STATUS_PENDING,
+                    pk__gt=campaign.last_invite_id,
+                )
+                .order_by('pk')
+                .only('pk', 'email')[:size]
+            )
+            if not invites:
+                campaign.status = InviteCampaign.STATUS_DONE
+                campaign.finished_at = timezone.now()
+                campaign.save(update_fields=['status', 'finished_at'])
+                break
+
+            started = time.monotonic()
+            messages = [(invite.pk, renderer.build(invite, connection)) for invite in invites]
+            sent, failed, error, aborted = _send_batch(connection, messages)
+
+            now = timezone.now()
+            if sent:
+                SurveyInvite.objects.filter(pk__in=sent).update(status=SurveyInvite.STATUS_SENT, sent_at=now)
+            if failed:
+                SurveyInvite.objects.filter(pk__in=failed).update(status=SurveyInvite.STATUS_FAILED)
+            campaign.sent_count += len(sent)
+            campaign.failed_count += len(failed)
+            handled_ids = sent + failed
+            if handled_ids:
+                campaign.last_invite_id = max(handled_ids)
+            if error:
+                campaign.last_error = error[:1000]
+            campaign.save(update_fields=['sent_count', 'failed_count', 'last_invite_id', 'last_error'])
+            handled += len(handled_ids)
+            if log:
+                log(f"Đợt #{campaign.pk}: đã gửi {campaign.sent_count}, lỗi {campaign.failed_count} / {campaign.total}")
+            if aborted is not None:
+                raise aborted
+            if not _claim(campaign, owner, renew=True):
+                # The lease ran out and was taken over: leave the rest to that run
+                if log:
+                    log(f"Đợt #{campaign.pk}: mất khóa gửi, dừng lại.")
+                break
+
+            # Throttle: a batch of n messages takes at least n / rate seconds
+            if rate:
+                pause = len(invites) / rate - (time.monotonic() - started)
+                if pause > 0:
+                    time.sleep(pause)
+    except Exception as exc:
+        campaign.status = InviteCampaign.STATUS_FAILED
+        campaign.last_error = str(exc)[:1000]
+        campaign.save(update_fields=['status', 'last_error'])
+        raise
+    finally:
+        connection.close()
+        _release(campaign, owner)
+    return handled
@@ -0,0 +1,127 @@
+"""
+Site-wide counters for the landing page and dashboard.
+
+The totals live in a single `SiteCounter` row refreshed at most every
+SITE_COUNTERS_TTL seconds (or by `manage.py refresh_site_counters` from cron)
+and are cached, so page views never run COUNT(*) over the responses table.
+On PostgreSQL, tables larger than SITE_COUNTERS_ESTIMATE_THRESHOLD rows are
+counted from the planner statistics in pg_class instead of a full scan.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Response, SiteCounter, Survey
+
+CACHE_KEY = "site_counters"
+REFRESH_LOCK_KEY = "site_counters:refreshing"
+SINGLETON_PK = 1
+
+
+def _ttl():
+    return getattr(settings, "SITE_COUNTERS_TTL", 300)
+
+
+def estimate_row_count(model):
+    """Approximate row count from pg_class, or None when unavailable."""
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 for a table that was never vacuumed/analyzed
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def count_rows(model):
+    """Return (count, is_estimate): exact for small tables, estimated for huge ones."""
+    threshold = getattr(settings, "SITE_COUNTERS_ESTIMATE_THRESHOLD", 1_000_000)
+    estimate = estimate_row_count(model)
+    if estimate is not None and estimate >= threshold:
+        return estimate, True
+    return model.objects.count(), False
+
+
+def _as_dict(counter):
+    return {
+        "total_surveys": counter.total_surveys,
+        "active_surveys": counter.active_surveys,
+        "total_responses": counter.total_responses,
+        "responses_estimated": counter.responses_estimated,
+        "refreshed_at": counter.refreshed_at,
+    }
+
+
+def refresh_site_counters():
+    """Recount everything, store the row and the cache entry."""
+    surveys = Survey.objects.filter(is_deleted=False)
+    total_responses, estimated = count_rows(Response)
+
+    counter, _ = SiteCounter.objects.update_or_create(
+        pk=SINGLETON_PK,
+        defaults={
+            "total_surveys": surveys.count(),
+            "active_surveys": surveys.filter(is_active=True).count(),
+            "total_responses": total_responses,
+            "responses_estimated": estimated,
+            "refreshed_at": timezone.now(),
+        },
+    )
+    data = _as_dict(counter)
+    cache.set(CACHE_KEY, data, timeout=_ttl())
+    return data
+
+
+def get_site_counters():
+    """
+    Cached counters. When the cache is cold the stored row is used; it is only
+    recounted if older than the TTL, and by a single request at a time.
+    """
+    data = cache.get(CACHE_KEY)
+    if data is not None:
+        return data
+
+    counter = SiteCounter.objects.filter(pk=SINGLETON_PK).first()
+    stale = (
+        counter is None
+        or counter.refreshed_at is None
+        or counter.refreshed_at < timezone.now() - timedelta(seconds=_ttl())
+    )
+    if stale and cache.add(REFRESH_LOCK_KEY, True, timeout=60):
+        try:
+            return refresh_site_counters()
+        finally:
+            cache.delete(REFRESH_LOCK_KEY)
+
+    if counter is None:
+        # Another request is refreshing; show zeros rather than wait
+        return _as_dict(SiteCounter(pk=SINGLETON_PK))
+    data = _as_dict(counter)
+    cache.set(CACHE_KEY, data, timeout=_ttl())
+    return data
+
+
+def recount_survey_responses(survey_ids=None):
+    """Resynchronize Survey.response_count with the responses table."""
+    counts = (
+        Response.objects.filter(survey_id=OuterRef("pk"))
+        .order_by()
+        .values("survey_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    surveys = Survey.objects.all()
+    if survey_ids:
+        surveys = surveys.filter(pk__in=survey_ids)
+    return surveys.update(response_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
@@ -0,0 +1,118 @@
+"""
+Survey allowlists stored as `SurveyInvite` rows.
+
+A survey with at least one invite only accepts logged-in users whose email
+is on the list. `Survey.invite_count` tells the take view whether the survey
+is restricted without a query; membership is then one lookup on the
+(survey, email) unique index. Emails are normalized to lowercase on the way
+in, so lookups never need a case-insensitive scan.
+"""
+
+import csv
+import io
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Survey, SurveyInvite
+
+BATCH_SIZE = 1000
+
+
+def normalize_email(raw):
+    """Lowercased email, or None if `raw` is not a valid address."""
+    email = (raw or '').strip().strip('<>"\'').lower()
+    if not email:
+        return None
+    try:
+        validate_email(email)
+    except ValidationError:
+        return None
+    return email
+
+
+def parse_emails(values):
+    """Normalize `values`; returns (unique valid emails in input order, number of invalid entries)."""
+    emails = {}
+    invalid = 0
+    for raw in values:
+        email = normalize_email(raw)
+        if email:
+            emails.setdefault(email, None)
+        elif (raw or '').strip():
+            invalid += 1
+    return list(emails), invalid
+
+
+def read_csv_emails(uploaded_file):
+    """
+    Email cells of an uploaded CSV: the "email" column when the header has
+    one, otherwise the first column of every row.
+    """
+    text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', errors='replace', newline='')
+    reader = csv.reader(text)
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [cell.strip().lower() for cell in first]
+    if 'email' in header:
+        column = header.index('email')
+    else:
+        column = 0
+        yield first[0] if first else ''
+    for row in reader:
+        if len(row) > column:
+            yield row[column]
+
+
+def sync_invite_count(survey_ids):
+    counts = (
+        SurveyInvite.objects.filter(survey_id=OuterRef('pk'))
+        .order_by()
+        .values('survey_id')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    Survey.objects.filter(pk__in=survey_ids).update(
+        invite_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+
+def add_invites(survey, emails):
+    """Insert already-normalized emails, skipping existing ones; returns how many were new."""
+    before = survey.invite_count
+    for start in range(0, len(emails), BATCH_SIZE):
+        SurveyInvite.objects.bulk_create(
+            [SurveyInvite(survey=survey, email=email) for email in emails[start:start + BATCH_SIZE]],
+            ignore_conflicts=True,
+        )
+    sync_invite_count([survey.pk])
+    survey.refresh_from_db(fields=['invite_count'])
+    return survey.invite_count - before
+
+
+def remove_invites(survey, invite_ids=None):
+    """Delete the given invites (all of them when `invite_ids` is None)."""
+    invites = SurveyInvite.objects.filter(survey=survey)
+    if invite_ids is not None:
+        invites = invites.filter(pk__in=invite_ids)
+    deleted, _ = invites.delete()
+    sync_invite_count([survey.pk])
+    survey.refresh_from_db(fields=['invite_count'])
+    return deleted
+
+
+def is_invited(survey, email):
+    email = normalize_email(email)
+    return bool(email) and SurveyInvite.objects.filter(survey_id=survey.pk, email=email).exists()
+
+
+def mark_responded(survey, email):
+    email = normalize_email(email)
+    if email:
+        SurveyInvite.objects.filter(survey_id=survey.pk, email=email).exclude(
+            status=SurveyInvite.STATUS_RESPONDED
+        ).update(status=SurveyInvite.STATUS_RESPONDED, responded_at=timezone.now())
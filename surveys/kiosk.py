@@ -0,0 +1,281 @@
+"""
+Offline (kiosk) submissions.
+
+A tablet registered as a `KioskDevice` downloads the compiled question set
+of its survey (`GET /api/kiosk/`), collects answers without connectivity and
+uploads them later as one JSON batch (`POST /api/kiosk/`):
+
+    {"revision": 3, "responses": [
+        {"client_id": "2f1c...", "submitted_at": "2026-05-01T09:30:00+07:00",
+         "answers": {"12": "Tốt", "13": ["A", "C"], "14": "Ý kiến"}}
+    ]}
+
+Answers use the stored values (option text; an option index is accepted
+too) and are validated against the snapshot of that revision. Each response
+carries an id generated on the device; ids already stored are reported as
+duplicates, so a batch can be re-sent safely after a dropped connection. The
+accepted responses are written with one `bulk_create` in one transaction.
+
+Uploads go through the same gates as the take page: a closed, not yet
+started, expired or full survey rejects the batch, and responses beyond
+`max_responses` are rejected one by one.
+"""
+
+import hashlib
+import secrets
+from dataclasses import asdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .buffer import is_full, pending_count
+from .bulk import insert_responses
+from .models import KioskDevice, Response, Survey, SurveyRevision
+from .revisions import get_snapshot, revision_questions
+
+# Clock drift tolerated for submitted_at values in the future
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class KioskError(Exception):
+    """The whole upload is rejected (per-response problems are reported instead)."""
+
+    status = 400
+
+
+class SurveyClosed(KioskError):
+    status = 403
+
+
+def closed_reason(survey, now=None):
+    """Why the survey does not accept responses right now (the take page's gates), or None."""
+    now = now or timezone.now()
+    if not survey.is_active or survey.is_deleted:
+        return 'Khảo sát đã đóng'
+    if survey.starts_at and survey.starts_at > now:
+        return 'Khảo sát chưa mở'
+    if survey.expires_at and survey.expires_at < now:
+        return 'Khảo sát đã hết hạn'
+    if is_full(survey):
+        return 'Khảo sát đã đạt tới giới hạn số phản hồi'
+    return None
+
+
+def max_batch():
+    return getattr(settings, 'KIOSK_MAX_BATCH', 5000)
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def create_device(survey, user, name):
+    """Register a device; returns (device, token). The token is not stored and cannot be shown again."""
+    token = secrets.token_urlsafe(32)
+    device = KioskDevice.objects.create(survey=survey, name=name, token_hash=_hash(token), created_by=user)
+    return device, token
+
+
+def authenticate(request):
+    """Device for the request's `Authorization: Bearer <token>` header, or None."""
+    header = request.headers.get('authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    return (
+        KioskDevice.objects.select_related('survey')
+        .filter(token_hash=_hash(header[7:].strip()), revoked_at__isnull=True, survey__is_deleted=False)
+        .first()
+    )
+
+
+def definition(device):
+    """Compiled question set the device should render (current revision)."""
+    snapshot = get_snapshot(device.survey)
+    return {
+        'survey': {'id': device.survey_id, 'title': device.survey.title, 'description': device.survey.description},
+        'revision': snapshot.number,
+        'questions': [asdict(q) for q in snapshot.questions],
+    }
+
+
+def _option(question, value):
+    options = question.options or []
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < len(options):
+        return options[value]
+    if isinstance(value, str) and value in options:
+        return value
+    return None
+
+
+def clean_answers(questions, answers):
+    """Validate one response's answers; returns (errors, response_data)."""
+    if not isinstance(answers, dict):
+        return ['Thiếu câu trả lời'], None
+
+    by_id = {str(q.id): q for q in questions}
+    errors = [f'Câu hỏi {qid} không thuộc khảo sát' for qid in answers if str(qid) not in by_id]
+    response_data = {}
+    for qid, question in by_id.items():
+        value = answers.get(qid)
+        if question.question_type == 'text':
+            if value is not None and not isinstance(value, str):
+                errors.append(f'Câu trả lời không hợp lệ: {question.text}')
+                continue
+            value = (value or '').strip()
+            if value:
+                response_data[qid] = value
+        elif question.question_type == 'single':
+            if value in (None, ''):
+                value = None
+            else:
+                option = _option(question, value)
+                if option is None:
+                    errors.append(f'Lựa chọn không hợp lệ: {question.text}')
+                    continue
+                response_data[qid] = value = option
+        elif question.question_type == 'multiple':
+            values = value if isinstance(value, list) else ([] if value in (None, '') else [value])
+            selected = [_option(question, v) for v in values]
+            if None in selected:
+                errors.append(f'Lựa chọn không hợp lệ: {question.text}')
+                continue
+            if selected:
+                response_data[qid] = value = selected
+            else:
+                value = None
+        elif question.question_type == 'upload':
+            if value:
+                errors.append(f'Không hỗ trợ tải tệp qua kiosk: {question.text}')
+            continue
+        else:
+            continue
+
+        if question.is_required and not value:
+            errors.append(f'Vui lòng trả lời câu hỏi: {question.text}')
+    return errors, response_data
+
+
+def _submitted_at(raw, now):
+    if raw in (None, ''):
+        return now
+    try:
+        value = parse_datetime(raw) if isinstance(raw, str) else None
+    except ValueError:
+        value = None
+    if value is None:
+        return None
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    if value > now + MAX_CLOCK_SKEW:
+        return None
+    return value
+
+
+def _insert_each(survey_id, responses, questions, duplicates):
+    """Insert one by one; responses whose client id already exists are added to `duplicates`."""
+    created = []
+    for response in responses:
+        try:
+            with transaction.atomic():
+                insert_responses(survey_id, [response], questions)
+        except IntegrityError:
+            duplicates.append(response.client_id)
+            continue
+        created.append(response)
+    return created
+
+
+def ingest(device, payload):
+    """
+    Validate and store an uploaded batch. Returns a summary dict with the
+    number created, the duplicate client ids and the rejected ones (with errors).
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get('responses'), list):
+        raise KioskError('Dữ liệu phải có danh sách "responses"')
+    items = payload['responses']
+    if len(items) > max_batch():
+        raise KioskError(f'Tối đa {max_batch()} phản hồi mỗi lần tải lên')
+
+    survey = device.survey
+    reason = closed_reason(survey)
+    if reason:
+        raise SurveyClosed(reason)
+    number = payload.get('revision')
+    if number is None:
+        snapshot = get_snapshot(survey)
+        number, revision_id, questions = snapshot.number, snapshot.revision_id, snapshot.questions
+    elif not isinstance(number, int) or isinstance(number, bool):
+        raise KioskError('Phiên bản khảo sát không hợp lệ')
+    else:
+        revision = SurveyRevision.objects.filter(survey=survey, number=number).first()
+        if revision is None:
+            raise KioskError('Phiên bản khảo sát không tồn tại')
+        revision_id, questions = revision.pk, revision_questions(revision)
+
+    now = timezone.now()
+    accepted = {}
+    duplicates, rejected = [], []
+    for item in items:
+        client_id = item.get('client_id') if isinstance(item, dict) else None
+        if not isinstance(client_id, str) or not client_id or len(client_id) > 64:
+            rejected.append({'client_id': client_id, 'errors': ['Thiếu client_id (chuỗi tối đa 64 ký tự)']})
+            continue
+        if client_id in accepted:
+            duplicates.append(client_id)
+            continue
+        errors, response_data = clean_answers(questions, item.get('answers'))
+        submitted_at = _submitted_at(item.get('submitted_at'), now)
+        if submitted_at is None:
+            errors.append('Thời gian gửi không hợp lệ')
+        if errors:
+            rejected.append({'client_id': client_id, 'errors': errors})
+            continue
+        accepted[client_id] = Response(
+            survey=survey,
+            revision_id=revision_id,
+            submitted_at=submitted_at,
+            response_data=response_data,
+            client_id=client_id,
+        )
+
+    with transaction.atomic():
+        # Serializes uploads to the survey, so the limit and the stored ids cannot change underneath
+        survey = Survey.objects.select_for_update().get(pk=survey.pk)
+        reason = closed_reason(survey, now)
+        if reason:
+            raise SurveyClosed(reason)
+        stored = set(
+            Response.objects.filter(survey=survey, client_id__in=list(accepted))
+            .values_list('client_id', flat=True)
+        )
+        duplicates += [client_id for client_id in accepted if client_id in stored]
+        created = [response for client_id, response in accepted.items() if client_id not in stored]
+        if survey.max_responses:
+            room = max(survey.max_responses - survey.response_count - pending_count(survey), 0)
+            rejected += [
+                {'client_id': response.client_id, 'errors': ['Khảo sát đã đạt tới giới hạn số phản hồi']}
+                for response in created[room:]
+            ]
+            created = created[:room]
+        try:
+            with transaction.atomic():
+                insert_responses(survey.pk, created, questions)
+        except IntegrityError:
+            # An id was stored meanwhile by another writer (e.g. a CSV import): retry row by row
+            created = _insert_each(survey.pk, created, questions, duplicates)
+        KioskDevice.objects.filter(pk=device.pk).update(
+            last_used_at=now,
+            uploaded_count=F('uploaded_count') + len(created),
+        )
+
+    return {
+        'success': True,
+        'revision': number,
+        'created': len(created),
+        'duplicates': duplicates,
+        'rejected': rejected,
+    }
@@ -0,0 +1,51 @@
+import re
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# Keys the take view stored in the session before respondent state moved to a signed cookie
+LEGACY_KEY_RE = re.compile(r"^(anon_session_id|survey_(access|done|response)_\d+)$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Dọn bảng django_session: xóa phiên đã hết hạn và các phiên ẩn danh chứa dữ liệu làm khảo sát cũ "
+        "(trước đây được tạo cho mỗi người trả lời ẩn danh)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Số phiên xóa mỗi lần (mặc định 1000)")
+        parser.add_argument("--dry-run", action="store_true", help="Chỉ đếm, không xóa")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        if not dry_run:
+            call_command("clearsessions")
+
+        sessions = Session.objects.filter(expire_date__gt=timezone.now()).order_by()
+        scanned = deleted = 0
+        batch = []
+        for session in sessions.iterator(chunk_size=batch_size):
+            scanned += 1
+            data = session.get_decoded()
+            if "_auth_user_id" in data or not any(LEGACY_KEY_RE.match(key) for key in data):
+                continue
+            batch.append(session.session_key)
+            if len(batch) >= batch_size:
+                deleted += self._delete(batch, dry_run)
+                batch = []
+        if batch:
+            deleted += self._delete(batch, dry_run)
+
+        verb = "Sẽ xóa" if dry_run else "Đã xóa"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted}/{scanned} phiên ẩn danh."))
+
+    def _delete(self, keys, dry_run):
+        if dry_run:
+            return len(keys)
+        Session.objects.filter(session_key__in=keys).delete()
+        return len(keys)
@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.builder import export_definition
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = "Xuất định nghĩa khảo sát (cài đặt + câu hỏi) ra file mẫu JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("survey_id", type=int, help="ID khảo sát")
+        parser.add_argument("-o", "--output", help="Đường dẫn file (bỏ trống = in ra màn hình)")
+
+    def handle(self, *args, **options):
+        survey = Survey.objects.filter(pk=options["survey_id"]).first()
+        if survey is None:
+            raise CommandError("Không tìm thấy khảo sát.")
+
+        content = json.dumps(export_definition(survey), ensure_ascii=False, indent=2)
+        if not options["output"]:
+            self.stdout.write(content)
+            return
+        with open(options["output"], "w", encoding="utf-8") as fh:
+            fh.write(content)
+        self.stdout.write(self.style.SUCCESS(f"Đã xuất khảo sát #{survey.pk} ra {options['output']}"))
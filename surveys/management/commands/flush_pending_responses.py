@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from surveys.buffer import flush_pending
+
+
+class Command(BaseCommand):
+    help = "Ghi các phản hồi đang chờ (khảo sát bật ghi theo lô) vào bảng Response bằng bulk insert."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Số phản hồi mỗi lô (mặc định RESPONSE_BUFFER_BATCH_SIZE)")
+        parser.add_argument("--limit", type=int, default=None, help="Dừng sau khi ghi chừng này phản hồi")
+        parser.add_argument("--interval", type=float, default=None, help="Chạy liên tục, nghỉ chừng này giây giữa các lần (dùng như worker)")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            moved = flush_pending(batch_size=options["batch_size"], limit=options["limit"])
+            if moved:
+                elapsed = time.monotonic() - started
+                self.stdout.write(self.style.SUCCESS(
+                    f"Đã ghi {moved} phản hồi trong {elapsed:.2f}s ({moved / max(elapsed, 1e-6):.0f} phản hồi/giây)."
+                ))
+            if options["interval"] is None:
+                if not moved:
+                    self.stdout.write("Không có phản hồi nào đang chờ.")
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,88 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.models import Survey
+from surveys.response_import import ResponseImporter, ResponseImportError, build_mapping
+
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = "Nhập phản hồi cũ của một khảo sát từ file CSV (COPY trên PostgreSQL, bulk_create với DB khác)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("survey_id", type=int)
+        parser.add_argument("csv_file", help="Đường dẫn file CSV (dòng đầu là tiêu đề cột)")
+        parser.add_argument("--map", action="append", default=[], metavar="COT=ID_CAU_HOI",
+                            help="Gán cột cho câu hỏi (lặp lại được); mặc định khớp theo nội dung câu hỏi hoặc Q<id>")
+        parser.add_argument("--time-column", default=None, help="Cột thời gian gửi (mặc định \"Thời gian\" nếu có)")
+        parser.add_argument("--id-column", default=None, help="Cột mã phản hồi; dòng có mã đã nhập sẽ được bỏ qua khi chạy lại")
+        parser.add_argument("--separator", default="|", help="Dấu phân cách các lựa chọn của câu nhiều lựa chọn (mặc định |)")
+        parser.add_argument("--delimiter", default=",", help="Dấu phân cách cột của file CSV")
+        parser.add_argument("--encoding", default="utf-8-sig")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--no-copy", action="store_true", help="Dùng bulk_create kể cả trên PostgreSQL")
+        parser.add_argument("--dry-run", action="store_true", help="Chỉ kiểm tra file, không ghi")
+
+    def _parse_map(self, items):
+        mapping = {}
+        for item in items:
+            column, sep, qid = item.rpartition("=")
+            if not sep or not column or not qid.strip().isdigit():
+                raise CommandError(f"--map không hợp lệ: {item} (dạng \"Tên cột=ID câu hỏi\")")
+            mapping[column] = int(qid)
+        return mapping
+
+    def handle(self, *args, **options):
+        survey = Survey.objects.filter(pk=options["survey_id"], is_deleted=False).first()
+        if survey is None:
+            raise CommandError("Không tìm thấy khảo sát.")
+        importer = ResponseImporter(
+            survey,
+            batch_size=max(1, options["batch_size"]),
+            separator=options["separator"],
+            use_copy=False if options["no_copy"] else None,
+            dry_run=options["dry_run"],
+            log=self.stdout.write,
+        )
+
+        try:
+            with open(options["csv_file"], encoding=options["encoding"], newline="") as fh:
+                reader = csv.reader(fh, delimiter=options["delimiter"])
+                header = next(reader, None)
+                if not header:
+                    raise CommandError("File CSV trống.")
+                columns, time_index, id_index, ignored = build_mapping(
+                    header,
+                    importer.snapshot.questions,
+                    explicit=self._parse_map(options["map"]),
+                    time_column=options["time_column"],
+                    id_column=options["id_column"],
+                )
+                self.stdout.write(f"{len(columns)} cột khớp câu hỏi"
+                                  + (f", bỏ qua: {', '.join(ignored)}" if ignored else "")
+                                  + (". Chưa có cột thời gian: dùng thời điểm nhập." if time_index is None else "."))
+                if importer.use_copy and not importer.dry_run:
+                    self.stdout.write("Ghi bằng COPY qua bảng tạm.")
+                elapsed = importer.run(reader, columns, time_index, id_index)
+        except OSError as e:
+            raise CommandError(f"Không đọc được file: {e}")
+        except (ResponseImportError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(str(e))
+
+        for line, errors in importer.invalid[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(f"Dòng {line}: {'; '.join(errors)}")
+        if len(importer.invalid) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f"... và {len(importer.invalid) - MAX_REPORTED_ERRORS} dòng lỗi khác.")
+
+        rate = importer.read / max(elapsed, 1e-6)
+        if importer.dry_run:
+            result = f"hợp lệ {importer.valid} (chưa ghi)"
+        else:
+            result = f"đã nhập {importer.imported}"
+        summary = (
+            f"{importer.read} dòng trong {elapsed:.2f}s ({rate:.0f} dòng/giây): "
+            f"{result}, trùng {importer.duplicates}, lỗi {len(importer.invalid)}."
+        )
+        self.stdout.write(self.style.SUCCESS(summary))
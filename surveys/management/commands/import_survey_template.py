@@ -0,0 +1,34 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.builder import BatchError, import_definition
+
+
+class Command(BaseCommand):
+    help = "Tạo khảo sát nháp từ một hoặc nhiều file mẫu JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+", help="Đường dẫn file mẫu .json")
+        parser.add_argument("--user", required=True, help="Username của người sở hữu khảo sát mới")
+        parser.add_argument("--title", help="Tiêu đề mới (mặc định lấy trong file)")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["user"]).first()
+        if user is None:
+            raise CommandError("Không tìm thấy người dùng.")
+
+        for path in options["files"]:
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    data = json.load(fh)
+                survey = import_definition(data, user, title=options["title"])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"{path}: không đọc được file ({e})")
+            except BatchError as e:
+                detail = f" (câu hỏi #{e.index + 1})" if e.index is not None else ""
+                raise CommandError(f"{path}: {e}{detail}")
+            self.stdout.write(f"{path}: khảo sát #{survey.pk} ({survey.questions.count()} câu hỏi)")
+
+        self.stdout.write(self.style.SUCCESS("Đã nhập file mẫu."))
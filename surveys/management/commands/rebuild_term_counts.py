@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.models import Survey
+from surveys.terms import rebuild_survey_terms
+
+
+class Command(BaseCommand):
+    help = "Tính lại bảng tần suất từ khóa (từ đơn + cặp từ) cho câu hỏi tự luận từ các phản hồi đã lưu."
+
+    def add_arguments(self, parser):
+        parser.add_argument("survey_ids", nargs="*", type=int, help="ID khảo sát (bỏ trống = tất cả)")
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.all().order_by("pk")
+        if options["survey_ids"]:
+            surveys = surveys.filter(pk__in=options["survey_ids"])
+            if not surveys.exists():
+                raise CommandError("Không tìm thấy khảo sát nào với ID đã nhập.")
+
+        for survey in surveys.iterator():
+            total = rebuild_survey_terms(survey)
+            self.stdout.write(f"Survey #{survey.pk}: {total} từ khóa")
+
+        self.stdout.write(self.style.SUCCESS("Đã cập nhật bảng tần suất từ khóa."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from surveys.counters import recount_survey_responses, refresh_site_counters
+
+
+class Command(BaseCommand):
+    help = "Làm mới bộ đếm toàn hệ thống (tổng khảo sát / phản hồi) hiển thị ở trang chủ và dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recount-surveys",
+            action="store_true",
+            help="Đếm lại số phản hồi lưu trên từng khảo sát (Survey.response_count)",
+        )
+
+    def handle(self, *args, **options):
+        if options["recount_surveys"]:
+            updated = recount_survey_responses()
+            self.stdout.write(f"Đã đếm lại số phản hồi cho {updated} khảo sát")
+
+        data = refresh_site_counters()
+        suffix = " (ước lượng)" if data["responses_estimated"] else ""
+        self.stdout.write(
+            f"Khảo sát: {data['total_surveys']} ({data['active_surveys']} đang hoạt động), "
+            f"phản hồi: {data['total_responses']}{suffix}"
+        )
+        self.stdout.write(self.style.SUCCESS("Đã làm mới bộ đếm hệ thống."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from surveys.models import Survey
+from surveys.static_pages import sync_static_page
+
+
+class Command(BaseCommand):
+    help = "Dựng lại / gỡ bỏ trang làm khảo sát tĩnh (xuất bản tĩnh) theo phiên bản và trạng thái hiện tại."
+
+    def add_arguments(self, parser):
+        parser.add_argument("survey_ids", nargs="*", type=int, help="Chỉ xử lý các khảo sát này")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Dựng lại kể cả khi trang đã đúng phiên bản (ví dụ sau khi đổi giao diện/collectstatic)",
+        )
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.filter(Q(static_publish=True) | Q(static_revision__isnull=False))
+        if options["survey_ids"]:
+            surveys = surveys.filter(pk__in=options["survey_ids"])
+
+        served = removed = 0
+        for survey in surveys.iterator():
+            if sync_static_page(survey, force=options["force"]):
+                served += 1
+            else:
+                removed += 1
+        self.stdout.write(self.style.SUCCESS(f"Trang tĩnh đang phục vụ: {served}, đã gỡ / không áp dụng: {removed}."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from surveys.campaigns import send_campaign
+from surveys.models import InviteCampaign
+
+
+class Command(BaseCommand):
+    help = "Gửi (hoặc gửi tiếp) các đợt email mời tham gia khảo sát đang chờ."
+
+    def add_arguments(self, parser):
+        parser.add_argument("campaign_ids", nargs="*", type=int, help="Chỉ gửi các đợt này")
+        parser.add_argument("--batch-size", type=int, default=None, help="Số email mỗi lô (mặc định INVITE_MAIL_BATCH_SIZE)")
+        parser.add_argument("--rate", type=float, default=None, help="Tối đa số email mỗi giây (mặc định INVITE_MAIL_RATE, 0 = không giới hạn)")
+        parser.add_argument("--limit", type=int, default=None, help="Dừng sau khi xử lý chừng này email mỗi đợt")
+
+    def handle(self, *args, **options):
+        campaigns = InviteCampaign.objects.select_related("survey__creator").filter(
+            status__in=[InviteCampaign.STATUS_QUEUED, InviteCampaign.STATUS_RUNNING, InviteCampaign.STATUS_FAILED]
+        ).order_by("pk")
+        if options["campaign_ids"]:
+            campaigns = campaigns.filter(pk__in=options["campaign_ids"])
+
+        for campaign in campaigns:
+            try:
+                send_campaign(
+                    campaign,
+                    batch_size=options["batch_size"],
+                    rate=options["rate"],
+                    limit=options["limit"],
+                    log=self.stdout.write,
+                )
+            except Exception as exc:
+                self.stderr.write(f"Đợt #{campaign.pk} lỗi: {exc} (chạy lại lệnh để gửi tiếp)")
+                continue
+            campaign.refresh_from_db()
+            self.stdout.write(self.style.SUCCESS(
+                f"Đợt #{campaign.pk} ({campaign.get_status_display()}): đã gửi {campaign.sent_count}, lỗi {campaign.failed_count}."
+            ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0020_response_attachments_and_upload_question'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionTermCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ngram', models.PositiveSmallIntegerField(choices=[(1, 'Từ đơn'), (2, 'Cặp từ')], default=1, verbose_name='Loại')),
+                ('term', models.CharField(max_length=100, verbose_name='Từ khóa')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Số lần xuất hiện')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_counts', to='surveys.question', verbose_name='Câu hỏi')),
+            ],
+            options={
+                'verbose_name': 'Tần suất từ khóa',
+                'verbose_name_plural': 'Tần suất từ khóa',
+                'constraints': [models.UniqueConstraint(fields=('question', 'ngram', 'term'), name='uniq_question_ngram_term')],
+            },
+        ),
+    ]
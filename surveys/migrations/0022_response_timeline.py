@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0021_question_term_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseTimelineBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Theo giờ'), ('day', 'Theo ngày')], max_length=8, verbose_name='Độ chia')),
+                ('bucket_start', models.DateTimeField(verbose_name='Bắt đầu khung')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Số phản hồi')),
+            ],
+            options={
+                'verbose_name': 'Thống kê phản hồi theo thời gian',
+                'verbose_name_plural': 'Thống kê phản hồi theo thời gian',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['survey', 'submitted_at'], name='response_survey_submitted_idx'),
+        ),
+        migrations.AddField(
+            model_name='responsetimelinebucket',
+            name='survey',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_buckets', to='surveys.survey', verbose_name='Khảo sát'),
+        ),
+        migrations.AddConstraint(
+            model_name='responsetimelinebucket',
+            constraint=models.UniqueConstraint(fields=('survey', 'granularity', 'bucket_start'), name='uniq_survey_timeline_bucket'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:53
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_response_count(apps, schema_editor):
+    Survey = apps.get_model("surveys", "Survey")
+    Response = apps.get_model("surveys", "Response")
+
+    counts = (
+        Response.objects.filter(survey_id=OuterRef("pk"))
+        .order_by()
+        .values("survey_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Survey.objects.update(
+        response_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    )
+
+
+def noop_reverse(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0022_response_timeline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='response_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số phản hồi'),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['creator', 'created_at'], name='survey_creator_created_idx'),
+        ),
+        migrations.RunPython(backfill_response_count, noop_reverse),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0023_survey_response_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_surveys', models.PositiveBigIntegerField(default=0, verbose_name='Tổng khảo sát')),
+                ('active_surveys', models.PositiveBigIntegerField(default=0, verbose_name='Khảo sát đang hoạt động')),
+                ('total_responses', models.PositiveBigIntegerField(default=0, verbose_name='Tổng phản hồi')),
+                ('responses_estimated', models.BooleanField(default=False, verbose_name='Số phản hồi là ước lượng')),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True, verbose_name='Làm mới lúc')),
+            ],
+            options={
+                'verbose_name': 'Bộ đếm hệ thống',
+                'verbose_name_plural': 'Bộ đếm hệ thống',
+            },
+        ),
+    ]
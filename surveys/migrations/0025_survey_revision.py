@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0024_site_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Phiên bản'),
+        ),
+    ]
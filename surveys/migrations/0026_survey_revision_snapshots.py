@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0025_survey_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Phiên bản')),
+                ('definition', models.JSONField(default=list, verbose_name='Câu hỏi (JSON)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Thời gian tạo')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='surveys.survey', verbose_name='Khảo sát')),
+            ],
+            options={
+                'verbose_name': 'Phiên bản khảo sát',
+                'verbose_name_plural': 'Phiên bản khảo sát',
+            },
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='revision',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='responses', to='surveys.surveyrevision', verbose_name='Phiên bản khảo sát'),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='published_revision',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='surveys.surveyrevision', verbose_name='Phiên bản đã xuất bản'),
+        ),
+        migrations.AddConstraint(
+            model_name='surveyrevision',
+            constraint=models.UniqueConstraint(fields=('survey', 'number'), name='uniq_survey_revision_number'),
+        ),
+    ]
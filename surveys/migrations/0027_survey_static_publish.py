@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0026_survey_revision_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='static_publish',
+            field=models.BooleanField(default=False, help_text='Dựng sẵn trang làm khảo sát thành file HTML (chỉ áp dụng khi không có mật khẩu/danh sách mời)', verbose_name='Xuất bản tĩnh'),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='static_revision',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Phiên bản trang tĩnh'),
+        ),
+    ]
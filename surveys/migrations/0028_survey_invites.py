@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def whitelist_to_invites(apps, schema_editor):
+    Survey = apps.get_model("surveys", "Survey")
+    SurveyInvite = apps.get_model("surveys", "SurveyInvite")
+
+    for survey_id, raw in Survey.objects.exclude(whitelist_emails="").values_list("id", "whitelist_emails").iterator():
+        # Every non-empty line restricted the survey before, even one that is not
+        # an email (it just matched nobody): keep them all so no survey opens up.
+        # EmailField is 254 characters; a longer line could not match anyway.
+        emails = {line.strip().lower()[:254] for line in raw.splitlines() if line.strip()}
+        SurveyInvite.objects.bulk_create(
+            [SurveyInvite(survey_id=survey_id, email=email) for email in sorted(emails)],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        Survey.objects.filter(pk=survey_id).update(
+            invite_count=SurveyInvite.objects.filter(survey_id=survey_id).count()
+        )
+
+
+def invites_to_whitelist(apps, schema_editor):
+    Survey = apps.get_model("surveys", "Survey")
+    SurveyInvite = apps.get_model("surveys", "SurveyInvite")
+
+    for survey in Survey.objects.filter(invite_count__gt=0).iterator():
+        emails = SurveyInvite.objects.filter(survey_id=survey.pk).order_by("id").values_list("email", flat=True)
+        Survey.objects.filter(pk=survey.pk).update(whitelist_emails="\n".join(emails))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0027_survey_static_publish'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyInvite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('status', models.CharField(choices=[('pending', 'Chưa gửi'), ('sent', 'Đã gửi lời mời'), ('failed', 'Gửi lỗi'), ('responded', 'Đã trả lời')], default='pending', max_length=16, verbose_name='Trạng thái')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày thêm')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Gửi lúc')),
+                ('responded_at', models.DateTimeField(blank=True, null=True, verbose_name='Trả lời lúc')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invites', to='surveys.survey', verbose_name='Khảo sát')),
+            ],
+            options={
+                'verbose_name': 'Lời mời khảo sát',
+                'verbose_name_plural': 'Lời mời khảo sát',
+                'constraints': [models.UniqueConstraint(fields=('survey', 'email'), name='uniq_survey_invite_email')],
+            },
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='invite_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số email được mời'),
+        ),
+        migrations.RunPython(whitelist_to_invites, invites_to_whitelist),
+        migrations.RemoveField(
+            model_name='survey',
+            name='whitelist_emails',
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0028_survey_invites'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InviteCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=200, verbose_name='Tiêu đề email')),
+                ('message', models.TextField(blank=True, verbose_name='Lời nhắn')),
+                ('base_url', models.CharField(max_length=200, verbose_name='Địa chỉ trang')),
+                ('status', models.CharField(choices=[('queued', 'Đang chờ gửi'), ('running', 'Đang gửi'), ('done', 'Hoàn tất'), ('failed', 'Lỗi')], default='queued', max_length=16, verbose_name='Trạng thái')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Số email cần gửi')),
+                ('sent_count', models.PositiveIntegerField(default=0, verbose_name='Đã gửi')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='Gửi lỗi')),
+                ('last_invite_id', models.BigIntegerField(default=0, verbose_name='Lời mời xử lý cuối')),
+                ('last_error', models.TextField(blank=True, verbose_name='Lỗi gần nhất')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Bắt đầu gửi')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Kết thúc')),
+            ],
+            options={
+                'verbose_name': 'Đợt gửi lời mời',
+                'verbose_name_plural': 'Đợt gửi lời mời',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='surveyinvite',
+            name='opened_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Mở link lúc'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyinvite',
+            index=models.Index(fields=['survey', 'status', 'id'], name='invite_survey_status_idx'),
+        ),
+        migrations.AddField(
+            model_name='invitecampaign',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Người tạo'),
+        ),
+        migrations.AddField(
+            model_name='invitecampaign',
+            name='survey',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invite_campaigns', to='surveys.survey', verbose_name='Khảo sát'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0029_invite_campaigns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='buffer_responses',
+            field=models.BooleanField(default=False, help_text='Phản hồi được đưa vào hàng chờ và ghi theo lô bởi lệnh flush_pending_responses', verbose_name='Ghi phản hồi theo lô'),
+        ),
+        migrations.AlterField(
+            model_name='response',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Thời gian gửi'),
+        ),
+        migrations.CreateModel(
+            name='PendingResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('response_data', models.JSONField(default=dict, verbose_name='Dữ liệu trả lời')),
+                ('submitted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Thời gian gửi')),
+                ('respondent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Người trả lời')),
+                ('revision', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='surveys.surveyrevision', verbose_name='Phiên bản khảo sát')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_responses', to='surveys.survey', verbose_name='Khảo sát')),
+            ],
+            options={
+                'verbose_name': 'Phản hồi chờ ghi',
+                'verbose_name_plural': 'Phản hồi chờ ghi',
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0030_buffered_responses'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KioskDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Tên thiết bị')),
+                ('token_hash', models.CharField(editable=False, max_length=64, unique=True, verbose_name='Mã băm token')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('last_used_at', models.DateTimeField(blank=True, null=True, verbose_name='Tải lên lần cuối')),
+                ('uploaded_count', models.PositiveIntegerField(default=0, verbose_name='Số phản hồi đã tải lên')),
+                ('revoked_at', models.DateTimeField(blank=True, null=True, verbose_name='Thu hồi lúc')),
+            ],
+            options={
+                'verbose_name': 'Thiết bị kiosk',
+                'verbose_name_plural': 'Thiết bị kiosk',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='Mã phản hồi phía thiết bị'),
+        ),
+        migrations.AddConstraint(
+            model_name='response',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_id__isnull', False)), fields=('survey', 'client_id'), name='uniq_response_client_id'),
+        ),
+        migrations.AddField(
+            model_name='kioskdevice',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Người tạo'),
+        ),
+        migrations.AddField(
+            model_name='kioskdevice',
+            name='survey',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kiosk_devices', to='surveys.survey', verbose_name='Khảo sát'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0031_kiosk_devices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invitecampaign',
+            name='locked_by',
+            field=models.CharField(blank=True, default='', max_length=32, verbose_name='Tiến trình đang gửi'),
+        ),
+        migrations.AddField(
+            model_name='invitecampaign',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Khóa gửi hết hạn lúc'),
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 
@@ -29,12 +31,6 @@ class Survey(models.Model):
         verbose_name="Mật khẩu khảo sát",
         help_text="Để trống nếu không yêu cầu mật khẩu"
     )
-    whitelist_emails = models.TextField(
-        blank=True,
-        default="",
-        verbose_name="Danh sách email được phép",
-        help_text="Nhập danh sách email (mỗi dòng một email) được phép tham gia/export"
-    )
     allow_review_response = models.BooleanField(
         default=True,
         verbose_name="Cho phép xem lại câu trả lời",
@@ -50,15 +46,64 @@ class Survey(models.Model):
         verbose_name="Chỉ cho phép trả lời 1 lần",
         help_text="Mỗi người chỉ được trả lời khảo sát 1 lần duy nhất"
     )
+    static_publish = models.BooleanField(
+        default=False,
+        verbose_name="Xuất bản tĩnh",
+        help_text="Dựng sẵn trang làm khảo sát thành file HTML (chỉ áp dụng khi không có mật khẩu/danh sách mời)"
+    )
+    buffer_responses = models.BooleanField(
+        default=False,
+        verbose_name="Ghi phản hồi theo lô",
+        help_text="Phản hồi được đưa vào hàng chờ và ghi theo lô bởi lệnh flush_pending_responses"
+    )
+    # Number of SurveyInvite rows; > 0 restricts the survey to invited emails
+    invite_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Số email được mời")
+    # Denormalized, kept in sync by the Response signals below
+    response_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Số phản hồi")
+    # Bumped by every change of the survey, its questions or their options
+    revision = models.PositiveIntegerField(default=1, editable=False, verbose_name="Phiên bản")
+    published_revision = models.ForeignKey(
+        'SurveyRevision',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        verbose_name="Phiên bản đã xuất bản",
+    )
+    # Revision currently rendered to the static take page (None = no page)
+    static_revision = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Phiên bản trang tĩnh")
 
     class Meta:
         verbose_name = "Khảo sát"
         verbose_name_plural = "Khảo sát"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['creator', 'created_at'], name='survey_creator_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    # Maintained with queryset UPDATEs (F() counters, snapshot/page pointers) so
+    # concurrent changes are never lost
+    UPDATE_ONLY_FIELDS = ('response_count', 'invite_count', 'revision', 'published_revision', 'static_revision')
+    # Publish/delete state: saving only these does not change the definition (no new revision)
+    STATE_FIELDS = ('is_active', 'is_deleted', 'deleted_at', 'updated_at')
+
+    def save(self, *args, **kwargs):
+        # A plain save() of an already loaded survey must not write these back stale
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.UPDATE_ONLY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_revision(cls, survey_id):
+        cls.objects.filter(pk=survey_id).update(revision=F('revision') + 1)
+
 
 class SurveyCollaborator(models.Model):
     ROLE_OWNER = "owner"
@@ -102,6 +147,123 @@ class SurveyCollaborator(models.Model):
         return f"{self.user.username} -> {self.survey.title} ({self.role})"
 
 
+class SurveyInvite(models.Model):
+    """One allowed email of a survey's allowlist (emails are stored lowercased)."""
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_RESPONDED = "responded"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Chưa gửi"),
+        (STATUS_SENT, "Đã gửi lời mời"),
+        (STATUS_FAILED, "Gửi lỗi"),
+        (STATUS_RESPONDED, "Đã trả lời"),
+    ]
+
+    survey = models.ForeignKey(
+        Survey,
+        on_delete=models.CASCADE,
+        related_name="invites",
+        verbose_name="Khảo sát",
+    )
+    email = models.EmailField(verbose_name="Email")
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Trạng thái",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ngày thêm")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Gửi lúc")
+    opened_at = models.DateTimeField(null=True, blank=True, verbose_name="Mở link lúc")
+    responded_at = models.DateTimeField(null=True, blank=True, verbose_name="Trả lời lúc")
+
+    class Meta:
+        verbose_name = "Lời mời khảo sát"
+        verbose_name_plural = "Lời mời khảo sát"
+        constraints = [
+            models.UniqueConstraint(fields=["survey", "email"], name="uniq_survey_invite_email")
+        ]
+        indexes = [
+            # Mailer batches and the status filter walk (survey, status) in id order
+            models.Index(fields=["survey", "status", "id"], name="invite_survey_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.email} -> {self.survey_id}"
+
+
+class InviteCampaign(models.Model):
+    """
+    One email blast to the pending invites of a survey. Sent in batches by
+    `manage.py send_invitations`; `last_invite_id` is the resume cursor.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Đang chờ gửi"),
+        (STATUS_RUNNING, "Đang gửi"),
+        (STATUS_DONE, "Hoàn tất"),
+        (STATUS_FAILED, "Lỗi"),
+    ]
+
+    survey = models.ForeignKey(
+        Survey,
+        on_delete=models.CASCADE,
+        related_name="invite_campaigns",
+        verbose_name="Khảo sát",
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Người tạo",
+    )
+    subject = models.CharField(max_length=200, verbose_name="Tiêu đề email")
+    message = models.TextField(blank=True, verbose_name="Lời nhắn")
+    # Absolute site root captured from the request that queued the campaign
+    base_url = models.CharField(max_length=200, verbose_name="Địa chỉ trang")
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+        verbose_name="Trạng thái",
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name="Số email cần gửi")
+    sent_count = models.PositiveIntegerField(default=0, verbose_name="Đã gửi")
+    failed_count = models.PositiveIntegerField(default=0, verbose_name="Gửi lỗi")
+    last_invite_id = models.BigIntegerField(default=0, verbose_name="Lời mời xử lý cuối")
+    last_error = models.TextField(blank=True, verbose_name="Lỗi gần nhất")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ngày tạo")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Bắt đầu gửi")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Kết thúc")
+    # Claimed by one sender at a time (see campaigns.send_campaign); the lease
+    # is extended after every batch and only runs out when the sender died
+    locked_by = models.CharField(max_length=32, blank=True, default="", verbose_name="Tiến trình đang gửi")
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name="Khóa gửi hết hạn lúc")
+
+    class Meta:
+        verbose_name = "Đợt gửi lời mời"
+        verbose_name_plural = "Đợt gửi lời mời"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.subject} ({self.get_status_display()})"
+
+    @property
+    def progress_percent(self):
+        if not self.total:
+            return 100
+        return min(100, round((self.sent_count + self.failed_count) * 100 / self.total))
+
+
 class Question(models.Model):
     QUESTION_TYPES = [
         ('text', 'Câu hỏi tự luận'),
@@ -135,22 +297,124 @@ class Question(models.Model):
     def __str__(self):
         return self.text[:50]
 
+
+class SurveyRevision(models.Model):
+    """
+    Ảnh chụp bất biến câu hỏi/lựa chọn của khảo sát tại một phiên bản (`Survey.revision`).
+    Trang làm khảo sát đọc ảnh chụp này (qua cache) thay vì truy vấn lại câu hỏi.
+    """
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='revisions', verbose_name="Khảo sát")
+    number = models.PositiveIntegerField(verbose_name="Phiên bản")
+    definition = models.JSONField(default=list, verbose_name="Câu hỏi (JSON)")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Thời gian tạo")
+
+    class Meta:
+        verbose_name = "Phiên bản khảo sát"
+        verbose_name_plural = "Phiên bản khảo sát"
+        constraints = [
+            models.UniqueConstraint(fields=["survey", "number"], name="uniq_survey_revision_number"),
+        ]
+
+    def __str__(self):
+        return f"Survey #{self.survey_id} r{self.number}"
+
+
 class Response(models.Model):
     survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='responses', verbose_name="Khảo sát")
     respondent = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Người trả lời")
-    submitted_at = models.DateTimeField(auto_now_add=True, verbose_name="Thời gian gửi")
+    revision = models.ForeignKey(
+        SurveyRevision,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='responses',
+        verbose_name="Phiên bản khảo sát",
+    )
+    # Not auto_now_add: buffered, kiosk and imported responses keep their original time
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name="Thời gian gửi")
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
     response_data = models.JSONField(default=dict, verbose_name="Dữ liệu trả lời")
+    # Id generated by an offline kiosk (or an import) so that re-uploads are ignored
+    client_id = models.CharField(max_length=64, null=True, blank=True, verbose_name="Mã phản hồi phía thiết bị")
 
     class Meta:
         verbose_name = "Phản hồi"
         verbose_name_plural = "Phản hồi"
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=["survey", "submitted_at"], name="response_survey_submitted_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["survey", "client_id"],
+                condition=models.Q(client_id__isnull=False),
+                name="uniq_response_client_id",
+            ),
+        ]
 
     def __str__(self):
         return f"Response #{self.id} for {self.survey.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Kept so an edit can adjust the term counts by the difference without
+        # re-reading the row; assign a new dict rather than mutating this one.
+        if 'response_data' in field_names:
+            instance._loaded_response_data = instance.response_data
+        return instance
+
+
+class KioskDevice(models.Model):
+    """
+    A tablet allowed to upload offline responses to one survey through the
+    kiosk API. Only the SHA-256 of its token is stored; the token is shown once.
+    """
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='kiosk_devices', verbose_name="Khảo sát")
+    name = models.CharField(max_length=100, verbose_name="Tên thiết bị")
+    token_hash = models.CharField(max_length=64, unique=True, editable=False, verbose_name="Mã băm token")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Người tạo")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ngày tạo")
+    last_used_at = models.DateTimeField(null=True, blank=True, verbose_name="Tải lên lần cuối")
+    uploaded_count = models.PositiveIntegerField(default=0, verbose_name="Số phản hồi đã tải lên")
+    revoked_at = models.DateTimeField(null=True, blank=True, verbose_name="Thu hồi lúc")
+
+    class Meta:
+        verbose_name = "Thiết bị kiosk"
+        verbose_name_plural = "Thiết bị kiosk"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} -> {self.survey_id}"
+
+
+class PendingResponse(models.Model):
+    """Validated submission of a buffered survey, waiting to be written as a Response."""
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='pending_responses', verbose_name="Khảo sát")
+    revision = models.ForeignKey(
+        SurveyRevision,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Phiên bản khảo sát",
+    )
+    respondent = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Người trả lời")
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    response_data = models.JSONField(default=dict, verbose_name="Dữ liệu trả lời")
+    submitted_at = models.DateTimeField(default=timezone.now, verbose_name="Thời gian gửi")
+
+    class Meta:
+        verbose_name = "Phản hồi chờ ghi"
+        verbose_name_plural = "Phản hồi chờ ghi"
+
+    def __str__(self):
+        return f"Pending #{self.id} for Survey #{self.survey_id}"
+
 
 class ResponseAttachment(models.Model):
     response = models.ForeignKey(
@@ -184,6 +448,70 @@ class ResponseAttachment(models.Model):
         return f"Attachment #{self.id} for Response #{self.response_id} / Q{self.question_id}"
 
 
+class QuestionTermCount(models.Model):
+    NGRAM_WORD = 1
+    NGRAM_BIGRAM = 2
+
+    NGRAM_CHOICES = [
+        (NGRAM_WORD, "Từ đơn"),
+        (NGRAM_BIGRAM, "Cặp từ"),
+    ]
+
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name="term_counts",
+        verbose_name="Câu hỏi",
+    )
+    ngram = models.PositiveSmallIntegerField(choices=NGRAM_CHOICES, default=NGRAM_WORD, verbose_name="Loại")
+    term = models.CharField(max_length=100, verbose_name="Từ khóa")
+    count = models.PositiveIntegerField(default=0, verbose_name="Số lần xuất hiện")
+
+    class Meta:
+        verbose_name = "Tần suất từ khóa"
+        verbose_name_plural = "Tần suất từ khóa"
+        constraints = [
+            models.UniqueConstraint(fields=["question", "ngram", "term"], name="uniq_question_ngram_term"),
+        ]
+
+    def __str__(self):
+        return f"Q{self.question_id}: {self.term} ({self.count})"
+
+
+class ResponseTimelineBucket(models.Model):
+    """Số phản hồi đã chốt của một khung giờ/ngày (chỉ lưu các khung đã kết thúc)."""
+
+    GRANULARITY_HOUR = "hour"
+    GRANULARITY_DAY = "day"
+
+    GRANULARITY_CHOICES = [
+        (GRANULARITY_HOUR, "Theo giờ"),
+        (GRANULARITY_DAY, "Theo ngày"),
+    ]
+
+    survey = models.ForeignKey(
+        Survey,
+        on_delete=models.CASCADE,
+        related_name="timeline_buckets",
+        verbose_name="Khảo sát",
+    )
+    granularity = models.CharField(max_length=8, choices=GRANULARITY_CHOICES, verbose_name="Độ chia")
+    bucket_start = models.DateTimeField(verbose_name="Bắt đầu khung")
+    count = models.PositiveIntegerField(default=0, verbose_name="Số phản hồi")
+
+    class Meta:
+        verbose_name = "Thống kê phản hồi theo thời gian"
+        verbose_name_plural = "Thống kê phản hồi theo thời gian"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["survey", "granularity", "bucket_start"], name="uniq_survey_timeline_bucket"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Survey #{self.survey_id} {self.granularity} {self.bucket_start}: {self.count}"
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
@@ -192,6 +520,26 @@ class UserProfile(models.Model):
         return f"Profile of {self.user.username}"
 
 
+class SiteCounter(models.Model):
+    """
+    Bộ đếm toàn hệ thống (một dòng duy nhất) hiển thị ở trang chủ/dashboard.
+    Được làm mới định kỳ bởi `surveys.counters` thay vì COUNT(*) mỗi lượt truy cập.
+    """
+
+    total_surveys = models.PositiveBigIntegerField(default=0, verbose_name="Tổng khảo sát")
+    active_surveys = models.PositiveBigIntegerField(default=0, verbose_name="Khảo sát đang hoạt động")
+    total_responses = models.PositiveBigIntegerField(default=0, verbose_name="Tổng phản hồi")
+    responses_estimated = models.BooleanField(default=False, verbose_name="Số phản hồi là ước lượng")
+    refreshed_at = models.DateTimeField(null=True, blank=True, verbose_name="Làm mới lúc")
+
+    class Meta:
+        verbose_name = "Bộ đếm hệ thống"
+        verbose_name_plural = "Bộ đếm hệ thống"
+
+    def __str__(self):
+        return f"{self.total_surveys} khảo sát / {self.total_responses} phản hồi"
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
@@ -201,3 +549,90 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     UserProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Response)
+def increment_survey_response_count(sender, instance, created, **kwargs):
+    if created:
+        Survey.objects.filter(pk=instance.survey_id).update(response_count=F('response_count') + 1)
+
+
+def _deleted_alone(instance, origin):
+    """
+    False when the row goes as part of a batch: a queryset delete or a cascade
+    from its survey (or the survey's creator). Those callers fix the counters
+    once afterwards (see `bulk.delete_responses`) or drop them with the survey.
+    """
+    return origin is None or origin is instance
+
+
+@receiver(post_delete, sender=Response)
+def decrement_survey_response_count(sender, instance, origin=None, **kwargs):
+    if not _deleted_alone(instance, origin):
+        return
+    Survey.objects.filter(pk=instance.survey_id, response_count__gt=0).update(
+        response_count=F('response_count') - 1
+    )
+
+
+@receiver(post_save, sender=Response)
+def update_terms_on_response_edit(sender, instance, created, update_fields=None, **kwargs):
+    from .terms import update_response_terms
+
+    if created or (update_fields is not None and 'response_data' not in update_fields):
+        return
+    if not hasattr(instance, '_loaded_response_data'):
+        return
+    old_data = instance._loaded_response_data
+    if old_data != instance.response_data:
+        update_response_terms(instance.survey_id, old_data, instance.response_data)
+    instance._loaded_response_data = instance.response_data
+
+
+@receiver(post_delete, sender=Response)
+def update_terms_on_response_delete(sender, instance, origin=None, **kwargs):
+    from .terms import update_response_terms
+
+    if instance.response_data and _deleted_alone(instance, origin):
+        update_response_terms(instance.survey_id, instance.response_data, None)
+
+
+@receiver(post_delete, sender=Response)
+def update_timeline_on_response_delete(sender, instance, origin=None, **kwargs):
+    from .timeline import forget_response
+
+    if instance.submitted_at and _deleted_alone(instance, origin):
+        forget_response(instance.survey_id, instance.submitted_at)
+
+
+@receiver(post_save, sender=Question)
+def bump_revision_on_question_save(sender, instance, **kwargs):
+    Survey.bump_revision(instance.survey_id)
+
+
+@receiver(post_delete, sender=Question)
+def bump_revision_on_question_delete(sender, instance, origin=None, **kwargs):
+    # A batch delete (builder) bumps once itself; a cascade has no survey left
+    if _deleted_alone(instance, origin):
+        Survey.bump_revision(instance.survey_id)
+
+
+@receiver(post_save, sender=Survey)
+def bump_revision_on_survey_change(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and set(update_fields) <= set(Survey.STATE_FIELDS):
+        return
+    Survey.bump_revision(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=Response)
+def invalidate_survey_stats_cache(sender, instance, origin=None, **kwargs):
+    from .stats import invalidate_survey_stats
+
+    if not _deleted_alone(instance, origin):
+        return
+    survey_id = instance.survey_id
+    # Bump after commit so a concurrent reader cannot re-cache the old state
+    transaction.on_commit(lambda: invalidate_survey_stats(survey_id))
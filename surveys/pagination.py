@@ -0,0 +1,130 @@
+"""
+Keyset (seek) pagination helpers.
+
+Pages are addressed by an opaque cursor holding the sort key of the first/last
+row instead of an OFFSET, so page N costs the same as page 1 as long as an
+index covers the sort fields.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = "keyset-cursor"
+DEFAULT_PAGE_SIZE = 20
+
+
+@dataclass
+class KeysetPage:
+    items: List = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+
+def encode_cursor(values) -> str:
+    encoded = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return signing.dumps(encoded, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token, fields, model):
+    """Return the sort-key values of a cursor, or None if it is invalid."""
+    try:
+        raw = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(raw, list) or len(raw) != len(fields):
+        return None
+    try:
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, raw)]
+    except Exception:
+        return None
+
+
+def keyset_filter(fields, values, descending=True, forward=True) -> Q:
+    """
+    Rows strictly after (forward) or before (backward) `values` in the order
+    given by `fields`, e.g. for ("submitted_at", "id") descending:
+    submitted_at < v0 OR (submitted_at = v0 AND id < v1).
+    """
+    lookup = "lt" if descending == forward else "gt"
+    condition = Q()
+    for i, name in enumerate(fields):
+        equal_prefix = {f: v for f, v in zip(fields[:i], values[:i])}
+        condition |= Q(**equal_prefix, **{f"{name}__{lookup}": values[i]})
+    return condition
+
+
+def keyset_order(fields, descending=True, forward=True):
+    reverse = descending == forward
+    return [f"-{name}" if reverse else name for name in fields]
+
+
+def _row_key(row, fields):
+    if isinstance(row, dict):
+        return [row[name] for name in fields]
+    return [getattr(row, name) for name in fields]
+
+
+def keyset_paginate(queryset, fields, after=None, before=None, page_size=DEFAULT_PAGE_SIZE, descending=True):
+    """
+    One page of `queryset` ordered by `fields` (last field must be unique).
+
+    `after` / `before` are cursors from a previous page's next/previous links.
+    Runs a single query fetching page_size + 1 rows to detect the next page.
+    """
+    model = queryset.model
+    forward = before is None
+    cursor = after if forward else before
+    values = decode_cursor(cursor, fields, model) if cursor else None
+
+    qs = queryset
+    if values is not None:
+        qs = qs.filter(keyset_filter(fields, values, descending=descending, forward=forward))
+    rows = list(qs.order_by(*keyset_order(fields, descending=descending, forward=forward))[:page_size + 1])
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not forward:
+        rows.reverse()
+
+    page = KeysetPage(items=rows)
+    if rows:
+        # Going forward, a previous page exists iff we came from a cursor;
+        # going backward, a next page always exists (the one we came from).
+        if (forward and has_more) or not forward:
+            page.next_cursor = encode_cursor(_row_key(rows[-1], fields))
+        if (forward and values is not None) or (not forward and has_more):
+            page.previous_cursor = encode_cursor(_row_key(rows[0], fields))
+    return page
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large tables (Django admin changelists).
+
+    An unfiltered queryset is counted from the planner statistics in pg_class
+    once the table is past SITE_COUNTERS_ESTIMATE_THRESHOLD rows; filtered
+    querysets and small tables still get an exact COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        from .counters import count_rows
+
+        query = getattr(self.object_list, "query", None)
+        if query is not None and not query.where:
+            return count_rows(self.object_list.model)[0]
+        return super().count
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Iterable, Optional
 
 from django.contrib.auth.models import AnonymousUser
+from django.db.models import OuterRef, Subquery
 
 from .models import Survey, SurveyCollaborator
 
@@ -45,19 +46,89 @@ class SurveyAccess:
         return self.is_owner
 
 
+# Resolved roles are memoized on the user object. `request.user` is loaded once
+# per request by AuthenticationMiddleware, so the memo is request-scoped.
+_ACCESS_CACHE_ATTR = "_survey_access_cache"
+
+
+def _is_anonymous(user) -> bool:
+    return not user or isinstance(user, AnonymousUser) or not getattr(user, "is_authenticated", False)
+
+
+def _access_cache(user) -> Dict[int, SurveyAccess]:
+    cache = getattr(user, _ACCESS_CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(user, _ACCESS_CACHE_ATTR, cache)
+    return cache
+
+
 def get_survey_access(user, survey: Survey) -> SurveyAccess:
 
-    if not user or isinstance(user, AnonymousUser) or not getattr(user, "is_authenticated", False):
+    if _is_anonymous(user):
         return SurveyAccess(role=None)
 
     if survey.creator_id == user.id:
         return SurveyAccess(role=SurveyCollaborator.ROLE_OWNER)
 
-    role = (
-        SurveyCollaborator.objects.filter(survey=survey, user=user)
-        .values_list("role", flat=True)
-        .first()
+    cache = _access_cache(user)
+    if survey.pk not in cache:
+        role = (
+            SurveyCollaborator.objects.filter(survey=survey, user=user)
+            .values_list("role", flat=True)
+            .first()
+        )
+        cache[survey.pk] = SurveyAccess(role=role)
+    return cache[survey.pk]
+
+
+def get_survey_access_many(user, surveys: Iterable[Survey]) -> Dict[int, SurveyAccess]:
+    """Resolve the user's role on every survey with at most one query."""
+    surveys = list(surveys)
+    if _is_anonymous(user):
+        return {survey.pk: SurveyAccess(role=None) for survey in surveys}
+
+    cache = _access_cache(user)
+    missing = [
+        survey.pk for survey in surveys
+        if survey.creator_id != user.id and survey.pk not in cache
+    ]
+    if missing:
+        roles = dict(
+            SurveyCollaborator.objects.filter(user=user, survey_id__in=missing)
+            .values_list("survey_id", "role")
+        )
+        for survey_id in missing:
+            cache[survey_id] = SurveyAccess(role=roles.get(survey_id))
+
+    return {survey.pk: get_survey_access(user, survey) for survey in surveys}
+
+
+def accessible_survey_ids(user):
+    """
+    Ids of the surveys the user created UNION those shared with them.
+
+    Each branch is a plain indexed lookup; use it as `pk__in=` instead of
+    OR-ing across the collaborators join, which needs DISTINCT.
+    """
+    owned = Survey.objects.filter(creator_id=user.pk).order_by().values("id")
+    shared = SurveyCollaborator.objects.filter(user_id=user.pk).order_by().values("survey_id")
+    return owned.union(shared)
+
+
+def survey_role_subquery(user, survey_field: str = "pk") -> Subquery:
+    """
+    Annotation loading the user's collaborator role together with a survey
+    (or with a row pointing to one, e.g. survey_field="survey_id" on Question).
+    """
+    return Subquery(
+        SurveyCollaborator.objects.filter(survey_id=OuterRef(survey_field), user_id=user.pk)
+        .values("role")[:1]
     )
-    return SurveyAccess(role=role)
 
 
+def prime_survey_access(user, survey: Survey, role: Optional[str]) -> SurveyAccess:
+    """Store a role that was loaded alongside the survey, then resolve access."""
+    if not _is_anonymous(user):
+        _access_cache(user)[survey.pk] = SurveyAccess(role=role)
+    return get_survey_access(user, survey)
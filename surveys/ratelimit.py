@@ -0,0 +1,143 @@
+"""
+Rate limiting backed by Django's cache.
+
+A limit of N per period ("10/m" = ten requests a minute) is enforced with a
+sliding-window counter: a counter per fixed window, weighted with the
+previous window's count, so a burst at a window boundary still counts
+against the window before it. Counters are only changed with the cache's
+atomic add/incr/decr (atomic on Redis), so concurrent requests in a burst
+cannot all see the same free budget. (A token bucket would need to update
+its tokens and refill time together, which the cache API cannot do
+atomically.) A request counts once against every bucket it
+maps to (client IP, browser, logged-in user, survey, a posted field such as
+the username); when any bucket is over its limit the view is not called and
+a 429 with Retry-After is returned. The IP/browser/survey/field keys come
+straight from the request, so throttled traffic never reaches the database.
+Keys are checked in order and the first full bucket stops the request, so
+put 'user' (which loads the session) last.
+
+Limits can be overridden per scope with the RATE_LIMITS setting, e.g.
+RATE_LIMITS = {'login': '5/m'}; a value of None disables the scope.
+"""
+
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60); also accepts '10/5m'."""
+    count, _, period = rate.partition('/')
+    multiplier = int(period[:-1] or 1)
+    return int(count), multiplier * PERIODS[period[-1]]
+
+
+def _bucket_key(scope, part, value):
+    digest = hashlib.sha1(str(value).encode('utf-8')).hexdigest()[:20]
+    return f"ratelimit:{scope}:{part}:{digest}"
+
+
+def _incr(key, timeout):
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, timeout=timeout)
+        return 1
+
+
+def hit(key, capacity, period, now=None):
+    """Count one request against the bucket; returns 0 if allowed, else seconds until it would be."""
+    now = time.time() if now is None else now
+    window = int(now // period)
+    elapsed = now - window * period
+    current_key = f"{key}:{window}"
+    count = _incr(current_key, timeout=math.ceil(period) * 2 + 1)
+    previous = cache.get(f"{key}:{window - 1}", 0)
+    # Share of the previous window still inside the sliding period
+    weight = 1 - elapsed / period
+    if previous * weight + count <= capacity:
+        return 0
+
+    # Rejected requests do not use up the budget
+    try:
+        cache.decr(current_key)
+    except ValueError:
+        pass
+    remaining = period - elapsed
+    if previous:
+        # Time until the previous window's weight has dropped enough for one more request
+        remaining = min(remaining, (previous * weight + count - capacity) * period / previous)
+    return max(remaining, 0.001)
+
+
+def _key_value(request, part, view_kwargs):
+    if part == 'ip':
+        from .views.utils import get_client_ip
+
+        return get_client_ip(request)
+    if part == 'browser':
+        # The CSRF cookie CsrfViewMiddleware already checked: one per browser, even behind a shared NAT IP
+        return request.META.get('CSRF_COOKIE')
+    if part == 'user':
+        return request.user.pk if request.user.is_authenticated else None
+    if part == 'survey':
+        return view_kwargs.get('pk') or view_kwargs.get('survey_pk')
+    if part.startswith('post:'):
+        return (request.POST.get(part[5:]) or '').strip().lower() or None
+    raise ValueError(f"Unknown rate limit key: {part}")
+
+
+def _key_values(request, keys, view_kwargs):
+    """Yield (key, value) per bucket; 'ip+survey' combines parts, skipped if any part is missing."""
+    for key in keys:
+        values = [_key_value(request, part, view_kwargs) for part in key.split('+')]
+        if all(v is not None for v in values):
+            yield key, values
+
+
+def _too_many_requests(request, retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    message = 'Bạn thao tác quá nhanh. Vui lòng thử lại sau ít phút.'
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest' or 'application/json' in request.headers.get('accept', ''):
+        response = JsonResponse({'success': False, 'error': message, 'retry_after': retry_after}, status=429)
+    else:
+        # Rendered without the request: no context processors, so no session/user lookup
+        response = HttpResponse(
+            render_to_string('errors/429.html', {'retry_after': retry_after, 'message': message}),
+            status=429,
+        )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(scope, rate, keys=('ip',), methods=('POST',)):
+    """
+    Throttle a view. `keys` picks the buckets: 'ip', 'browser', 'user',
+    'survey' (the pk/survey_pk URL argument), 'post:<field>', or a
+    combination such as 'ip+survey'. Each bucket gets `rate` (overridable through
+    settings.RATE_LIMITS[scope]); only `methods` count.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limits = getattr(settings, 'RATE_LIMITS', {})
+            effective = limits.get(scope, rate)
+            if effective and request.method in methods:
+                capacity, period = parse_rate(effective)
+                for key, values in _key_values(request, keys, kwargs):
+                    retry_after = hit(_bucket_key(scope, key, values), capacity, period)
+                    if retry_after:
+                        return _too_many_requests(request, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,87 @@
+"""
+Per-browser respondent state kept in a signed cookie.
+
+The take flow only needs to remember two things about a visitor: which
+password-protected surveys they unlocked and which surveys they answered
+(with the response id, for the review link). Storing that in the session
+made every anonymous respondent create and update a django_session row; a
+signed cookie keeps the same guarantees (it cannot be forged) without any
+database write.
+"""
+
+import json
+from functools import wraps
+
+from django.conf import settings
+
+COOKIE_NAME = 'survey_respondent'
+SALT = 'surveys.respondent'
+# Oldest entries are dropped so the cookie stays well under the 4 KB limit
+MAX_SURVEYS = 50
+
+
+def _cookie_age():
+    return getattr(settings, 'RESPONDENT_COOKIE_AGE', 60 * 60 * 24 * 365)
+
+
+class RespondentState:
+    def __init__(self, unlocked=None, answered=None):
+        self.unlocked = [int(pk) for pk in unlocked or []]
+        self.answered = {str(k): int(v) for k, v in (answered or {}).items()}
+        self.dirty = False
+
+    @classmethod
+    def from_request(cls, request):
+        raw = request.get_signed_cookie(COOKIE_NAME, default=None, salt=SALT, max_age=_cookie_age())
+        if not raw:
+            return cls()
+        try:
+            data = json.loads(raw)
+            return cls(unlocked=data.get('u'), answered=data.get('a'))
+        except (ValueError, TypeError, AttributeError):
+            return cls()
+
+    def is_unlocked(self, survey_id):
+        return survey_id in self.unlocked
+
+    def unlock(self, survey_id):
+        if survey_id not in self.unlocked:
+            self.unlocked = (self.unlocked + [survey_id])[-MAX_SURVEYS:]
+            self.dirty = True
+
+    def response_id(self, survey_id):
+        return self.answered.get(str(survey_id))
+
+    def has_answered(self, survey_id):
+        return str(survey_id) in self.answered
+
+    def mark_answered(self, survey_id, response_id):
+        self.answered.pop(str(survey_id), None)
+        self.answered[str(survey_id)] = response_id
+        while len(self.answered) > MAX_SURVEYS:
+            self.answered.pop(next(iter(self.answered)))
+        self.dirty = True
+
+    def save(self, response):
+        value = json.dumps({'u': self.unlocked, 'a': self.answered}, separators=(',', ':'))
+        response.set_signed_cookie(
+            COOKIE_NAME,
+            value,
+            salt=SALT,
+            max_age=_cookie_age(),
+            httponly=True,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+            secure=settings.SESSION_COOKIE_SECURE,
+        )
+
+
+def respondent_state(view):
+    """Expose `request.respondent` to the view and write the cookie back if it changed."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.respondent = RespondentState.from_request(request)
+        response = view(request, *args, **kwargs)
+        if request.respondent.dirty:
+            request.respondent.save(response)
+        return response
+    return wrapper
@@ -0,0 +1,311 @@
+"""
+Bulk import of historical responses from CSV (`manage.py import_responses`).
+
+Columns are matched to questions by header: the question text (the format
+written by the CSV export), "Q<id>" / "<id>", or an explicit mapping.
+Choice answers are converted to the stored option text (case and spacing are
+ignored); multiple-choice cells hold several options separated by "|".
+
+On PostgreSQL the validated rows are streamed with COPY (`copy_expert`) into
+a temporary staging table and moved into the responses table with a single
+INSERT ... SELECT; other databases use batched `bulk_create`. An optional id
+column fills `Response.client_id`, so re-running an import skips the rows
+that are already stored.
+"""
+
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .bulk import insert_responses
+from .models import Response, Survey
+from .revisions import get_snapshot
+from .stats import invalidate_survey_stats
+from .terms import rebuild_survey_terms, record_responses_terms
+from .timeline import invalidate_timeline, is_backdated
+
+DEFAULT_TIME_COLUMN = 'Thời gian'
+# Formats written by the CSV/Excel exports, tried after ISO 8601
+TIME_FORMATS = ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S')
+STAGE_TABLE = 'surveys_response_import'
+
+
+class ResponseImportError(Exception):
+    pass
+
+
+def _normalize(value):
+    return ' '.join(str(value).replace('\ufeff', '').split()).casefold()
+
+
+def build_mapping(header, questions, explicit=None, time_column=None, id_column=None):
+    """
+    Resolve CSV columns. Returns (columns, time_index, id_index, ignored):
+    `columns` is a list of (index, question) for importable questions.
+    `explicit` maps header -> question id and wins over automatic matching.
+    """
+    explicit = explicit or {}
+    by_id = {q.id: q for q in questions}
+    by_text = {}
+    for q in questions:
+        by_text.setdefault(_normalize(q.text), q)
+
+    def index_of(name):
+        for i, cell in enumerate(header):
+            if _normalize(cell) == _normalize(name):
+                return i
+        return None
+
+    time_index = index_of(time_column or DEFAULT_TIME_COLUMN)
+    if time_column and time_index is None:
+        raise ResponseImportError(f'Không có cột thời gian "{time_column}"')
+    id_index = index_of(id_column) if id_column else None
+    if id_column and id_index is None:
+        raise ResponseImportError(f'Không có cột mã "{id_column}"')
+
+    explicit = {_normalize(name): qid for name, qid in explicit.items()}
+    columns, ignored, used = [], [], set()
+    for i, cell in enumerate(header):
+        if i in (time_index, id_index):
+            continue
+        key = _normalize(cell)
+        if key in explicit:
+            question = by_id.get(explicit[key])
+            if question is None:
+                raise ResponseImportError(f'Câu hỏi #{explicit[key]} không thuộc khảo sát')
+        else:
+            qid = key[1:] if key.startswith('q') else key
+            question = by_id.get(int(qid)) if qid.isdigit() else by_text.get(key)
+        if question is None or question.question_type not in ('text', 'single', 'multiple'):
+            ignored.append(cell)
+            continue
+        if question.id in used:
+            raise ResponseImportError(f'Câu hỏi "{question.text}" được gán cho nhiều cột')
+        used.add(question.id)
+        columns.append((i, question))
+    if not columns:
+        raise ResponseImportError('Không có cột nào khớp với câu hỏi của khảo sát')
+    for name in explicit:
+        if index_of(name) is None:
+            raise ResponseImportError(f'Không có cột "{name}" trong file')
+    return columns, time_index, id_index, ignored
+
+
+def parse_time(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        for fmt in TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class _Converter:
+    """Turns CSV cells into response_data values; option lookups are built once per question."""
+
+    def __init__(self, columns, separator):
+        self.columns = columns
+        self.separator = separator
+        self.options = {
+            q.id: {_normalize(opt): opt for opt in (q.options or [])}
+            for _, q in columns if q.question_type in ('single', 'multiple')
+        }
+
+    def convert(self, row):
+        errors, data = [], {}
+        for index, question in self.columns:
+            cell = row[index].strip() if index < len(row) else ''
+            if not cell:
+                continue
+            if question.question_type == 'text':
+                data[str(question.id)] = cell
+                continue
+            options = self.options[question.id]
+            parts = [cell] if question.question_type == 'single' else [p for p in cell.split(self.separator) if p.strip()]
+            values = [options.get(_normalize(p)) for p in parts]
+            unknown = [p.strip() for p, v in zip(parts, values) if v is None]
+            if unknown:
+                errors.append(f'"{question.text}": không có lựa chọn {", ".join(unknown)}')
+            elif question.question_type == 'single':
+                data[str(question.id)] = values[0]
+            else:
+                data[str(question.id)] = values
+        return errors, data
+
+
+class ResponseImporter:
+    """
+    Validate CSV rows and write them in batches. `log` receives progress
+    lines; counters are available on the instance after `run`.
+    """
+
+    def __init__(self, survey, batch_size=5000, separator='|', use_copy=None, dry_run=False, log=None):
+        self.survey = survey
+        self.batch_size = batch_size
+        self.separator = separator
+        self.use_copy = connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.dry_run = dry_run
+        self.log = log or (lambda message: None)
+        self.snapshot = get_snapshot(survey)
+        self.read = self.valid = self.imported = self.duplicates = 0
+        self.invalid = []
+        self.oldest = None
+
+    def _rows(self, reader, columns, time_index, id_index):
+        """Yield valid (client_id, submitted_at, response_data); invalid lines are recorded."""
+        converter = _Converter(columns, self.separator)
+        now = timezone.now()
+        seen = set()
+        for line, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            # Excel-style exports may start every line with a byte order mark
+            if row[0].startswith('\ufeff'):
+                row[0] = row[0].lstrip('\ufeff')
+            self.read += 1
+            errors, data = converter.convert(row)
+            submitted_at = now
+            if time_index is not None:
+                submitted_at = parse_time(row[time_index] if time_index < len(row) else '')
+                if submitted_at is None:
+                    errors.append('thời gian không hợp lệ')
+            client_id = None
+            if id_index is not None:
+                client_id = (row[id_index] if id_index < len(row) else '').strip()[:64] or None
+                if client_id in seen:
+                    self.duplicates += 1
+                    continue
+                if client_id:
+                    seen.add(client_id)
+            if errors:
+                self.invalid.append((line, errors))
+                continue
+            if self.oldest is None or submitted_at < self.oldest:
+                self.oldest = submitted_at
+            self.valid += 1
+            yield client_id, submitted_at, data
+
+    def _chunks(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _progress(self, started):
+        elapsed = time.monotonic() - started
+        self.log(f"Đã xử lý {self.read} dòng ({self.read / max(elapsed, 1e-6):.0f} dòng/giây)")
+
+    def run(self, reader, columns, time_index=None, id_index=None):
+        started = time.monotonic()
+        snapshot = self.snapshot
+        chunks = self._chunks(self._rows(reader, columns, time_index, id_index))
+        if self.dry_run:
+            for _ in chunks:
+                self._progress(started)
+        elif self.use_copy:
+            self._copy(chunks, snapshot, started)
+        else:
+            self._bulk_create(chunks, snapshot, started)
+        return time.monotonic() - started
+
+    def _bulk_create(self, chunks, snapshot, started):
+        for chunk in chunks:
+            with transaction.atomic():
+                ids = [client_id for client_id, _, _ in chunk if client_id]
+                stored = set(
+                    Response.objects.filter(survey=self.survey, client_id__in=ids).values_list('client_id', flat=True)
+                ) if ids else set()
+                responses = [
+                    Response(
+                        survey=self.survey,
+                        revision_id=snapshot.revision_id,
+                        submitted_at=submitted_at,
+                        response_data=data,
+                        client_id=client_id,
+                    )
+                    for client_id, submitted_at, data in chunk
+                    if client_id not in stored
+                ]
+                insert_responses(self.survey.pk, responses, snapshot.questions, batch_size=self.batch_size)
+            self.imported += len(responses)
+            self.duplicates += len(chunk) - len(responses)
+            self._progress(started)
+
+    def _copy(self, chunks, snapshot, started):
+        table = connection.ops.quote_name(Response._meta.db_table)
+        stage = connection.ops.quote_name(STAGE_TABLE)
+        staged = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE {stage} ("
+                "submitted_at timestamptz NOT NULL, response_data jsonb NOT NULL, client_id varchar(64)"
+                ") ON COMMIT DROP"
+            )
+            for chunk in chunks:
+                # Rows already stored are left out here, so the staged rows are
+                # exactly the ones inserted below and their terms can be counted
+                # chunk by chunk instead of rescanning the survey afterwards
+                ids = [client_id for client_id, _, _ in chunk if client_id]
+                stored = set(
+                    Response.objects.filter(survey=self.survey, client_id__in=ids).values_list('client_id', flat=True)
+                ) if ids else set()
+                chunk = [row for row in chunk if row[0] not in stored]
+                self.duplicates += len(stored)
+                record_responses_terms(snapshot.questions, [data for _, _, data in chunk])
+
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for client_id, submitted_at, data in chunk:
+                    writer.writerow([submitted_at.isoformat(), json.dumps(data, ensure_ascii=False), client_id])
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {stage} (submitted_at, response_data, client_id) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+                staged += len(chunk)
+                self._progress(started)
+
+            if not staged:
+                return
+            self.log("Đang chuyển dữ liệu từ bảng tạm...")
+            cursor.execute(
+                f"INSERT INTO {table} (survey_id, revision_id, submitted_at, response_data, client_id) "
+                f"SELECT %s, %s, s.submitted_at, s.response_data, s.client_id FROM {stage} s "
+                f"WHERE s.client_id IS NULL OR NOT EXISTS ("
+                f"SELECT 1 FROM {table} r WHERE r.survey_id = %s AND r.client_id = s.client_id)",
+                [self.survey.pk, snapshot.revision_id, self.survey.pk],
+            )
+            self.imported = cursor.rowcount
+            self.duplicates += staged - self.imported
+
+            Survey.objects.filter(pk=self.survey.pk).update(response_count=F('response_count') + self.imported)
+            if self.imported != staged:
+                # Rows with the same ids were stored concurrently: the counted terms are off
+                self.log("Đang tính lại bảng đếm từ khóa...")
+                rebuild_survey_terms(self.survey)
+            if is_backdated(self.oldest):
+                invalidate_timeline(self.survey.pk, since=self.oldest)
+            survey_id = self.survey.pk
+            transaction.on_commit(lambda: invalidate_survey_stats(survey_id))
@@ -0,0 +1,176 @@
+"""
+Immutable snapshots of a survey's questions, one per `Survey.revision`.
+
+Publishing freezes the current questions into a `SurveyRevision` and points
+`Survey.published_revision` at it; the take path serves that snapshot from
+the cache. Because any edit bumps the revision, an edited live survey is
+republished under a new number and key — cached entries never need to be
+invalidated.
+
+A survey that was never published gets a lazily frozen draft snapshot (take
+preview, kiosk, import) that does not publish anything. Revisions that are
+not published and that no response points at are pruned beyond the newest
+DRAFT_REVISIONS_KEPT, so viewing a survey after every edit does not grow the
+table without bound.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import PendingResponse, Response, Survey, SurveyRevision
+
+# Snapshot keys per question (compact JSON stored in SurveyRevision.definition)
+_FIELDS = ('id', 'text', 'question_type', 'order', 'is_required', 'subtitle', 'media_url', 'options')
+# Unreferenced, unpublished revisions kept per survey (older ones are pruned)
+DRAFT_REVISIONS_KEPT = 10
+# Lock-free databases only: how often to re-read questions edited mid-freeze
+FREEZE_ATTEMPTS = 3
+
+
+@dataclass(frozen=True)
+class FrozenQuestion:
+    """Read-only stand-in for Question with the attributes templates and validation use."""
+
+    id: int
+    text: str
+    question_type: str
+    order: int
+    is_required: bool
+    subtitle: str
+    media_url: str
+    options: List[str]
+
+    @property
+    def pk(self):
+        return self.id
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    revision_id: Optional[int]
+    number: int
+    questions: Tuple[FrozenQuestion, ...]
+
+
+def _cache_key(survey_id, number):
+    return f"survey_snapshot:{survey_id}:r{number}"
+
+
+def _definition(survey):
+    return [
+        [getattr(q, name) if name != 'options' else (q.options or []) for name in _FIELDS]
+        for q in survey.questions.all().order_by('order', 'pk')
+    ]
+
+
+def _snapshot(revision):
+    return Snapshot(
+        revision_id=revision.pk,
+        number=revision.number,
+        questions=tuple(FrozenQuestion(*row) for row in revision.definition),
+    )
+
+
+def _store_revision(survey, number=None):
+    """
+    Stored revision `number` (default: the survey's current revision) of the
+    survey; returns (revision, created).
+
+    The number and the questions are read together under a lock on the survey
+    row: every question write bumps the revision through that row, so the
+    frozen questions always belong to the number they are stored under.
+    """
+    if number is not None:
+        revision = SurveyRevision.objects.filter(survey=survey, number=number).first()
+        if revision is not None:
+            return revision, False
+
+    for _ in range(FREEZE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                current = Survey.objects.select_for_update().values_list('revision', flat=True).get(pk=survey.pk)
+                revision = SurveyRevision.objects.filter(survey=survey, number=current).first()
+                if revision is not None:
+                    return revision, False
+                definition = _definition(survey)
+                # Databases without row locks: an edit committed in between
+                # would store the new questions under the old number
+                if Survey.objects.values_list('revision', flat=True).get(pk=survey.pk) != current:
+                    continue
+                return SurveyRevision.objects.create(survey=survey, number=current, definition=definition), True
+        except IntegrityError:
+            # Frozen concurrently by another request
+            return SurveyRevision.objects.get(survey=survey, number=current), False
+    raise RuntimeError(f"Survey {survey.pk} keeps changing; could not freeze a revision")
+
+
+def _prune_draft_revisions(survey_id):
+    """Delete old revisions that were never published and that no (pending) response uses."""
+    published_id = Survey.objects.values_list('published_revision_id', flat=True).get(pk=survey_id)
+    drafts = (
+        SurveyRevision.objects.filter(survey_id=survey_id)
+        .exclude(pk=published_id)
+        .exclude(Exists(Response.objects.filter(revision=OuterRef('pk'))))
+        .exclude(Exists(PendingResponse.objects.filter(revision=OuterRef('pk'))))
+        .order_by('-number')
+        .values_list('pk', flat=True)
+    )
+    stale = list(drafts[DRAFT_REVISIONS_KEPT:])
+    if stale:
+        SurveyRevision.objects.filter(pk__in=stale).delete()
+
+
+def freeze_revision(survey):
+    """Store (or reuse) the snapshot for the survey's current revision and mark it published."""
+    revision, created = _store_revision(survey)
+    if survey.published_revision_id != revision.pk:
+        Survey.objects.filter(pk=survey.pk).update(published_revision=revision)
+    if created:
+        _prune_draft_revisions(survey.pk)
+    survey.revision = revision.number
+    survey.published_revision = revision
+    return revision
+
+
+def _cached(revision):
+    snapshot = _snapshot(revision)
+    cache.set(
+        _cache_key(revision.survey_id, snapshot.number), snapshot,
+        timeout=getattr(settings, 'SURVEY_SNAPSHOT_CACHE_TIMEOUT', 86400),
+    )
+    return snapshot
+
+
+def get_snapshot(survey):
+    """
+    Snapshot served to respondents, from the cache when possible.
+
+    A published survey serves its published revision; an active one edited
+    since publishing is republished first, so edits to a live survey still
+    reach respondents. Only a never published survey gets a lazily frozen
+    (unpublished) draft revision.
+    """
+    if survey.published_revision_id is not None and not survey.is_active:
+        revision = SurveyRevision.objects.get(pk=survey.published_revision_id)
+        return cache.get(_cache_key(survey.pk, revision.number)) or _cached(revision)
+
+    snapshot = cache.get(_cache_key(survey.pk, survey.revision))
+    if snapshot is not None and survey.published_revision_id in (None, snapshot.revision_id):
+        return snapshot
+
+    if survey.published_revision_id is not None:
+        return _cached(freeze_revision(survey))
+    revision, created = _store_revision(survey, survey.revision)
+    if created:
+        _prune_draft_revisions(survey.pk)
+    return _cached(revision)
+
+
+def revision_questions(revision):
+    """Questions of a stored revision, e.g. to show a response as it was answered."""
+    return _snapshot(revision).questions
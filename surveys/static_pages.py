@@ -0,0 +1,110 @@
+"""
+Prerendered take pages for surveys in "static publish" mode.
+
+The take page of such a survey is rendered once per revision to
+STATIC_TAKE_ROOT/<id>/index.html and served straight by the proxy at
+STATIC_TAKE_URL, so viewing it runs no Python at all. Nothing is served from
+there unless STATIC_TAKE_URL is configured: without it the take page is
+always rendered by the view. The page
+fetches a CSRF token and posts to the lean `survey_submit` endpoint, which
+enforces every gate (open/closed, limits, one response only, captcha) itself.
+
+Only surveys without a password or invite list qualify: those gates need
+a per-visitor check before the form is shown.
+"""
+
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .buffer import is_full
+from .models import Survey
+from .revisions import get_snapshot
+
+TEMPLATE_NAME = 'surveys/survey_management/survey_take.html'
+
+
+def _root():
+    return Path(getattr(settings, 'STATIC_TAKE_ROOT', Path(settings.MEDIA_ROOT) / 'take'))
+
+
+def page_path(survey_id):
+    return _root() / str(survey_id) / 'index.html'
+
+
+def is_enabled():
+    """Static pages are only used where something is configured to serve them."""
+    return bool(getattr(settings, 'STATIC_TAKE_URL', ''))
+
+
+def page_url(survey_id):
+    return f"{settings.STATIC_TAKE_URL.rstrip('/')}/{survey_id}/index.html"
+
+
+def is_static_eligible(survey, now=None):
+    """Whether the survey's take page may currently be served as a static file."""
+    now = now or timezone.now()
+    return bool(
+        is_enabled()
+        and survey.static_publish
+        and survey.is_active
+        and not survey.is_deleted
+        and not survey.password
+        and not survey.invite_count
+        and not (survey.starts_at and survey.starts_at > now)
+        and not (survey.expires_at and survey.expires_at < now)
+        and not is_full(survey)
+    )
+
+
+def render_static_page(survey):
+    """Render the take page for the survey's current revision and write it atomically."""
+    snapshot = get_snapshot(survey)
+    html = render_to_string(TEMPLATE_NAME, {
+        'survey': survey,
+        'questions': snapshot.questions,
+        'revision': snapshot.number,
+        'questions_cache_timeout': getattr(settings, 'SURVEY_SNAPSHOT_CACHE_TIMEOUT', 86400),
+        'need_password': False,
+        'back_url': reverse('surveys:home'),
+        'TURNSTILE_SITE_KEY': settings.CLOUDFLARE_TURNSTILE_SITE_KEY,
+        'static_page': True,
+        'static_revision': snapshot.number,
+        'submit_url': reverse('surveys:survey_submit', args=[survey.pk]),
+        'csrf_url': reverse('surveys:survey_csrf'),
+    })
+
+    path = page_path(survey.pk)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.write_text(html, encoding='utf-8')
+    os.replace(tmp, path)
+
+    Survey.objects.filter(pk=survey.pk).update(static_revision=snapshot.number)
+    survey.static_revision = snapshot.number
+    return path
+
+
+def remove_static_page(survey):
+    page_path(survey.pk).unlink(missing_ok=True)
+    Survey.objects.filter(pk=survey.pk).update(static_revision=None)
+    survey.static_revision = None
+
+
+def sync_static_page(survey, force=False):
+    """
+    Bring the survey's static page in line with its settings and revision.
+    Returns the page URL, or None when the survey is not served statically.
+    """
+    survey.refresh_from_db(fields=['revision', 'static_revision', 'response_count', 'invite_count'])
+    if not is_static_eligible(survey):
+        if survey.static_revision is not None or page_path(survey.pk).exists():
+            remove_static_page(survey)
+        return None
+    if force or survey.static_revision != survey.revision or not page_path(survey.pk).exists():
+        render_static_page(survey)
+    return page_url(survey.pk)
@@ -0,0 +1,322 @@
+"""
+Per-question statistics shared by the results page and the builder.
+
+All responses of a survey are read in a single pass and the resulting payload
+(plain dicts/lists only) is cached. The cache key carries a per-survey version
+that is bumped whenever a question or response changes, so stale entries are
+never read and simply expire.
+
+Only one request computes a given version: while it runs, the others serve
+the last computed payload (marked with its older version) instead of starting
+their own full scan.
+"""
+
+import re
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from .models import ResponseAttachment
+from .terms import get_top_terms
+
+STATS_QUESTION_TYPES = ('text', 'single', 'multiple', 'upload')
+SAMPLE_SIZE = 10
+
+# A text question is treated as numeric when at least this share of its
+# (non-empty) answers parse as numbers.
+NUMERIC_MIN_ANSWERS = 3
+NUMERIC_MIN_RATIO = 0.8
+HISTOGRAM_MAX_BINS = 10
+
+_NUMBER_RE = re.compile(r"^[+-]?(\d+([.,]\d+)*)$")
+
+
+# Upper bound for one computation; a crashed worker's lock expires after this
+COMPUTE_LOCK_TIMEOUT = 120
+
+
+def _version_key(survey_id):
+    return f"survey_stats_version:{survey_id}"
+
+
+def _latest_key(survey_id):
+    return f"survey_stats_latest:{survey_id}"
+
+
+def get_stats_version(survey_id):
+    version = cache.get(_version_key(survey_id))
+    if version is None:
+        version = 1
+        cache.add(_version_key(survey_id), version, timeout=None)
+    return version
+
+
+def invalidate_survey_stats(survey_id):
+    try:
+        cache.incr(_version_key(survey_id))
+    except ValueError:
+        cache.set(_version_key(survey_id), 2, timeout=None)
+
+
+def parse_number(value):
+    """
+    Parse "25", "4.5", "4,5", "1.000.000" or "1,234.5" into a float.
+
+    Vietnamese writes "." for thousands and "," for decimals while many users
+    type the English form, so: with both separators the last one is the decimal
+    mark; a single separator followed by exactly three digits is grouping.
+    """
+    text = value.strip().replace(" ", "")
+    if not _NUMBER_RE.match(text):
+        return None
+
+    last_dot, last_comma = text.rfind("."), text.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        decimal_mark = "." if last_dot > last_comma else ","
+        group_mark = "," if decimal_mark == "." else "."
+        text = text.replace(group_mark, "").replace(decimal_mark, ".")
+    elif last_dot >= 0 or last_comma >= 0:
+        mark = "." if last_dot >= 0 else ","
+        parts = text.split(mark)
+        if len(parts) > 2 or len(parts[-1]) == 3:
+            text = text.replace(mark, "")
+        else:
+            text = text.replace(mark, ".")
+
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def numeric_summary(raw_values):
+    """Count/mean/median/std/percentiles/histogram, or None if not numeric."""
+    if len(raw_values) < NUMERIC_MIN_ANSWERS:
+        return None
+
+    parsed = [parse_number(v) for v in raw_values]
+    values = np.array([v for v in parsed if v is not None], dtype=float)
+    if values.size < NUMERIC_MIN_ANSWERS or values.size < NUMERIC_MIN_RATIO * len(raw_values):
+        return None
+
+    p0, p25, p50, p75, p90, p100 = np.percentile(values, [0, 25, 50, 75, 90, 100])
+    bins = min(HISTOGRAM_MAX_BINS, int(np.unique(values).size)) or 1
+    hist_counts, edges = np.histogram(values, bins=bins)
+    hist_max = int(hist_counts.max()) if hist_counts.size else 0
+
+    return {
+        'count': int(values.size),
+        'ignored': len(raw_values) - int(values.size),
+        'mean': round(float(values.mean()), 2),
+        'median': round(float(p50), 2),
+        'std': round(float(values.std(ddof=1)) if values.size > 1 else 0.0, 2),
+        'min': round(float(p0), 2),
+        'max': round(float(p100), 2),
+        'p25': round(float(p25), 2),
+        'p75': round(float(p75), 2),
+        'p90': round(float(p90), 2),
+        'histogram': [
+            {
+                'start': round(float(edges[i]), 2),
+                'end': round(float(edges[i + 1]), 2),
+                'count': int(hist_counts[i]),
+                'percentage': round(float(hist_counts[i]) / hist_max * 100, 1) if hist_max else 0,
+            }
+            for i in range(len(hist_counts))
+        ],
+    }
+
+
+def _upload_stats(survey, upload_question_ids):
+    if not upload_question_ids:
+        return {}, {}
+
+    totals = dict(
+        ResponseAttachment.objects
+        .filter(response__survey=survey, question_id__in=upload_question_ids)
+        .values_list('question_id')
+        .annotate(n=Count('id'))
+    )
+    samples = {qid: [] for qid in upload_question_ids}
+    rows = (
+        ResponseAttachment.objects
+        .filter(response__survey=survey, question_id__in=upload_question_ids)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=[F('question_id')],
+            order_by=[F('uploaded_at').desc(), F('id').desc()],
+        ))
+        .filter(rank__lte=SAMPLE_SIZE)
+        .order_by('question_id', 'rank')
+    )
+    for att in rows:
+        samples[att.question_id].append({
+            'name': att.original_name or att.file.name,
+            'url': att.file.url,
+        })
+    return totals, samples
+
+
+def compute_survey_stats(survey, questions):
+    """Build the cacheable stats payload in one pass over the responses."""
+    questions = [q for q in questions if q.question_type in STATS_QUESTION_TYPES]
+
+    text_answers = {q.id: [] for q in questions if q.question_type == 'text'}
+    choice_counts = {}
+    option_positions = {}
+    for q in questions:
+        if q.question_type in ('single', 'multiple'):
+            options = q.options or []
+            choice_counts[q.id] = [0] * len(options)
+            positions = {}
+            for idx, option_text in enumerate(options):
+                positions.setdefault(option_text, []).append(idx)
+            option_positions[q.id] = positions
+
+    multiple_ids = {q.id for q in questions if q.question_type == 'multiple'}
+
+    total_responses = 0
+    for data in survey.responses.values_list('response_data', flat=True).iterator(chunk_size=2000):
+        total_responses += 1
+        if not data:
+            continue
+        for qid, answers in text_answers.items():
+            value = data.get(str(qid))
+            if isinstance(value, str) and value.strip():
+                answers.append(value)
+        for qid, counts in choice_counts.items():
+            value = data.get(str(qid))
+            if qid in multiple_ids and isinstance(value, list):
+                selected = {v for v in value if isinstance(v, str)}
+            elif qid not in multiple_ids and isinstance(value, str):
+                selected = (value,)
+            else:
+                continue
+            positions = option_positions[qid]
+            for option_text in selected:
+                for idx in positions.get(option_text, ()):
+                    counts[idx] += 1
+
+    top_terms = get_top_terms(list(text_answers))
+    upload_totals, upload_samples = _upload_stats(
+        survey, [q.id for q in questions if q.question_type == 'upload']
+    )
+
+    per_question = {}
+    for q in questions:
+        if q.question_type == 'text':
+            answers = text_answers[q.id]
+            per_question[q.id] = {
+                'type': 'text',
+                'answers': answers[:SAMPLE_SIZE],
+                'total': len(answers),
+                'top_terms': top_terms[q.id]['terms'],
+                'top_bigrams': top_terms[q.id]['bigrams'],
+                'numeric': numeric_summary(answers),
+            }
+        elif q.question_type == 'upload':
+            per_question[q.id] = {
+                'type': 'upload',
+                'attachments': upload_samples.get(q.id, []),
+                'total': upload_totals.get(q.id, 0),
+            }
+        else:
+            per_question[q.id] = {
+                'type': q.question_type,
+                'options': list(q.options or []),
+                'counts': choice_counts[q.id],
+            }
+
+    return {'total_responses': total_responses, 'questions': per_question}
+
+
+def get_survey_stats(survey, questions):
+    """
+    Cached payload for `compute_survey_stats`; payload['version'] is the stats
+    version it was computed for, which may be older than the current one while
+    another request is computing the current one.
+    """
+    version = get_stats_version(survey.pk)
+    key = f"survey_stats:{survey.pk}:v{version}"
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    lock = f"{key}:lock"
+    if not cache.add(lock, True, timeout=COMPUTE_LOCK_TIMEOUT):
+        previous = cache.get(_latest_key(survey.pk))
+        if previous is not None:
+            return previous
+        # Nothing computed yet to fall back on: compute without the lock
+    try:
+        payload = compute_survey_stats(survey, questions)
+        payload['version'] = version
+        timeout = getattr(settings, 'SURVEY_STATS_CACHE_TIMEOUT', 300)
+        cache.set(key, payload, timeout=timeout)
+        cache.set(_latest_key(survey.pk), payload, timeout=timeout)
+    finally:
+        cache.delete(lock)
+    return payload
+
+
+def _percentages(counts, base):
+    return [round(count / base * 100, 1) if base > 0 else 0 for count in counts]
+
+
+def chart_payload(payload, question_ids=None, percentage_base='selected'):
+    """
+    Compact chart data for choice questions: {question_id: {labels, counts, percentages}}.
+
+    percentage_base='selected' divides by the total number of selections (same
+    denominator as the doughnut chart); 'responses' divides by the number of
+    responses.
+    """
+    total_responses = payload['total_responses']
+    charts = {}
+    for qid, data in payload['questions'].items():
+        if data['type'] not in ('single', 'multiple'):
+            continue
+        if question_ids is not None and qid not in question_ids:
+            continue
+        counts = data['counts']
+        base = sum(counts) if percentage_base == 'selected' else total_responses
+        charts[qid] = {
+            'type': data['type'],
+            'labels': data['options'],
+            'counts': counts,
+            'percentages': _percentages(counts, base),
+            'total': total_responses,
+            'total_selected': sum(counts),
+        }
+    return charts
+
+
+def build_stats_context(survey, questions):
+    """
+    Template-ready stats list (one dict per question, with the model attached).
+
+    Choice questions only carry their totals here; labels and counts are
+    served by the stats API (`chart_payload`) and loaded lazily by the pages.
+    """
+    questions = list(questions)
+    payload = get_survey_stats(survey, questions)
+    total_responses = payload['total_responses']
+
+    stats = []
+    for question in questions:
+        data = payload['questions'].get(question.id)
+        if data is None:
+            continue
+        stat = {'question': question, 'type': data['type']}
+
+        if data['type'] in ('text', 'upload'):
+            stat.update({k: v for k, v in data.items() if k != 'type'})
+        else:
+            stat['total'] = total_responses
+            stat['total_selected'] = sum(data['counts'])
+        stats.append(stat)
+
+    return stats, total_responses
@@ -1,18 +1,18 @@
 from django import template
-from django.contrib.auth.models import User
+
+from ..admin_stats import get_admin_stats as _get_admin_stats
 
 register = template.Library()
 
 
 @register.simple_tag
 def get_admin_stats():
-    """Thống kê tối giản cho admin (tập trung người dùng)"""
-    users = User.objects.all()
+    """Thống kê tối giản cho admin (tập trung người dùng), dùng chung cache với dashboard admin"""
+    stats = _get_admin_stats()
 
     return {
-        'total_users': users.count(),
-        'total_staff': users.filter(is_staff=True).count(),
-        'total_superusers': users.filter(is_superuser=True).count(),
-        'recent_users': users.order_by('-date_joined')[:10],
+        'total_users': stats['total_users'],
+        'total_staff': stats['total_staff'],
+        'total_superusers': stats['total_superusers'],
+        'recent_users': stats['recent_users'],
     }
-
@@ -0,0 +1,199 @@
+"""
+Term-frequency summaries for text questions.
+
+Counts of words (unigrams) and word pairs (bigrams) are kept per question in
+`QuestionTermCount` and updated incrementally whenever a response is saved,
+edited or deleted, so the stats panels can show top terms without
+re-tokenizing every answer.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Question, QuestionTermCount
+
+MAX_TERM_LENGTH = 100
+LOCK_CHUNK = 500
+
+# Vietnamese is written one syllable per space-separated token, so most
+# function words are single syllables. A few common English words are included
+# because mixed-language answers are frequent.
+VIETNAMESE_STOPWORDS = frozenset("""
+    à ạ ai anh ấy bà bạn bị bởi các cái cả cần càng chỉ chiếc cho chứ chưa chúng
+    có còn của cũng cùng đã đang đây để đến đều đi điều do đó được gì hay hãy hơn
+    họ hoặc khi không là lại lên lắm mà mình một này nào nên nếu nha nhé nhiều như
+    nhưng những nó ở ơi ra rằng rất rồi sau sẽ so tại tôi thì thế theo thêm thôi
+    trên trong từ và vào vậy về vì với vẫn xuống em chị ông mỗi nữa qua quá
+    a an and are as at be but by for from has have i in is it its of on or so that
+    the this to was we were with you
+""".split())
+
+_SEGMENT_SPLIT_RE = re.compile(r"[.,;:!?…()\[\]{}\"“”'‘’/\\|<>\-–—\n\r\t]+")
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def normalize_text(text):
+    # Vietnamese input may arrive decomposed (NFD) from some keyboards/OSes
+    return unicodedata.normalize("NFC", text or "").lower()
+
+
+def tokenize(text):
+    """Split text into segments (between punctuation), each a list of normalized words."""
+    segments = []
+    for chunk in _SEGMENT_SPLIT_RE.split(normalize_text(text)):
+        words = _WORD_RE.findall(chunk)
+        if words:
+            segments.append(words)
+    return segments
+
+
+def _is_term(word):
+    return len(word) > 1 and word not in VIETNAMESE_STOPWORDS
+
+
+def extract_terms(text):
+    """Return (unigram Counter, bigram Counter) for one answer."""
+    unigrams = Counter()
+    bigrams = Counter()
+    for words in tokenize(text):
+        for word in words:
+            if _is_term(word):
+                unigrams[word[:MAX_TERM_LENGTH]] += 1
+        # Bigrams never cross punctuation or stopwords: "giáo viên", "chất lượng"
+        for first, second in zip(words, words[1:]):
+            if not (_is_term(first) and _is_term(second)):
+                continue
+            bigrams[f"{first} {second}"[:MAX_TERM_LENGTH]] += 1
+    return unigrams, bigrams
+
+
+def _collect_deltas(text_question_ids, response_data_iter):
+    deltas = Counter()
+    for response_data in response_data_iter:
+        if not response_data:
+            continue
+        for qid in text_question_ids:
+            answer = response_data.get(str(qid))
+            if not isinstance(answer, str) or not answer.strip():
+                continue
+            unigrams, bigrams = extract_terms(answer)
+            for term, count in unigrams.items():
+                deltas[(qid, QuestionTermCount.NGRAM_WORD, term)] += count
+            for term, count in bigrams.items():
+                deltas[(qid, QuestionTermCount.NGRAM_BIGRAM, term)] += count
+    return deltas
+
+
+def _apply_deltas(deltas):
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        # Insert missing rows first (count=0) so the increment below is exact
+        # even when two submissions introduce the same new term concurrently.
+        QuestionTermCount.objects.bulk_create(
+            [
+                QuestionTermCount(question_id=qid, ngram=ngram, term=term, count=0)
+                for (qid, ngram, term), delta in deltas.items() if delta > 0
+            ],
+            ignore_conflicts=True,
+            batch_size=500,
+        )
+        # Lock exactly the touched (question, ngram, term) rows, a chunk at a
+        # time and always in key order; filtering on question and term
+        # separately would lock their whole cross product.
+        keys = sorted(deltas)
+        changed = []
+        for start in range(0, len(keys), LOCK_CHUNK):
+            match = Q()
+            for qid, ngram, term in keys[start:start + LOCK_CHUNK]:
+                match |= Q(question_id=qid, ngram=ngram, term=term)
+            rows = (
+                QuestionTermCount.objects
+                .select_for_update()
+                .filter(match)
+                .order_by('question_id', 'ngram', 'term')
+            )
+            for row in rows:
+                delta = deltas.get((row.question_id, row.ngram, row.term))
+                if delta:
+                    row.count = max(row.count + delta, 0)
+                    changed.append(row)
+        QuestionTermCount.objects.bulk_update(changed, ["count"], batch_size=500)
+
+
+def record_response_terms(questions, response_data):
+    """Add the terms of one newly saved response to the counters."""
+    record_responses_terms(questions, [response_data])
+
+
+def record_responses_terms(questions, response_data_list):
+    text_question_ids = [q.id for q in questions if q.question_type == 'text']
+    if not text_question_ids:
+        return
+    _apply_deltas(_collect_deltas(text_question_ids, response_data_list))
+
+
+def update_response_terms(survey_id, old_data, new_data):
+    """Adjust the counters after a stored response was edited (old -> new) or deleted (new_data=None)."""
+    text_question_ids = list(
+        Question.objects.filter(survey_id=survey_id, question_type='text').values_list('id', flat=True)
+    )
+    if not text_question_ids:
+        return
+    deltas = _collect_deltas(text_question_ids, [new_data])
+    deltas.subtract(_collect_deltas(text_question_ids, [old_data]))
+    _apply_deltas({key: delta for key, delta in deltas.items() if delta})
+
+
+def rebuild_survey_terms(survey):
+    """Recompute every counter of a survey from its stored responses."""
+    text_question_ids = list(
+        survey.questions.filter(question_type='text').values_list('id', flat=True)
+    )
+    data_iter = survey.responses.values_list('response_data', flat=True).iterator(chunk_size=2000)
+    deltas = _collect_deltas(text_question_ids, data_iter)
+
+    with transaction.atomic():
+        QuestionTermCount.objects.filter(question__survey=survey).delete()
+        QuestionTermCount.objects.bulk_create(
+            [
+                QuestionTermCount(question_id=qid, ngram=ngram, term=term, count=count)
+                for (qid, ngram, term), count in deltas.items()
+            ],
+            batch_size=1000,
+        )
+    return len(deltas)
+
+
+def get_top_terms(question_ids, limit=10):
+    """
+    Top terms for several questions in one query.
+
+    Returns {question_id: {'terms': [(term, count), ...], 'bigrams': [...]}}.
+    """
+    result = {qid: {'terms': [], 'bigrams': []} for qid in question_ids}
+    if not result:
+        return result
+
+    rows = (
+        QuestionTermCount.objects
+        .filter(question_id__in=question_ids, count__gt=0)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=[F('question_id'), F('ngram')],
+            order_by=[F('count').desc(), F('term').asc()],
+        ))
+        .filter(rank__lte=limit)
+        .order_by('question_id', 'ngram', 'rank')
+        .values_list('question_id', 'ngram', 'term', 'count')
+    )
+    for qid, ngram, term, count in rows:
+        key = 'terms' if ngram == QuestionTermCount.NGRAM_WORD else 'bigrams'
+        result[qid][key].append((term, count))
+    return result
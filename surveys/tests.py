@@ -1,3 +1,1259 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin_stats import compute_admin_stats, get_admin_stats
+from .admission import SLOTS_KEY, concurrency_limit
+from .buffer import buffer_response, flush_pending, is_full
+from .builder import BatchError, current_revision, definition_etag, export_definition, import_definition
+from .bulk import delete_responses, insert_responses
+from .campaigns import create_campaign, send_campaign
+from .counters import get_site_counters, recount_survey_responses, refresh_site_counters
+from .kiosk import create_device
+from .models import (
+    InviteCampaign, KioskDevice, PendingResponse, Question, QuestionTermCount, Response, ResponseTimelineBucket,
+    Survey, SurveyCollaborator, SurveyInvite, SurveyRevision,
+)
+from .pagination import EstimatedCountPaginator, encode_cursor
+from .permissions import accessible_survey_ids, get_survey_access, get_survey_access_many
+from .ratelimit import hit
+from .respondent import COOKIE_NAME
+from .response_import import ResponseImporter, build_mapping
+from .revisions import freeze_revision, get_snapshot, revision_questions
+from .static_pages import page_path, sync_static_page
+from .stats import (
+    get_stats_version, get_survey_stats, invalidate_survey_stats, numeric_summary, parse_number,
+)
+from .terms import record_response_terms
+from .timeline import DAY, get_timeline
+from .views.results import RESPONSES_PAGE_SIZE
+
+
+class SurveyListQueryCountTests(TestCase):
+    """survey_list / dashboard must not scale their query count with the data."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.other = User.objects.create_user("other", "other@example.com", "pw")
+
+    def setUp(self):
+        cache.clear()
+
+    def _add_surveys(self, count, responses_each=2):
+        for i in range(count):
+            creator = self.user if i % 2 == 0 else self.other
+            survey = Survey.objects.create(title=f"Khảo sát {i}", creator=creator)
+            if creator != self.user:
+                SurveyCollaborator.objects.create(
+                    survey=survey, user=self.user, role=SurveyCollaborator.ROLE_EDITOR
+                )
+            Question.objects.create(survey=survey, text="Câu hỏi", question_type="text")
+            for _ in range(responses_each):
+                Response.objects.create(survey=survey, response_data={})
+
+    def _query_count(self, url_name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_survey_list_constant_queries(self):
+        self.client.force_login(self.user)
+        self._add_surveys(2)
+        small = self._query_count("surveys:survey_list")
+        self._add_surveys(30, responses_each=5)
+        self.assertEqual(self._query_count("surveys:survey_list"), small)
+
+    def test_dashboard_constant_queries(self):
+        self.client.force_login(self.user)
+        self._add_surveys(2)
+        refresh_site_counters()
+        small = self._query_count("surveys:dashboard")
+        self._add_surveys(30, responses_each=5)
+        self.assertEqual(self._query_count("surveys:dashboard"), small)
+
+    def test_survey_list_pages_and_counts(self):
+        self.client.force_login(self.user)
+        self._add_surveys(15, responses_each=3)
+        first = self.client.get(reverse("surveys:survey_list"))
+        page = first.context["page"]
+        self.assertTrue(page.has_next)
+        self.assertEqual(page.items[0].response_count, 3)
+        self.assertEqual(page.items[0].question_count, 1)
+
+        second = self.client.get(reverse("surveys:survey_list"), {"after": page.next_cursor})
+        ids = {s.pk for s in page.items} | {s.pk for s in second.context["page"].items}
+        self.assertEqual(len(ids), 15)
+
+
+class ResponseAdminChangelistTests(TestCase):
+    """The Response changelist must cost the same whatever the table size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("root", "root@example.com", "pw")
+        cls.respondent = User.objects.create_user("respondent", "r@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.admin)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def _add_responses(self, count):
+        Response.objects.bulk_create(
+            Response(survey=self.survey, respondent=self.respondent, response_data={})
+            for _ in range(count)
+        )
+
+    def _changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("admin:surveys_response_changelist"), params)
+        self.assertEqual(response.status_code, 200)
+        return ctx.captured_queries
+
+    def test_changelist_constant_queries(self):
+        self._add_responses(5)
+        small = len(self._changelist_queries())
+        self._add_responses(500)
+        self.assertEqual(len(self._changelist_queries()), small)
+
+    def test_survey_filter_constant_queries(self):
+        self._add_responses(5)
+        small = len(self._changelist_queries(survey_id=self.survey.pk))
+        self._add_responses(500)
+        queries = self._changelist_queries(survey_id=self.survey.pk)
+        self.assertEqual(len(queries), small)
+        # show_full_result_count=False: no second, unfiltered COUNT(*)
+        self.assertEqual(sum("COUNT(" in q["sql"].upper() for q in queries), 1)
+
+    def test_filtered_changelist_never_counts_the_whole_table(self):
+        self._add_responses(5)
+        other = Survey.objects.create(title="Khác", creator=self.admin)
+        Response.objects.create(survey=other, response_data={})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("admin:surveys_response_changelist"), {"survey_id": other.pk})
+        self.assertIsInstance(response.context["cl"].paginator, EstimatedCountPaginator)
+        self.assertEqual(response.context["cl"].result_count, 1)
+        counts = [q["sql"].upper() for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()]
+        self.assertTrue(counts)
+        self.assertTrue(all(" WHERE " in sql for sql in counts), counts)
+
+
+class RateLimitTests(TestCase):
+    """Throttled requests are answered with a 429 before reaching the database."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.owner)
+        Question.objects.create(survey=cls.survey, text="Câu hỏi", question_type="text", is_required=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_window_counter(self):
+        self.assertEqual(hit("bucket", 2, 60, now=0), 0)
+        self.assertEqual(hit("bucket", 2, 60, now=1), 0)
+        self.assertGreater(hit("bucket", 2, 60, now=2), 0)
+        # Early in the next window the previous one still weighs almost fully
+        self.assertGreater(hit("bucket", 2, 60, now=61), 0)
+        # Rejected requests were not counted, so the budget frees up as the window slides
+        self.assertEqual(hit("bucket", 2, 60, now=119), 0)
+
+    @override_settings(RATE_LIMITS={"login": "2/m"})
+    def test_exhausted_bucket_returns_429_without_queries(self):
+        for _ in range(2):
+            response = self.client.post(reverse("surveys:login"), {"username": "x", "password": "y"})
+            self.assertEqual(response.status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("surveys:login"), {"username": "x", "password": "y"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    @override_settings(RATE_LIMITS={"survey_submit": "1/m"})
+    def test_submissions_are_limited_per_browser_not_per_ip(self):
+        url = reverse("surveys:survey_take", args=[self.survey.pk])
+        browsers = []
+        for i in range(3):
+            # Same REMOTE_ADDR for all: a classroom behind one NAT address
+            browser = Client()
+            browser.cookies["csrftoken"] = str(i) * 32
+            browsers.append(browser)
+            self.assertNotEqual(browser.post(url, {}).status_code, 429)
+        self.assertEqual(browsers[0].post(url, {}).status_code, 429)
+
+
+class AdmissionControlTests(TestCase):
+    """A survey at its concurrency limit answers with a light 503 "queued" response."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("respondent", "r@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.user)
+        cls.question = Question.objects.create(survey=cls.survey, text="Câu hỏi", question_type="text")
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("surveys:survey_take", args=[self.survey.pk])
+        self.slots = SLOTS_KEY.format(self.survey.pk)
+
+    def test_full_slots_return_queued_json(self):
+        cache.set(self.slots, concurrency_limit(), timeout=60)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(response.json()["queued"])
+        self.assertGreater(int(response["Retry-After"]), 0)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        # The rejected request gave its slot back
+        self.assertEqual(cache.get(self.slots), concurrency_limit())
+
+    def test_full_slots_page_reposts_answers(self):
+        cache.set(self.slots, concurrency_limit(), timeout=60)
+        field = f"question_{self.question.pk}"
+        response = self.client.post(self.url, {field: "Câu trả lời"})
+        self.assertEqual(response.status_code, 503)
+        self.assertTemplateUsed(response, "errors/queued.html")
+        self.assertContains(response, f'name="{field}"', status_code=503)
+        self.assertContains(response, "Câu trả lời", status_code=503)
+
+    def test_slot_released_after_submission(self):
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, {f"question_{self.question.pk}": "Câu trả lời"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Response.objects.filter(survey=self.survey).count(), 1)
+        self.assertEqual(cache.get(self.slots), 0)
+
+
+class ResponseBufferTests(TestCase):
+    """Buffered submissions are staged, then written in bulk with the same side effects."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("respondent", "r@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.user, buffer_responses=True)
+        cls.question = Question.objects.create(survey=cls.survey, text="Nhận xét", question_type="text")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_submission_is_staged_and_flushed(self):
+        self.client.force_login(self.user)
+        url = reverse("surveys:survey_take", args=[self.survey.pk])
+        response = self.client.post(url, {f"question_{self.question.pk}": "Giáo viên nhiệt tình"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(PendingResponse.objects.filter(survey=self.survey).count(), 1)
+        self.assertFalse(Response.objects.filter(survey=self.survey).exists())
+
+        self.assertEqual(flush_pending(), 1)
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.response_count, 1)
+        self.assertFalse(PendingResponse.objects.exists())
+        stored = Response.objects.get(survey=self.survey)
+        self.assertEqual(stored.respondent, self.user)
+        self.assertEqual(stored.response_data, {str(self.question.pk): "Giáo viên nhiệt tình"})
+        self.assertEqual(
+            QuestionTermCount.objects.get(question=self.question, term="nhiệt").count, 1
+        )
+
+    def test_flush_in_batches(self):
+        snapshot = get_snapshot(self.survey)
+        for i in range(5):
+            buffer_response(self.survey, snapshot, None, f"10.0.0.{i}", {str(self.question.pk): "ý kiến"})
+        self.assertEqual(flush_pending(batch_size=2, limit=3), 3)
+        self.assertEqual(PendingResponse.objects.count(), 2)
+        self.assertEqual(flush_pending(batch_size=2), 2)
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.response_count, 5)
+        self.assertEqual(QuestionTermCount.objects.get(question=self.question, term="kiến").count, 5)
+
+    def test_pending_submissions_count_towards_the_limit(self):
+        Survey.objects.filter(pk=self.survey.pk).update(max_responses=2)
+        self.survey.refresh_from_db()
+        snapshot = get_snapshot(self.survey)
+        buffer_response(self.survey, snapshot, None, "10.0.0.1", {})
+        self.assertFalse(is_full(self.survey))
+        buffer_response(self.survey, snapshot, None, "10.0.0.2", {})
+        self.assertTrue(is_full(self.survey))
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("surveys:survey_take", args=[self.survey.pk]))
+        self.assertRedirects(response, reverse("surveys:survey_detail", args=[self.survey.pk]), fetch_redirect_response=False)
+
+
+class KioskApiTests(TestCase):
+    """Offline batches: device tokens, validation and client_id de-duplication."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.owner)
+        cls.text = Question.objects.create(survey=cls.survey, text="Nhận xét", question_type="text", is_required=False)
+        cls.choice = Question.objects.create(
+            survey=cls.survey, text="Đánh giá", question_type="single", options=["Tốt", "Kém"], order=2
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.device, token = create_device(self.survey, self.owner, "Quầy 1")
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        self.url = reverse("surveys:kiosk_api")
+
+    def _item(self, client_id, choice="Tốt"):
+        return {
+            "client_id": client_id,
+            "submitted_at": "2026-05-01T09:30:00+07:00",
+            "answers": {str(self.choice.pk): choice, str(self.text.pk): "ổn"},
+        }
+
+    def _upload(self, items):
+        return self.client.post(self.url, json.dumps({"responses": items}), content_type="application/json", **self.auth)
+
+    def test_requires_a_valid_device_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="Bearer nope").status_code, 401)
+        data = self.client.get(self.url, **self.auth).json()
+        self.assertEqual([q["id"] for q in data["questions"]], [self.text.pk, self.choice.pk])
+
+        KioskDevice.objects.filter(pk=self.device.pk).update(revoked_at=timezone.now())
+        self.assertEqual(self.client.get(self.url, **self.auth).status_code, 401)
+
+    def test_resent_batch_is_deduplicated(self):
+        data = self._upload([self._item("a"), self._item("b"), self._item("a"), self._item("c", choice="Tím")]).json()
+        self.assertEqual(data["created"], 2)
+        self.assertEqual(data["duplicates"], ["a"])
+        self.assertEqual([r["client_id"] for r in data["rejected"]], ["c"])
+
+        data = self._upload([self._item("a"), self._item("b")]).json()
+        self.assertEqual(data["created"], 0)
+        self.assertEqual(sorted(data["duplicates"]), ["a", "b"])
+
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.response_count, 2)
+        self.assertEqual(Response.objects.filter(survey=self.survey).count(), 2)
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.uploaded_count, 2)
+
+    def test_closed_or_full_survey(self):
+        Survey.objects.filter(pk=self.survey.pk).update(max_responses=1)
+        data = self._upload([self._item("a"), self._item("b")]).json()
+        self.assertEqual(data["created"], 1)
+        self.assertEqual([r["client_id"] for r in data["rejected"]], ["b"])
+        self.assertEqual(self._upload([self._item("c")]).status_code, 403)
+
+        Survey.objects.filter(pk=self.survey.pk).update(max_responses=None, is_active=False)
+        self.assertEqual(self._upload([self._item("d")]).status_code, 403)
+        self.assertEqual(Response.objects.filter(survey=self.survey).count(), 1)
+
+
+class ResponseImportTests(TestCase):
+    """CSV import through the bulk_create path (COPY is PostgreSQL-only)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.owner)
+        cls.text = Question.objects.create(survey=cls.survey, text="Nhận xét", question_type="text", is_required=False)
+        cls.choice = Question.objects.create(
+            survey=cls.survey, text="Đánh giá", question_type="single", options=["Tốt", "Kém"], order=2
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def _import(self, rows):
+        importer = ResponseImporter(self.survey, batch_size=2, use_copy=False)
+        reader = csv.reader(io.StringIO(rows))
+        columns, time_index, id_index, _ = build_mapping(
+            next(reader), importer.snapshot.questions, id_column="Mã"
+        )
+        importer.run(reader, columns, time_index, id_index)
+        return importer
+
+    def test_duplicate_client_ids_are_skipped(self):
+        rows = (
+            "Mã,Thời gian,Nhận xét,Đánh giá\n"
+            "r1,01/05/2026 09:30:00,Giáo viên nhiệt tình,tốt\n"
+            "r2,02/05/2026 10:00:00,,Kém\n"
+            "r1,03/05/2026 11:00:00,Lặp lại,Tốt\n"
+            "r3,04/05/2026 12:00:00,,Tím\n"
+        )
+        importer = self._import(rows)
+        self.assertEqual((importer.read, importer.imported, importer.duplicates), (4, 2, 1))
+        self.assertEqual([line for line, _ in importer.invalid], [5])
+
+        first = Response.objects.get(survey=self.survey, client_id="r1")
+        self.assertEqual(first.response_data, {str(self.text.pk): "Giáo viên nhiệt tình", str(self.choice.pk): "Tốt"})
+        self.assertEqual(timezone.localtime(first.submitted_at).day, 1)
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.response_count, 2)
+        self.assertEqual(QuestionTermCount.objects.get(question=self.text, term="nhiệt").count, 1)
+
+        # Re-running the same file stores nothing new
+        importer = self._import(rows)
+        self.assertEqual((importer.imported, importer.duplicates), (0, 3))
+        self.assertEqual(Response.objects.filter(survey=self.survey).count(), 2)
+
+
+class TermCountTests(TestCase):
+    """Term counters follow responses through create, edit and delete."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+
+    def setUp(self):
+        self.survey = Survey.objects.create(title="Khảo sát", creator=self.owner)
+        self.question = Question.objects.create(survey=self.survey, text="Nhận xét", question_type="text")
+
+    def _respond(self, text):
+        data = {str(self.question.pk): text}
+        response = Response.objects.create(survey=self.survey, response_data=data)
+        record_response_terms([self.question], data)
+        return response
+
+    def _count(self, term):
+        return (
+            QuestionTermCount.objects.filter(question=self.question, term=term)
+            .values_list("count", flat=True).first()
+        )
+
+    def test_counts_unigrams_and_bigrams(self):
+        self._respond("Giáo viên nhiệt tình, giáo viên vui")
+        self.assertEqual(self._count("giáo"), 2)
+        self.assertEqual(self._count("giáo viên"), 2)
+        # Bigrams do not cross punctuation
+        self.assertIsNone(self._count("tình giáo"))
+
+    def test_edit_applies_the_difference(self):
+        response = Response.objects.get(pk=self._respond("giáo viên nhiệt tình").pk)
+        response.response_data = {str(self.question.pk): "giáo viên tận tâm"}
+        response.save()
+        self.assertEqual(self._count("giáo viên"), 1)
+        self.assertEqual(self._count("nhiệt"), 0)
+        self.assertEqual(self._count("tận"), 1)
+
+    def test_delete_removes_the_terms(self):
+        self._respond("giáo viên nhiệt tình")
+        self._respond("giáo viên vui")
+        Response.objects.filter(response_data__icontains="vui").get().delete()
+        self.assertEqual(self._count("giáo viên"), 1)
+        self.assertEqual(self._count("vui"), 0)
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.response_count, 1)
+
+    def test_bulk_delete_fixes_counters_once(self):
+        for text in ("giáo viên vui", "giáo viên vui", "lớp học"):
+            self._respond(text)
+        deleted = delete_responses(Response.objects.filter(response_data__icontains="vui"))
+        self.assertEqual(deleted, 2)
+        self.assertEqual(self._count("giáo viên") or 0, 0)
+        self.assertEqual(self._count("lớp học"), 1)
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.response_count, 1)
+
+    def test_survey_delete_skips_per_row_updates(self):
+        for _ in range(20):
+            self._respond("giáo viên vui")
+        with CaptureQueriesContext(connection) as ctx:
+            self.survey.delete()
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(updates, [])
+
+
+class NumericStatsTests(TestCase):
+    """Text answers that are mostly numbers get a numeric summary."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_number_formats(self):
+        self.assertEqual(parse_number("25"), 25)
+        self.assertEqual(parse_number("4,5"), 4.5)
+        self.assertEqual(parse_number("4.5"), 4.5)
+        self.assertEqual(parse_number("1.000.000"), 1000000)
+        self.assertEqual(parse_number("1,234.5"), 1234.5)
+        self.assertEqual(parse_number("1.234,5"), 1234.5)
+        self.assertIsNone(parse_number("abc"))
+
+    def test_summary_needs_mostly_numbers(self):
+        summary = numeric_summary(["20", "25", "30", "1.000", "abc"])
+        self.assertEqual(summary["count"], 4)
+        self.assertEqual(summary["ignored"], 1)
+        self.assertEqual(summary["median"], 27.5)
+        self.assertEqual(sum(b["count"] for b in summary["histogram"]), 4)
+        self.assertIsNone(numeric_summary(["20", "abc", "xyz"]))
+
+    def test_stats_payload_carries_the_summary(self):
+        survey = Survey.objects.create(title="Khảo sát", creator=self.owner)
+        question = Question.objects.create(survey=survey, text="Tuổi", question_type="text")
+        for age in ("18", "20", "22"):
+            Response.objects.create(survey=survey, response_data={str(question.pk): age})
+        payload = get_survey_stats(survey, survey.questions.all())
+        self.assertEqual(payload["questions"][question.pk]["numeric"]["mean"], 20)
+
+
+class TimelineTests(TestCase):
+    """Closed buckets are stored once and stay right after backdated inserts and deletes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+
+    def setUp(self):
+        self.survey = Survey.objects.create(title="Khảo sát", creator=self.owner)
+        self.now = timezone.now()
+
+    def _counts(self):
+        return [b["count"] for b in get_timeline(self.survey, DAY, window=3, now=self.now)]
+
+    def _at(self, days_ago, **kwargs):
+        return Response.objects.create(
+            survey=self.survey, submitted_at=self.now - timedelta(days=days_ago), response_data={}, **kwargs
+        )
+
+    def test_closed_days_are_stored_and_today_is_live(self):
+        self._at(2)
+        self._at(1)
+        self._at(1)
+        self.assertEqual(self._counts(), [1, 2, 0])
+        self.assertTrue(ResponseTimelineBucket.objects.filter(survey=self.survey, granularity=DAY).exists())
+        self._at(0)
+        self.assertEqual(self._counts(), [1, 2, 1])
+
+    def test_backdated_import_rebuilds_stored_buckets(self):
+        self._at(1)
+        self.assertEqual(self._counts(), [0, 1, 0])
+        backdated = Response(
+            survey=self.survey, submitted_at=self.now - timedelta(days=2), response_data={}
+        )
+        insert_responses(self.survey.pk, [backdated], [])
+        self.assertEqual(self._counts(), [1, 1, 0])
+
+    def test_delete_decrements_stored_bucket(self):
+        response = self._at(1)
+        self._at(1)
+        self.assertEqual(self._counts(), [0, 2, 0])
+        response.delete()
+        self.assertEqual(self._counts(), [0, 1, 0])
+
+
+class StatsApiTests(TestCase):
+    """Chart data is cached per stats version and revalidated with ETags."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.owner)
+        cls.color = Question.objects.create(
+            survey=cls.survey, text="Màu", question_type="single", options=["Đỏ", "Xanh"], order=1
+        )
+        cls.size = Question.objects.create(
+            survey=cls.survey, text="Cỡ", question_type="multiple", options=["S", "M"], order=2
+        )
+        for color in ("Đỏ", "Đỏ", "Xanh"):
+            Response.objects.create(survey=cls.survey, response_data={str(cls.color.pk): color})
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+        self.url = reverse("surveys:survey_stats_api", args=[self.survey.pk])
+
+    def test_chart_payload_for_one_question(self):
+        data = self.client.get(self.url, {"question": self.color.pk}).json()
+        self.assertEqual(list(data["questions"]), [str(self.color.pk)])
+        chart = data["questions"][str(self.color.pk)]
+        self.assertEqual(chart["counts"], [2, 1])
+        self.assertEqual(chart["percentages"], [66.7, 33.3])
+
+    def test_not_modified_until_a_response_arrives(self):
+        first = self.client.get(self.url)
+        etag = first["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Response.objects.create(survey=self.survey, response_data={str(self.color.pk): "Xanh"})
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], etag)
+
+    def test_concurrent_miss_serves_the_previous_payload(self):
+        previous = get_survey_stats(self.survey, self.survey.questions.all())
+        invalidate_survey_stats(self.survey.pk)
+        version = get_stats_version(self.survey.pk)
+        # Another request is computing the new version
+        cache.add(f"survey_stats:{self.survey.pk}:v{version}:lock", True)
+        with mock.patch("surveys.stats.compute_survey_stats") as compute:
+            response = self.client.get(self.url)
+        compute.assert_not_called()
+        self.assertIn(f"-{previous['version']}-", response["ETag"])
+
+
+class ResponseViewerTests(TestCase):
+    """The response viewer pages with signed (submitted_at, id) cursors."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.owner)
+        Question.objects.create(survey=cls.survey, text="Nhận xét", question_type="text")
+        same_time = timezone.now() - timedelta(hours=1)
+        # Ties on submitted_at are broken by id
+        Response.objects.bulk_create(
+            Response(survey=cls.survey, submitted_at=same_time, response_data={})
+            for _ in range(RESPONSES_PAGE_SIZE + 5)
+        )
+        cls.expected = list(
+            Response.objects.filter(survey=cls.survey).order_by("-submitted_at", "-id").values_list("id", flat=True)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+        self.url = reverse("surveys:survey_responses", args=[self.survey.pk])
+
+    def _page(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        page = response.context["page"]
+        return page, [row["response"].pk for row in response.context["rows"]]
+
+    def test_pages_forward_and_back(self):
+        first, first_ids = self._page()
+        second, second_ids = self._page(after=first.next_cursor)
+        self.assertEqual(first_ids + second_ids, self.expected)
+        self.assertFalse(second.has_next)
+        _, back_ids = self._page(before=second.previous_cursor)
+        self.assertEqual(back_ids, first_ids)
+
+    def test_tampered_cursor_shows_the_first_page(self):
+        first, first_ids = self._page()
+        forged = encode_cursor([timezone.now().isoformat(), 0])[:-2] + "xx"
+        _, ids = self._page(after=forged)
+        self.assertEqual(ids, first_ids)
+        _, ids = self._page(after="not-a-cursor")
+        self.assertEqual(ids, first_ids)
+
+    def test_other_users_cannot_view(self):
+        stranger = User.objects.create_user("stranger", "s@example.com", "pw")
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class SurveyAccessTests(TestCase):
+    """Survey roles are resolved in bulk and memoized per user object."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.user = User.objects.create_user("user", "user@example.com", "pw")
+        cls.own = Survey.objects.create(title="Của tôi", creator=cls.user)
+        cls.shared = Survey.objects.create(title="Được chia sẻ", creator=cls.owner)
+        cls.other = Survey.objects.create(title="Khác", creator=cls.owner)
+        SurveyCollaborator.objects.create(survey=cls.shared, user=cls.user, role=SurveyCollaborator.ROLE_VIEWER)
+
+    def test_roles_resolved_with_one_query_and_memoized(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            access = get_survey_access_many(user, [self.own, self.shared, self.other])
+        self.assertTrue(access[self.own.pk].is_owner)
+        self.assertTrue(access[self.shared.pk].can_view_results)
+        self.assertFalse(access[self.shared.pk].can_edit)
+        self.assertIsNone(access[self.other.pk].role)
+        with self.assertNumQueries(0):
+            self.assertTrue(get_survey_access(user, self.shared).is_viewer)
+
+    def test_memo_does_not_leak_to_another_user_object(self):
+        get_survey_access(User.objects.get(pk=self.user.pk), self.shared)
+        SurveyCollaborator.objects.filter(survey=self.shared, user=self.user).update(
+            role=SurveyCollaborator.ROLE_EDITOR
+        )
+        self.assertTrue(get_survey_access(User.objects.get(pk=self.user.pk), self.shared).can_edit)
+
+    def test_accessible_survey_ids(self):
+        ids = set(Survey.objects.filter(pk__in=accessible_survey_ids(self.user)).values_list("pk", flat=True))
+        self.assertEqual(ids, {self.own.pk, self.shared.pk})
+        self.assertFalse(get_survey_access(AnonymousUser(), self.own).can_view_results)
+
+
+class SiteCounterTests(TestCase):
+    """Landing page counters come from the cache or the stored row, not COUNT(*)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.owner, is_active=True)
+        Response.objects.create(survey=cls.survey, response_data={})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_after_first_read(self):
+        counters = get_site_counters()
+        self.assertEqual((counters["active_surveys"], counters["total_responses"]), (1, 1))
+        with self.assertNumQueries(0):
+            get_site_counters()
+
+    @override_settings(SITE_COUNTERS_TTL=300)
+    def test_fresh_row_is_used_when_the_cache_is_cold(self):
+        refresh_site_counters()
+        Response.objects.create(survey=self.survey, response_data={})
+        cache.clear()
+        with self.assertNumQueries(1):
+            counters = get_site_counters()
+        self.assertEqual(counters["total_responses"], 1)
+
+    def test_recount_fixes_a_drifted_response_count(self):
+        Survey.objects.filter(pk=self.survey.pk).update(response_count=42)
+        recount_survey_responses([self.survey.pk])
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.response_count, 1)
+
+
+class AdminStatsTests(TestCase):
+    """Admin dashboard aggregates cost a fixed number of queries and are cached."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("root", "root@example.com", "pw")
+
+    def setUp(self):
+        cache.clear()
+
+    def _add(self, count):
+        for i in range(count):
+            survey = Survey.objects.create(title=f"Khảo sát {i}", creator=self.admin, is_active=i % 2 == 0)
+            Response.objects.create(survey=survey, response_data={})
+
+    def test_constant_queries_and_cached(self):
+        self._add(2)
+        with CaptureQueriesContext(connection) as small:
+            compute_admin_stats()
+        self._add(20)
+        with CaptureQueriesContext(connection) as large:
+            stats = compute_admin_stats()
+        self.assertEqual(len(large), len(small))
+        self.assertEqual((stats["total_surveys"], stats["active_surveys"]), (22, 11))
+        self.assertEqual(stats["response_counts"][-1], 22)
+
+        get_admin_stats()
+        with self.assertNumQueries(0):
+            get_admin_stats()
+
+
+class BuilderTestMixin:
+    """An owner-authenticated client and a survey with two questions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+
+    def setUp(self):
+        self.survey = Survey.objects.create(title="Khảo sát", creator=self.owner)
+        self.first = Question.objects.create(survey=self.survey, text="Một", question_type="text", order=1)
+        self.second = Question.objects.create(
+            survey=self.survey, text="Hai", question_type="single", options=["A"], order=2
+        )
+        self.client.force_login(self.owner)
+
+    def post_json(self, url, data, **extra):
+        extra.setdefault("HTTP_IF_MATCH", definition_etag(self.survey.pk, current_revision(self.survey.pk)))
+        return self.client.post(url, json.dumps(data), content_type="application/json", **extra)
+
+
+class BuilderBatchTests(BuilderTestMixin, TestCase):
+    """Builder operations are applied in order, in one transaction."""
+
+    def _batch(self, operations, **extra):
+        url = reverse("surveys:survey_batch_ajax", args=[self.survey.pk])
+        return self.post_json(url, {"operations": operations}, **extra)
+
+    def test_operations_with_refs(self):
+        response = self._batch([
+            {"op": "question_add", "ref": "new", "text": "Ba", "question_type": "multiple"},
+            {"op": "choice_add", "question": "new", "text": "X"},
+            {"op": "question_update", "id": self.first.pk, "text": "Một (sửa)"},
+            {"op": "question_delete", "id": self.second.pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        added = Question.objects.get(survey=self.survey, text="Ba")
+        self.assertEqual(response.json()["results"][0]["id"], added.pk)
+        self.assertEqual(added.options, ["X"])
+        self.assertEqual(
+            list(self.survey.questions.order_by("order").values_list("text", flat=True)), ["Một (sửa)", "Ba"]
+        )
+
+    def test_failing_operation_rolls_back_the_batch(self):
+        response = self._batch([
+            {"op": "question_update", "id": self.first.pk, "text": "Đã sửa"},
+            {"op": "question_update", "id": 999999, "text": "?"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["index"], 1)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.text, "Một")
+
+    def test_batch_bumps_the_revision_once(self):
+        before = current_revision(self.survey.pk)
+        self._batch([
+            {"op": "question_update", "id": self.first.pk, "text": "A"},
+            {"op": "question_update", "id": self.second.pk, "text": "B"},
+            {"op": "question_delete", "id": self.second.pk},
+        ])
+        self.assertEqual(current_revision(self.survey.pk), before + 1)
+
+
+class QuestionReorderTests(BuilderTestMixin, TestCase):
+    """Reordering writes every question or none."""
+
+    def _reorder(self, orders):
+        url = reverse("surveys:question_reorder_ajax", args=[self.survey.pk])
+        return self.post_json(url, {"orders": orders})
+
+    def _order(self):
+        return list(self.survey.questions.order_by("order").values_list("pk", flat=True))
+
+    def test_reorder(self):
+        response = self._reorder([{"id": self.first.pk, "order": 2}, {"id": self.second.pk, "order": 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._order(), [self.second.pk, self.first.pk])
+
+    def test_foreign_question_aborts_the_whole_reorder(self):
+        other_survey = Survey.objects.create(title="Khác", creator=self.owner)
+        foreign = Question.objects.create(survey=other_survey, text="Lạ", question_type="text", order=1)
+        response = self._reorder([{"id": self.first.pk, "order": 9}, {"id": foreign.pk, "order": 0}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._order(), [self.first.pk, self.second.pk])
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.order, 1)
+
+    def test_malformed_orders(self):
+        self.assertEqual(self._reorder([{"id": self.first.pk}]).status_code, 400)
+        self.assertEqual(self._order(), [self.first.pk, self.second.pk])
+
+
+class DefinitionEtagTests(BuilderTestMixin, TestCase):
+    """Definition reads are conditional; writes need a current If-Match."""
+
+    def _add(self, **extra):
+        url = reverse("surveys:question_add_ajax", args=[self.survey.pk])
+        return self.post_json(url, {"text": "Mới", "question_type": "text"}, **extra)
+
+    def test_not_modified_until_the_survey_changes(self):
+        url = reverse("surveys:survey_definition_api", args=[self.survey.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assertEqual(self._add().status_code, 200)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_stale_if_match_is_rejected(self):
+        stale = definition_etag(self.survey.pk, current_revision(self.survey.pk))
+        self.assertEqual(self._add(HTTP_IF_MATCH=stale).status_code, 200)
+        response = self._add(HTTP_IF_MATCH=stale)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response["ETag"], definition_etag(self.survey.pk, current_revision(self.survey.pk)))
+        self.assertEqual(self.survey.questions.count(), 3)
+
+    def test_missing_if_match_is_required(self):
+        url = reverse("surveys:question_add_ajax", args=[self.survey.pk])
+        response = self.client.post(url, json.dumps({"text": "Mới"}), content_type="application/json")
+        self.assertEqual(response.status_code, 428)
+        self.assertEqual(response["ETag"], definition_etag(self.survey.pk, current_revision(self.survey.pk)))
+        self.assertEqual(self.survey.questions.count(), 2)
+
+    def test_publish_toggle_does_not_need_if_match(self):
+        url = reverse("surveys:survey_publish_toggle_ajax", args=[self.survey.pk])
+        response = self.client.post(url, json.dumps({"is_active": False}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.survey.refresh_from_db()
+        self.assertFalse(self.survey.is_active)
+
+
+class SurveyTemplateTests(BuilderTestMixin, TestCase):
+    """Export/import and cloning carry settings and questions into a new draft."""
+
+    def _questions(self, survey):
+        return list(
+            survey.questions.order_by("order").values_list("text", "question_type", "order", "options")
+        )
+
+    def test_export_import_round_trip(self):
+        Survey.objects.filter(pk=self.survey.pk).update(description="Mô tả", max_responses=50, one_response_only=True)
+        self.survey.refresh_from_db()
+        data = json.loads(json.dumps(export_definition(self.survey)))
+
+        other = User.objects.create_user("other", "other@example.com", "pw")
+        copy = import_definition(data, other)
+        self.assertNotEqual(copy.pk, self.survey.pk)
+        self.assertFalse(copy.is_active)
+        self.assertEqual(copy.creator, other)
+        self.assertEqual((copy.title, copy.description, copy.max_responses), ("Khảo sát", "Mô tả", 50))
+        self.assertTrue(copy.one_response_only)
+        self.assertEqual(self._questions(copy), self._questions(self.survey))
+        self.assertTrue(SurveyCollaborator.objects.filter(survey=copy, user=other, role="owner").exists())
+        self.assertEqual(export_definition(copy)["questions"], data["questions"])
+
+    def test_invalid_template_creates_nothing(self):
+        data = export_definition(self.survey)
+        data["questions"].append({"text": "Sai", "question_type": "không có"})
+        with self.assertRaises(BatchError) as ctx:
+            import_definition(data, self.owner)
+        self.assertEqual(ctx.exception.index, 2)
+        with self.assertRaises(BatchError):
+            import_definition({**data, "format": "khác"}, self.owner)
+        self.assertEqual(Survey.objects.count(), 1)
+
+    def test_clone_is_independent(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        with override_settings(MEDIA_ROOT=media):
+            self.survey.header_image.save("header.png", SimpleUploadedFile("header.png", b"png"))
+            response = self.client.post(reverse("surveys:survey_clone", args=[self.survey.pk]))
+            self.assertEqual(response.status_code, 302)
+            clone = Survey.objects.exclude(pk=self.survey.pk).get()
+            self.assertEqual(clone.title, "Khảo sát (bản sao)")
+            self.assertEqual(self._questions(clone), self._questions(self.survey))
+            self.assertNotEqual(clone.header_image.name, self.survey.header_image.name)
+
+            self.survey.header_image.delete()
+            clone.refresh_from_db()
+            with clone.header_image.open("rb") as image:
+                self.assertEqual(image.read(), b"png")
+
+
+class SnapshotTests(TestCase):
+    """Respondents see frozen revisions; stored revisions never change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+
+    def setUp(self):
+        cache.clear()
+        self.survey = Survey.objects.create(title="Khảo sát", creator=self.owner, is_active=True)
+        self.question = Question.objects.create(survey=self.survey, text="Cũ", question_type="text", order=1)
+        self.survey.refresh_from_db()
+
+    def _edit(self, text):
+        self.question.text = text
+        self.question.save()
+        self.survey.refresh_from_db()
+
+    def _texts(self, snapshot):
+        return [q.text for q in snapshot.questions]
+
+    def test_edits_never_change_a_stored_revision(self):
+        published = freeze_revision(self.survey)
+        response = Response.objects.create(survey=self.survey, revision=published, response_data={})
+        self._edit("Mới")
+
+        snapshot = get_snapshot(self.survey)
+        self.assertEqual(self._texts(snapshot), ["Mới"])
+        self.assertNotEqual(snapshot.revision_id, published.pk)
+        response = Response.objects.select_related("revision").get(pk=response.pk)
+        self.assertEqual([q.text for q in revision_questions(response.revision)], ["Cũ"])
+        published.refresh_from_db()
+        self.assertEqual(published.definition[0][1], "Cũ")
+
+    def test_active_survey_is_republished_after_an_edit(self):
+        first = freeze_revision(self.survey)
+        self.assertEqual(self._texts(get_snapshot(self.survey)), ["Cũ"])
+        self._edit("Mới")
+        snapshot = get_snapshot(self.survey)
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.published_revision_id, snapshot.revision_id)
+        self.assertNotEqual(snapshot.revision_id, first.pk)
+
+    def test_inactive_survey_serves_the_published_revision(self):
+        published = freeze_revision(self.survey)
+        Survey.objects.filter(pk=self.survey.pk).update(is_active=False)
+        self._edit("Nháp")
+        snapshot = get_snapshot(self.survey)
+        self.assertEqual(snapshot.revision_id, published.pk)
+        self.assertEqual(self._texts(snapshot), ["Cũ"])
+        self.survey.refresh_from_db()
+        self.assertEqual(self.survey.published_revision_id, published.pk)
+
+    def test_draft_snapshot_does_not_publish(self):
+        snapshot = get_snapshot(self.survey)
+        self.assertEqual(self._texts(snapshot), ["Cũ"])
+        self.survey.refresh_from_db()
+        self.assertIsNone(self.survey.published_revision_id)
+        self.assertEqual(SurveyRevision.objects.get(pk=snapshot.revision_id).number, self.survey.revision)
+
+
+class StaticPageTests(TestCase):
+    """Static take pages are written, removed and redirected to only when configured."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+
+    def setUp(self):
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.survey = Survey.objects.create(title="Khảo sát", creator=self.owner, static_publish=True)
+        Question.objects.create(survey=self.survey, text="Tên trường", question_type="text", order=1)
+
+    def test_page_is_written_and_removed_on_unpublish(self):
+        with override_settings(STATIC_TAKE_ROOT=self.root, STATIC_TAKE_URL="/take/"):
+            self.assertEqual(sync_static_page(self.survey), f"/take/{self.survey.pk}/index.html")
+            path = page_path(self.survey.pk)
+            self.assertIn("Tên trường", path.read_text(encoding="utf-8"))
+            self.survey.refresh_from_db()
+            self.assertEqual(self.survey.static_revision, self.survey.revision)
+
+            self.client.force_login(self.owner)
+            url = reverse("surveys:survey_publish_toggle_ajax", args=[self.survey.pk])
+            response = self.client.post(url, json.dumps({"is_active": False}), content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(path.exists())
+            self.survey.refresh_from_db()
+            self.assertIsNone(self.survey.static_revision)
+
+    def test_edit_rewrites_the_page(self):
+        with override_settings(STATIC_TAKE_ROOT=self.root, STATIC_TAKE_URL="/take/"):
+            sync_static_page(self.survey)
+            Question.objects.create(survey=self.survey, text="Tuổi", question_type="text", order=2)
+            sync_static_page(self.survey)
+            self.assertIn("Tuổi", page_path(self.survey.pk).read_text(encoding="utf-8"))
+
+    def test_anonymous_take_redirects_only_when_configured(self):
+        url = reverse("surveys:survey_take", args=[self.survey.pk])
+        with override_settings(STATIC_TAKE_ROOT=self.root, STATIC_TAKE_URL=""):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(page_path(self.survey.pk).exists())
+        with override_settings(STATIC_TAKE_ROOT=self.root, STATIC_TAKE_URL="/take/"):
+            response = self.client.get(url)
+            self.assertRedirects(response, f"/take/{self.survey.pk}/index.html", fetch_redirect_response=False)
+            self.assertTrue(page_path(self.survey.pk).exists())
+
+
+class TakeFragmentCacheTests(TestCase):
+    """The take page's question block is rendered once per revision."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+
+    def setUp(self):
+        cache.clear()
+        self.survey = Survey.objects.create(title="Khảo sát", creator=self.owner)
+        self.question = Question.objects.create(survey=self.survey, text="Tên trường", question_type="text", order=1)
+        self.client.force_login(self.owner)
+        self.url = reverse("surveys:survey_take", args=[self.survey.pk])
+
+    def _key(self):
+        self.survey.refresh_from_db()
+        return make_template_fragment_key("survey_take_questions", [self.survey.pk, self.survey.revision])
+
+    def test_fragment_is_reused_until_an_edit(self):
+        self.assertContains(self.client.get(self.url), "Tên trường")
+        key = self._key()
+        self.assertIn("Tên trường", cache.get(key))
+
+        cache.set(key, "<p>từ bộ nhớ đệm</p>")
+        response = self.client.get(self.url)
+        self.assertContains(response, "từ bộ nhớ đệm")
+        # Per-visitor parts are outside the fragment
+        self.assertContains(response, "csrfmiddlewaretoken")
+
+        self.question.text = "Tuổi"
+        self.question.save()
+        self.assertNotEqual(self._key(), key)
+        response = self.client.get(self.url)
+        self.assertContains(response, "Tuổi")
+        self.assertNotContains(response, "từ bộ nhớ đệm")
+
+
+class RespondentStateTests(TestCase):
+    """Anonymous respondents are remembered by a signed cookie, not a session row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.survey = Survey.objects.create(
+            title="Khảo sát", creator=cls.owner, password=make_password("bí mật"),
+            allow_review_response=True, one_response_only=True,
+        )
+        Question.objects.create(survey=cls.survey, text="Câu hỏi", question_type="text", is_required=False)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("surveys:survey_take", args=[self.survey.pk])
+
+    def test_unlock_and_answer_without_a_session(self):
+        self.assertContains(self.client.get(self.url), "survey_password")
+        self.client.post(self.url, {"survey_password": "sai"})
+        self.assertNotIn(COOKIE_NAME, self.client.cookies)
+
+        self.client.post(self.url, {"survey_password": "bí mật"})
+        self.assertIn(COOKIE_NAME, self.client.cookies)
+        self.assertTrue(self.client.cookies[COOKIE_NAME]["httponly"])
+        self.assertNotContains(self.client.get(self.url), 'name="survey_password"')
+
+        with mock.patch("surveys.views.take._verify_turnstile", return_value=None):
+            self.client.post(self.url, {})
+        answer = Response.objects.get(survey=self.survey)
+        # The cookie remembers the response for the review link
+        self.assertRedirects(
+            self.client.get(self.url),
+            reverse("surveys:survey_review_response", args=[answer.pk]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(Session.objects.count(), 0)
+
+    def test_forged_cookie_is_ignored(self):
+        self.client.cookies[COOKIE_NAME] = '{"u":[%d],"a":{}}' % self.survey.pk
+        self.assertContains(self.client.get(self.url), "survey_password")
+
+
+class ClearAnonymousSessionsTests(TestCase):
+    """Only anonymous sessions holding the old take-flow keys are removed."""
+
+    def _session(self, **data):
+        store = SessionStore()
+        store.update(data)
+        store.create()
+        return store.session_key
+
+    def test_keeps_logged_in_and_unrelated_sessions(self):
+        user = User.objects.create_user("user", "user@example.com", "pw")
+        legacy = self._session(anon_session_id="abc", survey_done_3=True)
+        logged_in = self._session(_auth_user_id=str(user.pk), survey_done_3=True)
+        unrelated = self._session(language="vi", survey_doneness=1)
+
+        call_command("clear_anonymous_sessions", "--dry-run", stdout=io.StringIO())
+        self.assertEqual(Session.objects.count(), 3)
+
+        out = io.StringIO()
+        call_command("clear_anonymous_sessions", "--batch-size", "1", stdout=out)
+        self.assertEqual(set(Session.objects.values_list("session_key", flat=True)), {logged_in, unrelated})
+        self.assertFalse(Session.objects.filter(session_key=legacy).exists())
+        self.assertIn("1/3", out.getvalue())
+
+
+class InviteMigrationTests(TransactionTestCase):
+    """0028 turns every whitelist line into an invite, so no restricted survey opens up."""
+
+    before = [("surveys", "0027_survey_static_publish")]
+    after = [("surveys", "0028_survey_invites")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes("surveys")
+        executor.migrate(self.before)
+        self.addCleanup(self._migrate, self.latest)
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_whitelist_lines_become_invites(self):
+        apps = MigrationExecutor(connection).loader.project_state(self.before).apps
+        owner = apps.get_model("auth", "User").objects.create(username="owner")
+        Survey = apps.get_model("surveys", "Survey")
+        long_line = "x" * 300
+        restricted = Survey.objects.create(
+            title="Riêng", creator_id=owner.pk,
+            whitelist_emails=f" A@Example.com \n\na@example.com\nkhông phải email\n{long_line}\n",
+        )
+        open_survey = Survey.objects.create(title="Mở", creator_id=owner.pk, whitelist_emails="")
+
+        apps = self._migrate(self.after)
+        Survey = apps.get_model("surveys", "Survey")
+        SurveyInvite = apps.get_model("surveys", "SurveyInvite")
+        emails = set(SurveyInvite.objects.filter(survey_id=restricted.pk).values_list("email", flat=True))
+        self.assertEqual(emails, {"a@example.com", "không phải email", "x" * 254})
+        self.assertEqual(Survey.objects.get(pk=restricted.pk).invite_count, 3)
+        self.assertEqual(Survey.objects.get(pk=open_survey.pk).invite_count, 0)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class InviteCampaignTests(TestCase):
+    """Campaigns resume from their cursor and are sent by one run at a time."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        cls.survey = Survey.objects.create(title="Khảo sát", creator=cls.owner)
+        SurveyInvite.objects.bulk_create(
+            [SurveyInvite(survey=cls.survey, email=f"user{i}@example.com") for i in range(5)]
+        )
+
+    def setUp(self):
+        self.campaign = create_campaign(self.survey, self.owner, "Mời tham gia", "Xin chào", "https://example.com/")
+
+    def _recipients(self):
+        return [msg.to[0] for msg in mail.outbox]
+
+    def test_interrupted_run_resumes_where_it_stopped(self):
+        self.assertEqual(self.campaign.total, 5)
+        self.assertEqual(send_campaign(self.campaign, batch_size=2, rate=0, limit=3), 3)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, InviteCampaign.STATUS_RUNNING)
+        self.assertEqual(self.campaign.sent_count, 3)
+        self.assertEqual(self.campaign.locked_by, "")
+
+        # A fresh object, as a later cron run would load it
+        campaign = InviteCampaign.objects.get(pk=self.campaign.pk)
+        self.assertEqual(send_campaign(campaign, batch_size=2, rate=0), 2)
+        self.assertEqual(sorted(self._recipients()), [f"user{i}@example.com" for i in range(5)])
+        self.assertIn("https://example.com/", mail.outbox[0].body)
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, InviteCampaign.STATUS_DONE)
+        self.assertEqual(campaign.sent_count, 5)
+        self.assertEqual(SurveyInvite.objects.filter(status=SurveyInvite.STATUS_SENT).count(), 5)
+        self.assertEqual(send_campaign(campaign, rate=0), 0)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_lease_held_by_another_run(self):
+        InviteCampaign.objects.filter(pk=self.campaign.pk).update(
+            locked_by="other", locked_until=timezone.now() + timedelta(minutes=5)
+        )
+        self.assertEqual(send_campaign(self.campaign, rate=0), 0)
+        self.assertEqual(mail.outbox, [])
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.locked_by, "other")
+
+    def test_expired_lease_is_taken_over(self):
+        InviteCampaign.objects.filter(pk=self.campaign.pk).update(
+            locked_by="dead", locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(send_campaign(self.campaign, rate=0), 5)
+        self.assertEqual(len(mail.outbox), 5)
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.locked_by, self.campaign.locked_until), ("", None))
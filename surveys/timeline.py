@@ -0,0 +1,157 @@
+"""
+Submissions-over-time series for the results page.
+
+Closed buckets (hours/days that have ended) never change, so they are stored
+in `ResponseTimelineBucket` once and only the trailing, still-open part of the
+series is counted live. Both reads use the (survey, submitted_at) index.
+Deleting a response decrements the stored buckets it was counted in.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import Response, ResponseTimelineBucket
+
+HOUR = ResponseTimelineBucket.GRANULARITY_HOUR
+DAY = ResponseTimelineBucket.GRANULARITY_DAY
+
+# Default number of buckets shown on the chart
+DEFAULT_WINDOW = {HOUR: 48, DAY: 30}
+
+# A bucket is only frozen once it ended this long ago, so that a response
+# created just before the boundary but committed just after it is not lost.
+CLOSE_GRACE = timedelta(minutes=2)
+
+_TRUNC = {HOUR: TruncHour, DAY: TruncDay}
+
+
+def bucket_floor(value, granularity):
+    local = timezone.localtime(value)
+    if granularity == HOUR:
+        return local.replace(minute=0, second=0, microsecond=0)
+    return timezone.make_aware(datetime.combine(local.date(), time.min))
+
+
+def next_bucket(start, granularity):
+    if granularity == HOUR:
+        return start + timedelta(hours=1)
+    local = timezone.localtime(start)
+    return timezone.make_aware(datetime.combine(local.date() + timedelta(days=1), time.min))
+
+
+def _grouped_counts(survey, granularity, start=None, end=None):
+    qs = Response.objects.filter(survey=survey)
+    if start is not None:
+        qs = qs.filter(submitted_at__gte=start)
+    if end is not None:
+        qs = qs.filter(submitted_at__lt=end)
+    rows = (
+        qs.order_by()
+        .annotate(bucket=_TRUNC[granularity]('submitted_at', tzinfo=timezone.get_current_timezone()))
+        .values('bucket')
+        .annotate(n=Count('id'))
+        .values_list('bucket', 'n')
+    )
+    return {bucket_floor(bucket, granularity): n for bucket, n in rows}
+
+
+def _dense(counts, start, end, granularity):
+    """Yield (bucket_start, count) for every bucket in [start, end), zeros included."""
+    current = start
+    while current < end:
+        yield current, counts.get(current, 0)
+        current = next_bucket(current, granularity)
+
+
+def refresh_closed_buckets(survey, granularity, now=None):
+    """Store the buckets that closed since the last call; return the close boundary."""
+    now = now or timezone.now()
+    closed_until = bucket_floor(now - CLOSE_GRACE, granularity)
+
+    last = (
+        ResponseTimelineBucket.objects
+        .filter(survey=survey, granularity=granularity)
+        .order_by('-bucket_start')
+        .values_list('bucket_start', flat=True)
+        .first()
+    )
+    start = next_bucket(last, granularity) if last else None
+    if start is not None and start >= closed_until:
+        return closed_until
+
+    counts = _grouped_counts(survey, granularity, start=start, end=closed_until)
+    if start is None:
+        if not counts:
+            return closed_until
+        start = min(counts)
+
+    ResponseTimelineBucket.objects.bulk_create(
+        [
+            ResponseTimelineBucket(survey=survey, granularity=granularity, bucket_start=bucket, count=n)
+            for bucket, n in _dense(counts, start, closed_until, granularity)
+        ],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+    return closed_until
+
+
+def get_timeline(survey, granularity=DAY, window=None, now=None):
+    """
+    Return [{'start': datetime, 'count': int}, ...] for the last `window` buckets,
+    ending with the current (open) bucket.
+    """
+    now = now or timezone.now()
+    window = window or DEFAULT_WINDOW[granularity]
+    closed_until = refresh_closed_buckets(survey, granularity, now=now)
+
+    current_start = bucket_floor(now, granularity)
+    first_shown = current_start
+    for _ in range(window - 1):
+        first_shown = bucket_floor(first_shown - timedelta(seconds=1), granularity)
+
+    stored = dict(
+        ResponseTimelineBucket.objects
+        .filter(survey=survey, granularity=granularity, bucket_start__gte=first_shown)
+        .values_list('bucket_start', 'count')
+    )
+    stored = {bucket_floor(bucket, granularity): n for bucket, n in stored.items()}
+    live = _grouped_counts(survey, granularity, start=closed_until)
+
+    series = []
+    bucket = first_shown
+    while bucket <= current_start:
+        count = live.get(bucket, 0) if bucket >= closed_until else stored.get(bucket, 0)
+        series.append({'start': bucket, 'count': count})
+        bucket = next_bucket(bucket, granularity)
+    return series
+
+
+def invalidate_timeline(survey_id, since=None):
+    """
+    Drop stored buckets, e.g. after importing responses with past timestamps.
+    With `since`, only the buckets from that day on are dropped (and rebuilt).
+    """
+    buckets = ResponseTimelineBucket.objects.filter(survey_id=survey_id)
+    if since is not None:
+        buckets = buckets.filter(bucket_start__gte=bucket_floor(since, DAY))
+    buckets.delete()
+
+
+def forget_response(survey_id, submitted_at):
+    """Take a deleted response out of the stored hour/day buckets (open buckets are counted live)."""
+    ResponseTimelineBucket.objects.filter(
+        Q(granularity=HOUR, bucket_start=bucket_floor(submitted_at, HOUR))
+        | Q(granularity=DAY, bucket_start=bucket_floor(submitted_at, DAY)),
+        survey_id=survey_id,
+        count__gt=0,
+    ).update(count=F('count') - 1)
+
+
+def is_backdated(submitted_at, now=None):
+    """Whether a response with this time may fall into an already stored bucket."""
+    now = now or timezone.now()
+    return submitted_at < bucket_floor(now - CLOSE_GRACE, HOUR)
@@ -12,3 +12,13 @@ def parse_survey_token(token: str) -> int:
     return int(signing.loads(token, salt=SURVEY_TOKEN_SALT, max_age=None))
 
 
+INVITE_TOKEN_SALT = "survey-invite"
+
+
+def make_invite_token(invite_pk: int) -> str:
+    """Per-recipient token carried by invitation links next to the survey token."""
+    return signing.dumps(int(invite_pk), salt=INVITE_TOKEN_SALT)
+
+
+def parse_invite_token(token: str) -> int:
+    return int(signing.loads(token, salt=INVITE_TOKEN_SALT, max_age=None))
@@ -20,16 +20,26 @@ urlpatterns = [
     path('survey/<int:pk>/edit/', views.survey_edit, name='survey_edit'),
     path('survey/<int:pk>/delete/', views.survey_delete, name='survey_delete'),
     path('survey/<int:pk>/collaborators/', views.survey_collaborators, name='survey_collaborators'),
+    path('survey/<int:pk>/invites/', views.survey_invites, name='survey_invites'),
+    path('survey/<int:pk>/kiosks/', views.survey_kiosks, name='survey_kiosks'),
     path('survey/<int:pk>/take/', views.survey_take, name='survey_take'),
+    path('survey/<int:pk>/submit/', views.survey_submit, name='survey_submit'),
+    path('survey/csrf/', views.survey_csrf_token, name='survey_csrf'),
     path('s/<str:token>/', views.survey_take_token, name='survey_take_token'),
     path('s/<str:token>/edit/', views.survey_edit_token, name='survey_edit_token'),
     path('response/<int:response_id>/review/', views.survey_review_response, name='survey_review_response'),
     path('survey/<int:pk>/thankyou/', views.survey_thankyou, name='survey_thankyou'),
+    path('metrics/admission/', views.admission_metrics, name='admission_metrics'),
     path('502/', views.custom_502, name='error_502'),
     path('404-preview/', views.custom_404_preview, name='error_404_preview'),
     path('survey/<int:pk>/results/', views.survey_results, name='survey_results'),
+    path('survey/<int:pk>/results/responses/', views.survey_responses, name='survey_responses'),
+    path('survey/<int:pk>/results/timeline/', views.survey_timeline, name='survey_timeline'),
     path('survey/<int:pk>/export/csv/', views.survey_export_csv, name='survey_export_csv'),
     path('survey/<int:pk>/export/excel/', views.survey_export_excel, name='survey_export_excel'),
+    path('survey/<int:pk>/export/json/', views.survey_export_json, name='survey_export_json'),
+    path('survey/<int:pk>/clone/', views.survey_clone, name='survey_clone'),
+    path('survey/import/', views.survey_import_json, name='survey_import_json'),
     path('survey/<int:survey_pk>/question/add/', views.question_add, name='question_add'),
     path('question/<int:pk>/edit/', views.question_edit, name='question_edit'),
     path('question/<int:pk>/delete/', views.question_delete, name='question_delete'),
@@ -43,5 +53,9 @@ urlpatterns = [
     path('api/question/<int:pk>/upload-image/', views.question_image_upload_ajax, name='question_image_upload_ajax'),
     path('api/question/<int:question_pk>/choice/add/', views.choice_add_ajax, name='choice_add_ajax'),
     path('api/choice/<int:pk>/delete/', views.choice_delete_ajax, name='choice_delete_ajax'),
+    path('api/survey/<int:pk>/definition/', views.survey_definition_api, name='survey_definition_api'),
+    path('api/survey/<int:pk>/batch/', views.survey_batch_ajax, name='survey_batch_ajax'),
+    path('api/survey/<int:pk>/stats/', views.survey_stats_api, name='survey_stats_api'),
+    path('api/kiosk/', views.kiosk_api, name='kiosk_api'),
 ]
 
@@ -30,6 +30,9 @@ from .survey import (  # noqa: F401
     survey_detail,
     survey_detail_token,
     survey_delete,
+    survey_clone,
+    survey_export_json,
+    survey_import_json,
 )
 
 # Collaborators / roles (owner only)
@@ -37,6 +40,17 @@ from .collaborators import (  # noqa: F401
     survey_collaborators,
 )
 
+# Invite list / allowlist (editors)
+from .invites import (  # noqa: F401
+    survey_invites,
+)
+
+# Kiosk devices (editors) and the token-authenticated upload API
+from .kiosk import (  # noqa: F401
+    survey_kiosks,
+    kiosk_api,
+)
+
 # Question & choice management (creator)
 from .questions import (  # noqa: F401
     question_add,
@@ -48,6 +62,8 @@ from .questions import (  # noqa: F401
 # Taking survey (public)
 from .take import (  # noqa: F401
     survey_take,
+    survey_submit,
+    survey_csrf_token,
     survey_take_token,
     survey_edit_token,
     survey_review_response,
@@ -57,6 +73,8 @@ from .take import (  # noqa: F401
 # Results & export (creator)
 from .results import (  # noqa: F401
     survey_results,
+    survey_responses,
+    survey_timeline,
     survey_export_csv,
     survey_export_excel,
 )
@@ -71,6 +89,14 @@ from .api import (  # noqa: F401
     question_image_upload_ajax,
     choice_add_ajax,
     choice_delete_ajax,
+    survey_batch_ajax,
+    survey_definition_api,
+    survey_stats_api,
+)
+
+# Monitoring (staff / METRICS_TOKEN)
+from .metrics import (  # noqa: F401
+    admission_metrics,
 )
 
 # Error handlers
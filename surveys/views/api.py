@@ -1,23 +1,102 @@
 import json
+from functools import wraps
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import parse_etags
 from django.core.files.storage import FileSystemStorage
 from django.conf import settings
 
+from ..builder import (
+    BatchError,
+    RevisionConflict,
+    apply_operations,
+    check_revision,
+    current_revision,
+    definition_etag,
+    reorder_questions,
+    survey_definition,
+)
 from ..models import Survey, Question
-from ..permissions import get_survey_access
+from ..permissions import prime_survey_access, survey_role_subquery
+from ..revisions import freeze_revision
+from ..static_pages import sync_static_page
+from ..stats import chart_payload, get_stats_version, get_survey_stats
+
+
+def _survey_with_access(user, pk):
+    """Load the survey and the user's role on it in a single query."""
+    survey = get_object_or_404(
+        Survey.objects.annotate(viewer_role=survey_role_subquery(user)),
+        pk=pk, is_deleted=False,
+    )
+    return survey, prime_survey_access(user, survey, survey.viewer_role)
+
+
+def _question_with_access(user, pk):
+    """Load the question, its survey and the user's role in a single query."""
+    question = get_object_or_404(
+        Question.objects.select_related('survey').annotate(viewer_role=survey_role_subquery(user, 'survey_id')),
+        pk=pk,
+    )
+    return question, prime_survey_access(user, question.survey, question.viewer_role)
+
+
+def _revision_write(view):
+    """
+    Builder writes run in a transaction; when the view called `_check_if_match`
+    the successful response carries the new definition ETag.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with transaction.atomic():
+            response = view(request, *args, **kwargs)
+        survey_id = getattr(request, '_revision_survey_id', None)
+        if survey_id is not None and response.status_code == 200 and not response.has_header('ETag'):
+            response['ETag'] = definition_etag(survey_id, current_revision(survey_id))
+        return response
+    return wrapped
+
+
+def _check_if_match(request, survey, required=True):
+    """
+    Optimistic concurrency: 412 if If-Match names an older revision of the
+    survey, 428 if a definition write does not send If-Match at all.
+    """
+    request._revision_survey_id = survey.pk
+    header = request.headers.get('If-Match')
+    if not header:
+        if not required:
+            return None
+        response = JsonResponse({
+            'success': False,
+            'error': 'Thiếu header If-Match: hãy tải lại trang trước khi chỉnh sửa.',
+        }, status=428)
+        response['ETag'] = definition_etag(survey.pk, current_revision(survey.pk))
+        return response
+    try:
+        check_revision(survey.pk, parse_etags(header))
+    except RevisionConflict as e:
+        response = JsonResponse({'success': False, 'error': str(e), 'revision': e.revision}, status=412)
+        response['ETag'] = definition_etag(survey.pk, e.revision)
+        return response
+    return None
 
 
 @login_required
 @require_http_methods(["POST"])
+@_revision_write
 def question_add_ajax(request, survey_pk):
-    survey = get_object_or_404(Survey, pk=survey_pk, is_deleted=False)
-    access = get_survey_access(request.user, survey)
+    survey, access = _survey_with_access(request.user, survey_pk)
     if not access.can_edit:
         return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    conflict = _check_if_match(request, survey)
+    if conflict:
+        return conflict
 
     try:
         data = json.loads(request.body)
@@ -54,12 +133,14 @@ def question_add_ajax(request, survey_pk):
 
 @login_required
 @require_http_methods(["POST"])
+@_revision_write
 def question_update_ajax(request, pk):
-    question = get_object_or_404(Question, pk=pk)
-
-    access = get_survey_access(request.user, question.survey)
+    question, access = _question_with_access(request.user, pk)
     if not access.can_edit:
         return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    conflict = _check_if_match(request, question.survey)
+    if conflict:
+        return conflict
 
     try:
         data = json.loads(request.body)
@@ -98,12 +179,14 @@ def question_update_ajax(request, pk):
 
 @login_required
 @require_http_methods(["POST"])
+@_revision_write
 def question_delete_ajax(request, pk):
-    question = get_object_or_404(Question, pk=pk)
-
-    access = get_survey_access(request.user, question.survey)
+    question, access = _question_with_access(request.user, pk)
     if not access.can_edit:
         return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    conflict = _check_if_match(request, question.survey)
+    if conflict:
+        return conflict
 
     try:
         question.delete()
@@ -114,36 +197,49 @@ def question_delete_ajax(request, pk):
 
 @login_required
 @require_http_methods(["POST"])
+@_revision_write
 def question_reorder_ajax(request, survey_pk):
-    survey = get_object_or_404(Survey, pk=survey_pk, is_deleted=False)
-    access = get_survey_access(request.user, survey)
+    survey, access = _survey_with_access(request.user, survey_pk)
     if not access.can_edit:
         return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    conflict = _check_if_match(request, survey)
+    if conflict:
+        return conflict
 
     try:
         data = json.loads(request.body)
         question_orders = data.get('orders', [])  # [{id: 1, order: 1}, {id: 2, order: 2}]
 
-        for item in question_orders:
-            Question.objects.filter(pk=item['id'], survey=survey).update(order=item['order'])
+        # One atomic UPDATE ... CASE WHEN for all questions
+        reorder_questions(survey, question_orders)
 
         return JsonResponse({'success': True})
+    except BatchError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
 @login_required
 @require_http_methods(["POST"])
+@_revision_write
 def survey_publish_toggle_ajax(request, pk):
-    survey = get_object_or_404(Survey, pk=pk, is_deleted=False)
-    access = get_survey_access(request.user, survey)
+    survey, access = _survey_with_access(request.user, pk)
     if not access.can_publish:
         return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    # Publishing does not change the definition; pages other than the builder
+    # do not track the ETag
+    conflict = _check_if_match(request, survey, required=False)
+    if conflict:
+        return conflict
     try:
         data = json.loads(request.body or "{}")
         is_active = bool(data.get('is_active', True))
         survey.is_active = is_active
         survey.save(update_fields=['is_active'])
+        if survey.is_active:
+            freeze_revision(survey)
+        sync_static_page(survey)
         return JsonResponse({'success': True, 'is_active': survey.is_active})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
@@ -151,12 +247,14 @@ def survey_publish_toggle_ajax(request, pk):
 
 @login_required
 @require_http_methods(["POST"])
+@_revision_write
 def question_image_upload_ajax(request, pk):
-    question = get_object_or_404(Question, pk=pk)
-
-    access = get_survey_access(request.user, question.survey)
+    question, access = _question_with_access(request.user, pk)
     if not access.can_edit:
         return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    conflict = _check_if_match(request, question.survey)
+    if conflict:
+        return conflict
 
     image_file = request.FILES.get('image')
     if not image_file:
@@ -180,12 +278,14 @@ def question_image_upload_ajax(request, pk):
 
 @login_required
 @require_http_methods(["POST"])
+@_revision_write
 def choice_add_ajax(request, question_pk):
-    question = get_object_or_404(Question, pk=question_pk)
-
-    access = get_survey_access(request.user, question.survey)
+    question, access = _question_with_access(request.user, question_pk)
     if not access.can_edit:
         return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    conflict = _check_if_match(request, question.survey)
+    if conflict:
+        return conflict
 
     try:
         data = json.loads(request.body)
@@ -213,12 +313,14 @@ def choice_add_ajax(request, question_pk):
 
 @login_required
 @require_http_methods(["POST"])
+@_revision_write
 def choice_delete_ajax(request, pk):
-    question = get_object_or_404(Question, pk=pk)
-
-    access = get_survey_access(request.user, question.survey)
+    question, access = _question_with_access(request.user, pk)
     if not access.can_edit:
         return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    conflict = _check_if_match(request, question.survey)
+    if conflict:
+        return conflict
 
     try:
         data = json.loads(request.body)
@@ -248,3 +350,100 @@ def choice_delete_ajax(request, pk):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
+@login_required
+@require_http_methods(["POST"])
+@_revision_write
+def survey_batch_ajax(request, pk):
+    """
+    Apply an ordered list of builder operations in one transaction:
+    {"operations": [{"op": "question_update", "id": 3, "text": "..."}, ...]}
+    """
+    survey, access = _survey_with_access(request.user, pk)
+    if not access.can_edit:
+        return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+    conflict = _check_if_match(request, survey)
+    if conflict:
+        return conflict
+
+    try:
+        data = json.loads(request.body or "{}")
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Dữ liệu không hợp lệ'}, status=400)
+
+    try:
+        results, questions = apply_operations(survey, data.get('operations') if isinstance(data, dict) else None)
+    except BatchError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'index': e.index}, status=400)
+
+    survey.revision = current_revision(survey.pk)
+    response = JsonResponse({
+        'success': True,
+        'results': results,
+        'survey': survey_definition(survey, questions),
+    })
+    response['ETag'] = definition_etag(survey.pk, survey.revision)
+    return response
+
+
+@login_required
+@require_http_methods(["GET", "HEAD"])
+def survey_definition_api(request, pk):
+    """
+    Survey structure as JSON. The ETag follows Survey.revision, so clients
+    polling with If-None-Match get an empty 304 until something changes.
+    """
+    survey, access = _survey_with_access(request.user, pk)
+    if not access.can_view_results:
+        return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+
+    etag = definition_etag(survey.pk, survey.revision)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = JsonResponse({'success': True, 'survey': survey_definition(survey)})
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _stats_etag(survey_id, version, percentage_base):
+    return f'"stats-{survey_id}-{version}-{percentage_base}"'
+
+
+@login_required
+@require_http_methods(["GET", "HEAD"])
+def survey_stats_api(request, pk):
+    """
+    Chart data for choice questions: ?question=<id>[,<id>...] limits the
+    payload, ?base=responses switches the percentage denominator.
+    """
+    survey, access = _survey_with_access(request.user, pk)
+    if not access.can_view_results:
+        return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+
+    try:
+        question_ids = [int(x) for x in request.GET.get('question', '').split(',') if x.strip()]
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'question không hợp lệ'}, status=400)
+    percentage_base = 'responses' if request.GET.get('base') == 'responses' else 'selected'
+
+    # The stats version changes whenever a question or response changes
+    etag = _stats_etag(survey.pk, get_stats_version(survey.pk), percentage_base)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    payload = get_survey_stats(survey, survey.questions.all())
+    # While another request computes the current version an older payload is
+    # served; tag it with its own version so the client asks again later
+    etag = _stats_etag(survey.pk, payload['version'], percentage_base)
+    charts = chart_payload(payload, question_ids=set(question_ids) or None, percentage_base=percentage_base)
+    response = JsonResponse({
+        'success': True,
+        'total_responses': payload['total_responses'],
+        'questions': {str(qid): data for qid, data in charts.items()},
+    })
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -11,6 +11,7 @@ from django.urls import reverse
 import requests
 
 from ..forms import UserRegisterForm, UserProfileForm
+from ..ratelimit import rate_limit
 
 def verify_turnstile(request):
     token = request.POST.get('cf-turnstile-response')
@@ -31,6 +32,7 @@ def verify_turnstile(request):
 User = get_user_model()
 
 
+@rate_limit('register', '10/h')
 def register_view(request):
     if request.user.is_authenticated:
         return redirect('surveys:home')
@@ -112,6 +114,8 @@ def activate_account(request, uidb64, token):
     return redirect('surveys:login')
 
 
+@rate_limit('login', '30/m')
+@rate_limit('login_username', '10/m', keys=('post:username',))
 def login_view(request):
     """Trang đăng nhập"""
     if request.user.is_authenticated:
@@ -150,6 +154,7 @@ def logout_view(request):
     return redirect('surveys:home')
 
 
+@rate_limit('password_reset', '10/h', keys=('ip', 'post:email'))
 def password_reset_request(request):
     if request.method == 'POST':
         email = request.POST.get('email', '').strip()
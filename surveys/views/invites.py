@@ -0,0 +1,121 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count
+from django.shortcuts import get_object_or_404, redirect, render
+
+from ..campaigns import create_campaign
+from ..invites import add_invites, parse_emails, read_csv_emails, remove_invites
+from ..models import InviteCampaign, Survey, SurveyInvite
+from ..pagination import keyset_paginate
+from ..permissions import get_survey_access
+
+INVITES_PAGE_SIZE = 50
+MAX_INVITE_FILE_SIZE = 5 * 1024 * 1024
+
+
+def _report_added(request, added, total, invalid):
+    skipped = total - added
+    text = f"Đã thêm {added} email mới."
+    if skipped:
+        text += f" {skipped} email đã có trong danh sách."
+    if invalid:
+        text += f" Bỏ qua {invalid} dòng không hợp lệ."
+    messages.success(request, text)
+
+
+@login_required
+def survey_invites(request, pk):
+    survey = get_object_or_404(Survey, pk=pk, is_deleted=False)
+    access = get_survey_access(request.user, survey)
+    if not access.can_edit:
+        messages.error(request, "Bạn không có quyền quản lý danh sách mời của khảo sát này.")
+        return redirect("surveys:survey_detail", pk=survey.pk)
+
+    if request.method == "POST":
+        action = request.POST.get("action", "").strip()
+
+        if action == "import":
+            uploaded = request.FILES.get("csv_file")
+            if not uploaded:
+                messages.error(request, "Vui lòng chọn file CSV.")
+            elif uploaded.size > MAX_INVITE_FILE_SIZE:
+                messages.error(request, "File quá lớn (tối đa 5MB).")
+            else:
+                emails, invalid = parse_emails(read_csv_emails(uploaded.file))
+                _report_added(request, add_invites(survey, emails), len(emails), invalid)
+            return redirect("surveys:survey_invites", pk=survey.pk)
+
+        if action == "add":
+            emails, invalid = parse_emails(request.POST.get("emails", "").replace(",", "\n").splitlines())
+            if not emails:
+                messages.error(request, "Không có email hợp lệ nào.")
+            else:
+                _report_added(request, add_invites(survey, emails), len(emails), invalid)
+            return redirect("surveys:survey_invites", pk=survey.pk)
+
+        if action == "remove":
+            invite = get_object_or_404(SurveyInvite, pk=request.POST.get("invite_id"), survey=survey)
+            remove_invites(survey, [invite.pk])
+            messages.success(request, f"Đã xóa {invite.email} khỏi danh sách mời.")
+            return redirect("surveys:survey_invites", pk=survey.pk)
+
+        if action == "campaign":
+            subject = request.POST.get("subject", "").strip() or f"Mời tham gia khảo sát: {survey.title}"
+            campaign = create_campaign(
+                survey,
+                request.user,
+                subject=subject[:200],
+                message=request.POST.get("message", "").strip(),
+                base_url=request.build_absolute_uri("/"),
+                retry_failed=bool(request.POST.get("retry_failed")),
+            )
+            if campaign.total:
+                messages.success(request, f"Đã xếp hàng gửi {campaign.total} lời mời. Email sẽ được gửi dần theo lô.")
+            else:
+                messages.info(request, "Không có email nào đang chờ gửi lời mời.")
+            return redirect("surveys:survey_invites", pk=survey.pk)
+
+        if action == "clear":
+            deleted = remove_invites(survey)
+            messages.success(request, f"Đã xóa {deleted} email. Khảo sát không còn giới hạn theo danh sách mời.")
+            return redirect("surveys:survey_invites", pk=survey.pk)
+
+        messages.error(request, "Thao tác không hợp lệ.")
+        return redirect("surveys:survey_invites", pk=survey.pk)
+
+    invites = SurveyInvite.objects.filter(survey=survey)
+    status = request.GET.get("status", "")
+    if status in dict(SurveyInvite.STATUS_CHOICES):
+        invites = invites.filter(status=status)
+    else:
+        status = ""
+
+    page = keyset_paginate(
+        invites,
+        fields=("id",),
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        page_size=INVITES_PAGE_SIZE,
+    )
+    status_counts = dict(
+        SurveyInvite.objects.filter(survey=survey)
+        .order_by()
+        .values("status")
+        .annotate(n=Count("id"))
+        .values_list("status", "n")
+    )
+
+    return render(
+        request,
+        "surveys/survey_management/survey_invites.html",
+        {
+            "survey": survey,
+            "page": page,
+            "invites": page.items,
+            "status": status,
+            "campaigns": InviteCampaign.objects.filter(survey=survey)[:5],
+            "status_filters": [
+                (value, label, status_counts.get(value, 0)) for value, label in SurveyInvite.STATUS_CHOICES
+            ],
+        },
+    )
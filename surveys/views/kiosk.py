@@ -0,0 +1,90 @@
+import json
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from ..kiosk import KioskError, authenticate, create_device, definition, ingest
+from ..models import KioskDevice, Survey
+from ..permissions import get_survey_access
+from ..ratelimit import rate_limit
+
+
+def _max_body_size():
+    return getattr(settings, 'KIOSK_MAX_BODY_SIZE', 20 * 1024 * 1024)
+
+
+@rate_limit('kiosk_upload', '30/m')
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def kiosk_api(request):
+    """
+    Token-authenticated kiosk endpoint: GET returns the compiled question set,
+    POST uploads a batch of offline responses (see surveys/kiosk.py).
+    """
+    device = authenticate(request)
+    if device is None:
+        return JsonResponse({'success': False, 'error': 'Token thiết bị không hợp lệ hoặc đã bị thu hồi'}, status=401)
+
+    if request.method == 'GET':
+        return JsonResponse({'success': True, **definition(device)})
+
+    # Read the stream directly: a full batch is larger than DATA_UPLOAD_MAX_MEMORY_SIZE
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length > _max_body_size():
+        return JsonResponse({'success': False, 'error': 'Dữ liệu tải lên quá lớn'}, status=413)
+    try:
+        payload = json.loads(request.read(_max_body_size()) or b'null')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'JSON không hợp lệ'}, status=400)
+
+    try:
+        result = ingest(device, payload)
+    except KioskError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+    return JsonResponse(result)
+
+
+@login_required
+def survey_kiosks(request, pk):
+    survey = get_object_or_404(Survey, pk=pk, is_deleted=False)
+    access = get_survey_access(request.user, survey)
+    if not access.can_edit:
+        messages.error(request, "Bạn không có quyền quản lý thiết bị kiosk của khảo sát này.")
+        return redirect("surveys:survey_detail", pk=survey.pk)
+
+    new_token = None
+    if request.method == "POST":
+        action = request.POST.get("action", "").strip()
+        if action == "create":
+            name = request.POST.get("name", "").strip()[:100] or "Thiết bị kiosk"
+            device, new_token = create_device(survey, request.user, name)
+            messages.success(request, f"Đã tạo thiết bị \"{device.name}\". Sao chép token ngay, token chỉ hiển thị một lần.")
+        elif action == "revoke":
+            device = get_object_or_404(KioskDevice, pk=request.POST.get("device_id"), survey=survey)
+            KioskDevice.objects.filter(pk=device.pk, revoked_at__isnull=True).update(revoked_at=timezone.now())
+            messages.success(request, f"Đã thu hồi token của thiết bị \"{device.name}\".")
+            return redirect("surveys:survey_kiosks", pk=survey.pk)
+        else:
+            messages.error(request, "Thao tác không hợp lệ.")
+            return redirect("surveys:survey_kiosks", pk=survey.pk)
+
+    return render(
+        request,
+        "surveys/survey_management/survey_kiosks.html",
+        {
+            "survey": survey,
+            "devices": KioskDevice.objects.filter(survey=survey),
+            "new_token": new_token,
+            "api_url": request.build_absolute_uri(reverse("surveys:kiosk_api")),
+        },
+    )
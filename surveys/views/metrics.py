@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+from ..admission import concurrency_limit, snapshot
+
+
+def _metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    auth = request.headers.get('authorization', '')
+    if token and auth.startswith('Bearer ') and constant_time_compare(auth[7:], token):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+@never_cache
+def admission_metrics(request):
+    """Submission admission gauges in the Prometheus text format (staff or METRICS_TOKEN)."""
+    if not _metrics_allowed(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    lines = [
+        '# HELP survey_submit_concurrency_limit Concurrent submissions allowed per survey.',
+        '# TYPE survey_submit_concurrency_limit gauge',
+        f'survey_submit_concurrency_limit {concurrency_limit()}',
+        '# HELP survey_submit_in_flight Submissions being processed.',
+        '# TYPE survey_submit_in_flight gauge',
+    ]
+    stats = snapshot()
+    lines += [f'survey_submit_in_flight{{survey="{pk}"}} {in_flight}' for pk, (in_flight, _) in stats.items()]
+    lines += [
+        '# HELP survey_submit_queue_depth Submissions turned away and retrying (recent window).',
+        '# TYPE survey_submit_queue_depth gauge',
+    ]
+    lines += [f'survey_submit_queue_depth{{survey="{pk}"}} {depth}' for pk, (_, depth) in stats.items()]
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
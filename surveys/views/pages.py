@@ -1,39 +1,36 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
+from django.db.models import Count, Sum
 
-from ..models import Survey, Response
+from ..counters import get_site_counters
+from ..models import Survey
+from ..permissions import accessible_survey_ids
 
 
 def home(request):
+    counters = get_site_counters()
     context = {
-        'total_surveys': Survey.objects.filter(is_active=True, is_deleted=False).count(),
-        'total_responses': Response.objects.count(),
+        'total_surveys': counters['active_surveys'],
+        'total_responses': counters['total_responses'],
     }
     return render(request, 'surveys/pages/home.html', context)
 
 
 @login_required
 def dashboard(request):
-    total_surveys = Survey.objects.filter(is_deleted=False).count()
-    total_responses = Response.objects.count()
-
-    user_surveys = (
-        Survey.objects.filter(is_deleted=False)
-        .filter(Q(creator=request.user) | Q(collaborators__user=request.user))
-        .distinct()
-        .annotate(response_count=Count('responses', distinct=True))
-        .order_by('-created_at')
-    )
-    user_surveys_count = user_surveys.count()
-    user_responses_count = Response.objects.filter(survey__in=user_surveys).count()
+    counters = get_site_counters()
+
+    user_surveys = Survey.objects.filter(pk__in=accessible_survey_ids(request.user), is_deleted=False)
+    summary = user_surveys.aggregate(surveys=Count('id'), responses=Sum('response_count'))
+    user_surveys_count = summary['surveys']
+    user_responses_count = summary['responses'] or 0
 
     context = {
-        'total_surveys': total_surveys,
-        'total_responses': total_responses,
+        'total_surveys': counters['total_surveys'],
+        'total_responses': counters['total_responses'],
         'user_surveys_count': user_surveys_count,
         'user_responses_count': user_responses_count,
-        'recent_user_surveys': user_surveys[:5],
+        'recent_user_surveys': user_surveys.order_by('-created_at', '-id')[:5],
     }
     return render(request, 'surveys/dashboard/dashboard.html', context)
 
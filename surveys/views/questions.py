@@ -41,7 +41,7 @@ def question_add(request, survey_pk):
 @login_required
 def question_edit(request, pk):
     """Chỉnh sửa câu hỏi"""
-    question = get_object_or_404(Question, pk=pk)
+    question = get_object_or_404(Question.objects.select_related('survey'), pk=pk)
     survey = question.survey
 
     access = get_survey_access(request.user, survey)
@@ -68,7 +68,7 @@ def question_edit(request, pk):
 
 @login_required
 def question_delete(request, pk):
-    question = get_object_or_404(Question, pk=pk)
+    question = get_object_or_404(Question.objects.select_related('survey'), pk=pk)
     survey = question.survey
 
     access = get_survey_access(request.user, survey)
@@ -90,7 +90,7 @@ def question_delete(request, pk):
 
 @login_required
 def choice_add(request, question_pk):
-    question = get_object_or_404(Question, pk=question_pk)
+    question = get_object_or_404(Question.objects.select_related('survey'), pk=question_pk)
     survey = question.survey
 
     access = get_survey_access(request.user, survey)
@@ -4,13 +4,17 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
-from django.http import HttpResponse
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
 
 from ..models import Survey, ResponseAttachment
+from ..pagination import keyset_paginate
 from ..permissions import get_survey_access
+from ..stats import build_stats_context
+from ..timeline import DAY, HOUR, get_timeline
 
 
 @login_required
@@ -20,96 +24,89 @@ def survey_results(request, pk):
     if not access.can_view_results:
         return render(request, 'errors/404.html', status=404)
 
-    responses = survey.responses.all()
-    questions = survey.questions.all().order_by('order')
+    questions = list(survey.questions.all().order_by('order'))
 
-    stats = []
-    total_responses_count = responses.count()
+    stats, total_responses_count = build_stats_context(survey, questions)
 
-    for question in questions:
-        question_id_str = str(question.id)
+    context = {
+        'survey': survey,
+        'stats': stats,
+        'total_questions': len(questions),
+        'total_responses': total_responses_count
+    }
+    return render(request, 'surveys/survey_management/survey_results.html', context)
 
-        if question.question_type not in ['text', 'single', 'multiple', 'upload']:
-            continue
 
-        if question.question_type == 'text':
-            text_answers = []
-            for response in responses:
-                if response.response_data and question_id_str in response.response_data:
-                    answer_value = response.response_data[question_id_str]
-                    if isinstance(answer_value, str) and answer_value.strip():
-                        text_answers.append(answer_value)
+RESPONSES_PAGE_SIZE = 20
 
-            stats.append({
-                'question': question,
-                'type': 'text',
-                'answers': text_answers[:10],  # Hiển thị 10 câu trả lời đầu
-                'total': len(text_answers)
-            })
-        elif question.question_type == 'upload':
-            # Count & sample attachments
-            q_attachments = (
-                ResponseAttachment.objects
-                .filter(response__survey=survey, question=question)
-                .select_related("response")
-                .order_by("-uploaded_at")
-            )
-            total = q_attachments.count()
-            samples = list(q_attachments[:10])
-            stats.append({
-                'question': question,
-                'type': 'upload',
-                'attachments': samples,
-                'total': total,
-            })
-        else:
-            choice_stats = []
-            if question.options:
-                # First pass: count selections per option
-                counts = []
-                for option_text in question.options:
-                    count = 0
-                    for response in responses:
-                        if response.response_data and question_id_str in response.response_data:
-                            answer_value = response.response_data[question_id_str]
-                            if question.question_type == 'single':
-                                if answer_value == option_text:
-                                    count += 1
-                            elif question.question_type == 'multiple':
-                                if isinstance(answer_value, list) and option_text in answer_value:
-                                    count += 1
-                    counts.append(count)
-
-                # Use the same denominator as the doughnut chart (sum of all option counts)
-                # - For single choice: equals number of answers given (may be < total responses if some skipped)
-                # - For multiple choice: equals total selections (can be > total responses)
-                percentage_base = sum(counts)
-
-                for idx, option_text in enumerate(question.options):
-                    count = counts[idx]
-                    percentage = (count / percentage_base * 100) if percentage_base > 0 else 0
-                    choice_stats.append({
-                        'option': option_text,
-                        'index': idx,
-                        'count': count,
-                        'percentage': round(percentage, 1),
-                    })
-
-            stats.append({
+
+@login_required
+def survey_responses(request, pk):
+    """Xem từng phản hồi, phân trang theo (submitted_at, id) thay vì OFFSET."""
+    survey = get_object_or_404(Survey, pk=pk, is_deleted=False)
+    access = get_survey_access(request.user, survey)
+    if not access.can_view_results:
+        return render(request, 'errors/404.html', status=404)
+
+    questions = [
+        q for q in survey.questions.all().order_by('order')
+        if q.question_type in ('text', 'single', 'multiple', 'upload')
+    ]
+
+    page = keyset_paginate(
+        survey.responses
+        .select_related('respondent')
+        .prefetch_related(Prefetch('attachments', queryset=ResponseAttachment.objects.only(
+            'id', 'response_id', 'question_id', 'file', 'original_name', 'content_type',
+        ))),
+        fields=('submitted_at', 'id'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=RESPONSES_PAGE_SIZE,
+    )
+
+    rows = []
+    for resp in page.items:
+        data = resp.response_data or {}
+        attachments = {att.question_id: att for att in resp.attachments.all()}
+        answers = []
+        for question in questions:
+            value = data.get(str(question.id))
+            att = attachments.get(question.id)
+            answers.append({
                 'question': question,
-                'type': question.question_type,
-                'choices': choice_stats,
-                'total': total_responses_count,
-                'total_selected': sum(cs['count'] for cs in choice_stats),
+                'value': ', '.join(str(v) for v in value) if isinstance(value, list) else value,
+                'attachment': att,
+                'is_image': bool(att and (att.content_type or '').startswith('image/')),
             })
+        rows.append({'response': resp, 'answers': answers})
 
-    context = {
+    return render(request, 'surveys/survey_management/survey_responses.html', {
         'survey': survey,
-        'responses': responses,
-        'stats': stats,
-        'total_responses': total_responses_count
-    }
-    return render(request, 'surveys/survey_management/survey_results.html', context)
+        'rows': rows,
+        'page': page,
+    })
+
+
+@login_required
+def survey_timeline(request, pk):
+    survey = get_object_or_404(Survey, pk=pk, is_deleted=False)
+    access = get_survey_access(request.user, survey)
+    if not access.can_view_results:
+        return JsonResponse({'success': False, 'error': 'Không có quyền'}, status=403)
+
+    granularity = request.GET.get('granularity', DAY)
+    if granularity not in (HOUR, DAY):
+        return JsonResponse({'success': False, 'error': 'granularity không hợp lệ'}, status=400)
+
+    series = get_timeline(survey, granularity)
+    label_format = '%H:%M %d/%m' if granularity == HOUR else '%d/%m'
+    return JsonResponse({
+        'success': True,
+        'granularity': granularity,
+        'labels': [timezone.localtime(point['start']).strftime(label_format) for point in series],
+        'counts': [point['count'] for point in series],
+    })
 
 
 @login_required
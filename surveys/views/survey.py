@@ -1,30 +1,55 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import make_password
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.utils import timezone
 from django.urls import reverse
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 
-from ..models import Survey, SurveyCollaborator
-from ..models import ResponseAttachment
+from ..buffer import pending_count
+from ..builder import BatchError, clone_survey, export_definition, import_definition
+from ..models import Question, Survey, SurveyCollaborator
 from ..forms import SurveyForm
-from ..permissions import get_survey_access
+from ..pagination import keyset_paginate
+from ..permissions import accessible_survey_ids, get_survey_access, get_survey_access_many
+from ..static_pages import page_url as static_page_url, sync_static_page
+from ..stats import build_stats_context
 from ..tokens import make_survey_token, parse_survey_token
 
 
+SURVEYS_PAGE_SIZE = 12
+
+
 @login_required
 def survey_list(request):
-    surveys = (
-        Survey.objects.filter(is_deleted=False)
-        .filter(Q(creator=request.user) | Q(collaborators__user=request.user))
-        .distinct()
-        .annotate(response_count=Count('responses', distinct=True))
-        .order_by('-created_at')
+    page = keyset_paginate(
+        Survey.objects.filter(pk__in=accessible_survey_ids(request.user), is_deleted=False),
+        fields=('created_at', 'id'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=SURVEYS_PAGE_SIZE,
+    )
+    surveys = page.items
+
+    # Question counts for this page only, in one grouped query
+    question_counts = dict(
+        Question.objects.filter(survey_id__in=[s.pk for s in surveys])
+        .order_by()
+        .values_list('survey_id')
+        .annotate(n=Count('id'))
     )
+    access = get_survey_access_many(request.user, surveys)
+    for survey in surveys:
+        survey.question_count = question_counts.get(survey.pk, 0)
+        survey.access = access[survey.pk]
 
     context = {
         'surveys': surveys,
+        'page': page,
     }
     return render(request, 'surveys/survey_management/survey_list.html', context)
 
@@ -75,6 +100,7 @@ def survey_edit(request, pk):
             if raw_password:
                 survey.password = make_password(raw_password)
             survey.save()
+            sync_static_page(survey)
             messages.success(request, 'Đã cập nhật khảo sát thành công!')
             return redirect('surveys:survey_detail_token', token=make_survey_token(survey.pk))
     else:
@@ -106,7 +132,8 @@ def _survey_detail_core(request, pk):
     questions = survey.questions.all().order_by('order')
 
     is_expired = survey.expires_at and survey.expires_at < timezone.now()
-    responses_count = survey.responses.count()
+    # Buffered submissions count towards the limit before they are flushed
+    responses_count = survey.response_count + pending_count(survey)
     max_responses = survey.max_responses
     is_limit_reached = bool(max_responses) and responses_count >= max_responses
     remaining_slots = max_responses - responses_count if max_responses else None
@@ -136,78 +163,17 @@ def _survey_detail_core(request, pk):
         'share_link_edit': request.build_absolute_uri(
             reverse('surveys:survey_edit_token', args=[make_survey_token(survey.pk)])
         ),
+        'static_take_url': (
+            request.build_absolute_uri(static_page_url(survey.pk))
+            if survey.static_revision is not None else None
+        ),
     }
 
     if can_edit:
-        responses = survey.responses.all()
-        total_responses_count = responses.count()
-
-        stats = []
-        for question in questions:
-            question_id_str = str(question.id)
-
-            if question.question_type not in ['text', 'single', 'multiple', 'upload']:
-                continue
-
-            if question.question_type == 'text':
-                text_answers = []
-                for response in responses:
-                    if response.response_data and question_id_str in response.response_data:
-                        answer_value = response.response_data[question_id_str]
-                        if isinstance(answer_value, str) and answer_value.strip():
-                            text_answers.append(answer_value)
-
-                stats.append({
-                    'question': question,
-                    'type': 'text',
-                    'answers': text_answers[:10],
-                    'total': len(text_answers)
-                })
-            elif question.question_type == 'upload':
-                q_attachments = (
-                    ResponseAttachment.objects
-                    .filter(response__survey=survey, question=question)
-                    .order_by("-uploaded_at")
-                )
-                stats.append({
-                    'question': question,
-                    'type': 'upload',
-                    'attachments': list(q_attachments[:10]),
-                    'total': q_attachments.count(),
-                })
-            else:
-                choice_stats = []
-                if question.options:
-                    for idx, option_text in enumerate(question.options):
-                        count = 0
-                        for response in responses:
-                            if response.response_data and question_id_str in response.response_data:
-                                answer_value = response.response_data[question_id_str]
-                                if question.question_type == 'single':
-                                    if answer_value == option_text:
-                                        count += 1
-                                elif question.question_type == 'multiple':
-                                    if isinstance(answer_value, list) and option_text in answer_value:
-                                        count += 1
-
-                        percentage = (count / total_responses_count * 100) if total_responses_count > 0 else 0
-                        choice_stats.append({
-                            'option': option_text,
-                            'index': idx,
-                            'count': count,
-                            'percentage': round(percentage, 1)
-                        })
-
-                stats.append({
-                    'question': question,
-                    'type': question.question_type,
-                    'choices': choice_stats,
-                    'total': total_responses_count
-                })
+        stats, total_responses_count = build_stats_context(survey, questions)
 
         context['stats'] = stats
         context['total_responses'] = total_responses_count
-        context['responses'] = responses
 
     return render(request, template_name, context)
 
@@ -225,6 +191,7 @@ def survey_delete(request, pk):
         survey.is_active = False
         survey.deleted_at = timezone.now()
         survey.save(update_fields=['is_deleted', 'is_active', 'deleted_at'])
+        sync_static_page(survey)
         messages.success(request, 'Đã xóa khảo sát. Khảo sát sẽ ngừng nhận phản hồi.')
         return redirect('surveys:survey_list')
 
@@ -233,3 +200,57 @@ def survey_delete(request, pk):
     })
 
 
+MAX_TEMPLATE_FILE_SIZE = 2 * 1024 * 1024
+
+
+@login_required
+@require_POST
+def survey_clone(request, pk):
+    survey = get_object_or_404(Survey, pk=pk, is_deleted=False)
+    access = get_survey_access(request.user, survey)
+    if not access.can_edit:
+        messages.error(request, 'Bạn không có quyền nhân bản khảo sát này!')
+        return redirect('surveys:survey_list')
+
+    clone = clone_survey(survey, request.user)
+    messages.success(request, 'Đã nhân bản khảo sát (ở trạng thái nháp).')
+    return redirect('surveys:survey_detail_token', token=make_survey_token(clone.pk))
+
+
+@login_required
+def survey_export_json(request, pk):
+    """Tải định nghĩa khảo sát (cài đặt + câu hỏi) dưới dạng file mẫu JSON."""
+    survey = get_object_or_404(Survey, pk=pk, is_deleted=False)
+    access = get_survey_access(request.user, survey)
+    if not access.can_edit:
+        return render(request, 'errors/404.html', status=404)
+
+    response = JsonResponse(export_definition(survey), json_dumps_params={'ensure_ascii': False, 'indent': 2})
+    response['Content-Disposition'] = f'attachment; filename="survey_{survey.pk}.json"'
+    return response
+
+
+@login_required
+@require_POST
+def survey_import_json(request):
+    upload = request.FILES.get('template')
+    if not upload:
+        messages.error(request, 'Vui lòng chọn file mẫu (.json)!')
+        return redirect('surveys:survey_list')
+    if upload.size > MAX_TEMPLATE_FILE_SIZE:
+        messages.error(request, 'File mẫu quá lớn (tối đa 2MB)!')
+        return redirect('surveys:survey_list')
+
+    try:
+        data = json.loads(upload.read().decode('utf-8'))
+        survey = import_definition(data, request.user)
+    except (UnicodeDecodeError, ValueError):
+        messages.error(request, 'File mẫu không phải JSON hợp lệ!')
+        return redirect('surveys:survey_list')
+    except BatchError as e:
+        detail = f' (câu hỏi #{e.index + 1})' if e.index is not None else ''
+        messages.error(request, f'Không thể nhập file mẫu: {e}{detail}')
+        return redirect('surveys:survey_list')
+
+    messages.success(request, 'Đã tạo khảo sát từ file mẫu (ở trạng thái nháp).')
+    return redirect('surveys:survey_detail_token', token=make_survey_token(survey.pk))
@@ -1,4 +1,3 @@
-from uuid import uuid4
 from urllib.parse import quote
 
 import requests
@@ -11,15 +10,188 @@ from django.conf import settings
 from django.urls import reverse
 from django.core import signing
 from django.core.mail import send_mail
-
-from ..models import Survey, Response, ResponseAttachment
+from django.db import transaction
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
+
+from ..admission import admission_control
+from ..buffer import buffer_response, has_pending, is_full
+from ..invites import is_invited, mark_responded
+from ..models import Survey, SurveyInvite, Response, ResponseAttachment
+from ..ratelimit import rate_limit
+from ..respondent import respondent_state
+from ..revisions import get_snapshot, revision_questions
+from ..static_pages import is_static_eligible, sync_static_page
+from ..terms import record_response_terms
+from ..tokens import parse_invite_token
 from .utils import get_client_ip
 
 
+TURNSTILE_VERIFY_URL = 'https://challenges.cloudflare.com/turnstile/v0/siteverify'
+
+
+def _verify_turnstile(request):
+    """Check the Cloudflare Turnstile token; returns an error message or None."""
+    cf_response = request.POST.get('cf-turnstile-response')
+    if not cf_response:
+        return 'Vui lòng hoàn thành xác minh captcha.'
+
+    verify_data = {
+        'secret': settings.CLOUDFLARE_TURNSTILE_SECRET_KEY,
+        'response': cf_response,
+        'remoteip': get_client_ip(request)
+    }
+    try:
+        verify_result = requests.post(TURNSTILE_VERIFY_URL, data=verify_data, timeout=10).json()
+    except requests.RequestException:
+        return 'Không thể xác minh captcha. Vui lòng thử lại sau.'
+    if not verify_result.get('success'):
+        return 'Xác minh captcha thất bại. Vui lòng thử lại.'
+    return None
+
+
+def _collect_answers(request, questions):
+    """Validate the submitted form; returns (errors, response_data, pending_attachments)."""
+    errors = []
+    for question in questions:
+        field_name = f'question_{question.id}'
+        if question.question_type not in ['text', 'single', 'multiple', 'upload']:
+            continue
+        if question.is_required:
+            if question.question_type == 'multiple':
+                if field_name not in request.POST or not request.POST.getlist(field_name):
+                    errors.append(f'Vui lòng trả lời câu hỏi: {question.text}')
+            elif question.question_type == 'upload':
+                if not request.FILES.get(field_name):
+                    errors.append(f'Vui lòng tải lên tệp cho câu hỏi: {question.text}')
+            else:
+                if field_name not in request.POST or not request.POST.get(field_name):
+                    errors.append(f'Vui lòng trả lời câu hỏi: {question.text}')
+    if errors:
+        return errors, None, None
+
+    response_data = {}
+    pending_attachments = []  # list[(question, uploaded_file)]
+    for question in questions:
+        field_name = f'question_{question.id}'
+
+        if question.question_type == 'text':
+            text_answer = request.POST.get(field_name, '').strip()
+            if text_answer:
+                response_data[str(question.id)] = text_answer
+        elif question.question_type == 'single':
+            selected_index = request.POST.get(field_name)
+            if selected_index and question.options:
+                try:
+                    index = int(selected_index)
+                    if 0 <= index < len(question.options):
+                        response_data[str(question.id)] = question.options[index]
+                except (ValueError, IndexError):
+                    pass
+        elif question.question_type == 'multiple':
+            selected_indices = request.POST.getlist(field_name)
+            if selected_indices and question.options:
+                selected_options = []
+                for idx_str in selected_indices:
+                    try:
+                        index = int(idx_str)
+                        if 0 <= index < len(question.options):
+                            selected_options.append(question.options[index])
+                    except (ValueError, IndexError):
+                        pass
+                if selected_options:
+                    response_data[str(question.id)] = selected_options
+        elif question.question_type == 'upload':
+            uploaded = request.FILES.get(field_name)
+            if uploaded:
+                # store something lightweight in JSON for backward compatibility (exports, admin)
+                response_data[str(question.id)] = uploaded.name
+                pending_attachments.append((question, uploaded))
+    return [], response_data, pending_attachments
+
+
+def _save_response(request, survey, snapshot, response_data, pending_attachments):
+    """Store the submission; returns the Response, or None when it was buffered for a later bulk insert."""
+    respondent = request.user if request.user.is_authenticated else None
+    if survey.buffer_responses and not pending_attachments:
+        buffer_response(survey, snapshot, respondent, get_client_ip(request), response_data)
+        if survey.invite_count and respondent:
+            mark_responded(survey, respondent.email)
+        # No id yet: remembered as answered, without a review link
+        request.respondent.mark_answered(survey.id, 0)
+        return None
+
+    with transaction.atomic():
+        response = Response.objects.create(
+            survey=survey,
+            revision_id=snapshot.revision_id,
+            respondent=respondent,
+            ip_address=get_client_ip(request),
+            response_data=response_data
+        )
+
+        # Save uploaded attachments (one file per upload question)
+        for question, uploaded in pending_attachments:
+            ResponseAttachment.objects.update_or_create(
+                response=response,
+                question_id=question.id,
+                defaults={
+                    "file": uploaded,
+                    "original_name": getattr(uploaded, "name", "") or "",
+                    "content_type": getattr(uploaded, "content_type", "") or "",
+                },
+            )
+        record_response_terms(snapshot.questions, response_data)
+        if survey.invite_count and request.user.is_authenticated:
+            mark_responded(survey, request.user.email)
+    request.respondent.mark_answered(survey.id, response.id)
+    return response
+
+
+def _finish_submission(request, survey, response):
+    """Flash the thank-you message, send the confirmation email if enabled; returns the next URL."""
+    messages.success(request, 'Cảm ơn bạn đã tham gia khảo sát!')
+
+    if survey.allow_review_response and response is not None:
+        return reverse('surveys:survey_review_response', args=[response.id])
+
+    if survey.send_confirmation_email and request.user.is_authenticated and request.user.email:
+        try:
+            from django.template.loader import render_to_string
+
+            email_context = {
+                'survey': survey,
+                'user_email': request.user.email,
+                'completion_time': timezone.now(),
+            }
+
+            html_message = render_to_string('surveys/email/survey_confirmation.html', email_context)
+
+            send_mail(
+                subject=f'Cảm ơn bạn đã tham gia: {survey.title}',
+                message=f'Cảm ơn bạn đã hoàn thành khảo sát "{survey.title}". Câu trả lời của bạn đã được ghi nhận.',
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[request.user.email],
+                html_message=html_message,
+                fail_silently=True,
+            )
+        except Exception:
+            pass
+
+        return reverse('surveys:survey_thankyou', args=[survey.pk])
+    return reverse('surveys:survey_detail', args=[survey.pk])
+
+
+@rate_limit('survey_view', '120/m', methods=('GET',))
+# Per browser, not per IP: a classroom behind one NAT address shares the IP bucket
+@rate_limit('survey_submit_ip', '300/m', keys=('ip+survey',))
+@rate_limit('survey_submit', '20/m', keys=('browser+survey', 'user+survey'))
+@admission_control
+@respondent_state
 def survey_take(request, pk):
     survey = get_object_or_404(Survey, pk=pk)
-    session_key = f'survey_access_{survey.id}'
-    done_session_key = f'survey_done_{survey.id}'
 
     default_back_url = (
         reverse('surveys:survey_list')
@@ -53,30 +225,29 @@ def survey_take(request, pk):
             'back_url': default_back_url,
         })
 
-    if not request.session.session_key:
-        request.session.create()
-    if 'anon_session_id' not in request.session:
-        request.session['anon_session_id'] = uuid4().hex
+    # Static publish: anonymous visitors get the prerendered page, no session needed
+    if request.method == 'GET' and not request.user.is_authenticated and is_static_eligible(survey):
+        static_url = sync_static_page(survey)
+        if static_url:
+            return redirect(static_url)
 
-    whitelist_raw = survey.whitelist_emails or ""
-    whitelist = {email.strip().lower() for email in whitelist_raw.splitlines() if email.strip()}
+    # Invite-only survey: membership is checked against the SurveyInvite index below
+    invite_only = survey.invite_count > 0
 
-    if whitelist and not request.user.is_authenticated:
+    if invite_only and not request.user.is_authenticated:
         messages.error(request, 'Khảo sát này yêu cầu đăng nhập bằng email nằm trong danh sách.')
         next_url = quote(request.get_full_path(), safe="/?=&")
         return redirect(f"{reverse('surveys:login')}?next={next_url}")
 
-    responses_count = survey.responses.count()
-    if survey.max_responses and responses_count >= survey.max_responses:
+    if is_full(survey):
         messages.error(request, 'Khảo sát đã đạt tới giới hạn số phản hồi.')
         return redirect('surveys:survey_detail', pk=pk)
     if survey.password:
-        has_access = request.session.get(session_key)
-        if not has_access:
+        if not request.respondent.is_unlocked(survey.id):
             if request.method == 'POST' and 'survey_password' in request.POST:
                 entered_password = request.POST.get('survey_password', '')
                 if entered_password and check_password(entered_password, survey.password):
-                    request.session[session_key] = True
+                    request.respondent.unlock(survey.id)
                     messages.success(request, 'Đã xác nhận mật khẩu khảo sát.')
                     return redirect('surveys:survey_take', pk=pk)
                 else:
@@ -92,13 +263,13 @@ def survey_take(request, pk):
         messages.error(request, 'Khảo sát này đã hết hạn!')
         return redirect('surveys:survey_detail', pk=pk)
 
-    if whitelist and request.user.is_authenticated:
-        user_email = (request.user.email or '').strip().lower()
+    if invite_only and request.user.is_authenticated:
+        user_email = (request.user.email or '').strip()
         if not user_email:
-            messages.error(request, 'Tài khoản của bạn chưa có email nên không thể tham gia khảo sát whitelist. Vui lòng cập nhật email trong hồ sơ.')
+            messages.error(request, 'Tài khoản của bạn chưa có email nên không thể tham gia khảo sát giới hạn theo danh sách mời. Vui lòng cập nhật email trong hồ sơ.')
             return redirect('surveys:profile')
-        if user_email not in whitelist and request.user != survey.creator:
-            messages.error(request, 'Email của bạn không nằm trong whitelist tham gia khảo sát.')
+        if request.user != survey.creator and not is_invited(survey, user_email):
+            messages.error(request, 'Email của bạn không nằm trong danh sách mời của khảo sát.')
             return redirect('surveys:survey_detail', pk=pk)
 
     if request.user.is_authenticated:
@@ -121,9 +292,8 @@ def survey_take(request, pk):
                         messages.info(request, 'Bạn đã tham gia khảo sát này rồi!')
                         return redirect('surveys:survey_detail', pk=pk)
     else:
-        if request.session.get(done_session_key):
-            response_id_key = f'survey_response_{survey.id}'
-            response_id = request.session.get(response_id_key)
+        if request.respondent.has_answered(survey.id):
+            response_id = request.respondent.response_id(survey.id)
 
             if not survey.one_response_only:
                 pass
@@ -159,181 +329,129 @@ def survey_take(request, pk):
                     messages.info(request, 'Bạn đã tham gia khảo sát này rồi từ thiết bị này!')
                     return redirect('surveys:survey_detail', pk=pk)
 
-    if request.method == 'POST':
-        if not request.user.is_authenticated:
-            cf_response = request.POST.get('cf-turnstile-response')
-
-            if not cf_response:
-                messages.error(request, 'Vui lòng hoàn thành xác minh captcha.')
-                questions = survey.questions.all()
-                return render(request, 'surveys/survey_management/survey_take.html', {
-                    'survey': survey,
-                    'questions': questions,
-                    'need_password': False,
-                    'back_url': back_url,
-                    'TURNSTILE_SITE_KEY': settings.CLOUDFLARE_TURNSTILE_SITE_KEY,
-                })
+    # Buffered survey: answers waiting to be flushed are not in Response yet
+    if survey.buffer_responses and survey.one_response_only and has_pending(survey, request.user, get_client_ip(request)):
+        messages.info(request, 'Bạn đã tham gia khảo sát này rồi!')
+        return redirect('surveys:survey_detail', pk=pk)
 
-            verify_url = 'https://challenges.cloudflare.com/turnstile/v0/siteverify'
-            verify_data = {
-                'secret': settings.CLOUDFLARE_TURNSTILE_SECRET_KEY,
-                'response': cf_response,
-                'remoteip': get_client_ip(request)
-            }
+    # Immutable question snapshot for the current revision (cached)
+    snapshot = get_snapshot(survey)
 
-            try:
-                verify_result = requests.post(verify_url, data=verify_data, timeout=10).json()
-
-                if not verify_result.get('success'):
-                    messages.error(request, 'Xác minh captcha thất bại. Vui lòng thử lại.')
-                    questions = survey.questions.all()
-                    return render(request, 'surveys/survey_management/survey_take.html', {
-                        'survey': survey,
-                        'questions': questions,
-                        'need_password': False,
-                        'back_url': back_url,
-                        'TURNSTILE_SITE_KEY': settings.CLOUDFLARE_TURNSTILE_SITE_KEY,
-                    })
-            except requests.RequestException:
-                messages.error(request, 'Không thể xác minh captcha. Vui lòng thử lại sau.')
-                questions = survey.questions.all()
+    if request.method == 'POST':
+        if not request.user.is_authenticated:
+            captcha_error = _verify_turnstile(request)
+            if captcha_error:
+                messages.error(request, captcha_error)
                 return render(request, 'surveys/survey_management/survey_take.html', {
                     'survey': survey,
-                    'questions': questions,
+                    'questions': snapshot.questions,
+                    'revision': snapshot.number,
+                    'questions_cache_timeout': settings.SURVEY_SNAPSHOT_CACHE_TIMEOUT,
                     'need_password': False,
                     'back_url': back_url,
                     'TURNSTILE_SITE_KEY': settings.CLOUDFLARE_TURNSTILE_SITE_KEY,
                 })
 
-        errors = []
-        for question in survey.questions.all():
-            field_name = f'question_{question.id}'
-            if question.question_type not in ['text', 'single', 'multiple', 'upload']:
-                continue
-            if question.is_required:
-                if question.question_type == 'multiple':
-                    if field_name not in request.POST or not request.POST.getlist(field_name):
-                        errors.append(f'Vui lòng trả lời câu hỏi: {question.text}')
-                elif question.question_type == 'upload':
-                    if not request.FILES.get(field_name):
-                        errors.append(f'Vui lòng tải lên tệp cho câu hỏi: {question.text}')
-                else:
-                    if field_name not in request.POST or not request.POST.get(field_name):
-                        errors.append(f'Vui lòng trả lời câu hỏi: {question.text}')
-
+        errors, response_data, pending_attachments = _collect_answers(request, snapshot.questions)
         if errors:
             for error in errors:
                 messages.error(request, error)
         else:
-            response_data = {}
-            pending_attachments = []  # list[(question, uploaded_file)]
-            for question in survey.questions.all():
-                field_name = f'question_{question.id}'
-
-                if question.question_type == 'text':
-                    text_answer = request.POST.get(field_name, '').strip()
-                    if text_answer:
-                        response_data[str(question.id)] = text_answer
-                elif question.question_type == 'single':
-                    selected_index = request.POST.get(field_name)
-                    if selected_index and question.options:
-                        try:
-                            index = int(selected_index)
-                            if 0 <= index < len(question.options):
-                                response_data[str(question.id)] = question.options[index]
-                        except (ValueError, IndexError):
-                            pass
-                elif question.question_type == 'multiple':
-                    selected_indices = request.POST.getlist(field_name)
-                    if selected_indices and question.options:
-                        selected_options = []
-                        for idx_str in selected_indices:
-                            try:
-                                index = int(idx_str)
-                                if 0 <= index < len(question.options):
-                                    selected_options.append(question.options[index])
-                            except (ValueError, IndexError):
-                                pass
-                        if selected_options:
-                            response_data[str(question.id)] = selected_options
-                elif question.question_type == 'upload':
-                    uploaded = request.FILES.get(field_name)
-                    if uploaded:
-                        # store something lightweight in JSON for backward compatibility (exports, admin)
-                        response_data[str(question.id)] = uploaded.name
-                        pending_attachments.append((question, uploaded))
-
-            response = Response.objects.create(
-                survey=survey,
-                respondent=request.user if request.user.is_authenticated else None,
-                ip_address=get_client_ip(request),
-                response_data=response_data
-            )
-
-            # Save uploaded attachments (one file per upload question)
-            for question, uploaded in pending_attachments:
-                ResponseAttachment.objects.update_or_create(
-                    response=response,
-                    question=question,
-                    defaults={
-                        "file": uploaded,
-                        "original_name": getattr(uploaded, "name", "") or "",
-                        "content_type": getattr(uploaded, "content_type", "") or "",
-                    },
-                )
-            request.session[done_session_key] = True
-            response_id_key = f'survey_response_{survey.id}'
-            request.session[response_id_key] = response.id
-
-            messages.success(request, 'Cảm ơn bạn đã tham gia khảo sát!')
-
-            if survey.allow_review_response:
-                return redirect('surveys:survey_review_response', response_id=response.id)
-            else:
-                if survey.send_confirmation_email and request.user.is_authenticated and request.user.email:
-                    try:
-                        from django.template.loader import render_to_string
-
-                        email_context = {
-                            'survey': survey,
-                            'user_email': request.user.email,
-                            'completion_time': timezone.now(),
-                        }
-
-                        html_message = render_to_string('surveys/email/survey_confirmation.html', email_context)
-
-                        send_mail(
-                            subject=f'Cảm ơn bạn đã tham gia: {survey.title}',
-                            message=f'Cảm ơn bạn đã hoàn thành khảo sát "{survey.title}". Câu trả lời của bạn đã được ghi nhận.',
-                            from_email=settings.DEFAULT_FROM_EMAIL,
-                            recipient_list=[request.user.email],
-                            html_message=html_message,
-                            fail_silently=True,
-                        )
-                    except Exception:
-                        pass
-
-                    return redirect('surveys:survey_thankyou', pk=pk)
-                else:
-                    return redirect('surveys:survey_detail', pk=pk)
-
-    questions = survey.questions.all()
+            response = _save_response(request, survey, snapshot, response_data, pending_attachments)
+            return redirect(_finish_submission(request, survey, response))
 
     return render(request, 'surveys/survey_management/survey_take.html', {
         'survey': survey,
-        'questions': questions,
+        'questions': snapshot.questions,
+        'revision': snapshot.number,
+        'questions_cache_timeout': settings.SURVEY_SNAPSHOT_CACHE_TIMEOUT,
         'need_password': False,
         'back_url': back_url,
         'TURNSTILE_SITE_KEY': settings.CLOUDFLARE_TURNSTILE_SITE_KEY,
     })
 
 
+def _has_responded(request, survey):
+    if survey.buffer_responses and has_pending(survey, request.user, get_client_ip(request)):
+        return True
+    if request.user.is_authenticated:
+        return Response.objects.filter(survey=survey, respondent=request.user).exists()
+    if request.respondent.has_answered(survey.id):
+        return True
+    return Response.objects.filter(
+        survey=survey,
+        respondent__isnull=True,
+        ip_address=get_client_ip(request),
+    ).exists()
+
+
+def _submit_error(message, status, **extra):
+    return JsonResponse({'success': False, 'error': message, **extra}, status=status)
+
+
+# Per browser, not per IP: a classroom behind one NAT address shares the IP bucket
+@rate_limit('survey_submit_ip', '300/m', keys=('ip+survey',))
+@rate_limit('survey_submit', '20/m', keys=('browser+survey', 'user+survey'))
+@require_POST
+@admission_control
+@respondent_state
+def survey_submit(request, pk):
+    """
+    Lean JSON submit endpoint for prerendered (static) take pages.
+    Runs the same gates as survey_take, but only on POST.
+    """
+    survey = get_object_or_404(Survey, pk=pk)
+    if not is_static_eligible(survey):
+        # Closed, full or reconfigured since the page was rendered: take the page down
+        sync_static_page(survey)
+        return _submit_error('Khảo sát này hiện không nhận phản hồi.', 403)
+
+    # The page was rendered for an older revision: refresh it and make the client reload
+    if request.POST.get('revision') != str(survey.revision):
+        sync_static_page(survey)
+        return _submit_error('Khảo sát vừa được cập nhật. Vui lòng tải lại trang và trả lời lại.', 409, reload=True)
+
+    if survey.one_response_only and _has_responded(request, survey):
+        return _submit_error('Bạn đã tham gia khảo sát này rồi!', 409)
+
+    if not request.user.is_authenticated:
+        captcha_error = _verify_turnstile(request)
+        if captcha_error:
+            return _submit_error(captcha_error, 400, captcha=True)
+
+    snapshot = get_snapshot(survey)
+    errors, response_data, pending_attachments = _collect_answers(request, snapshot.questions)
+    if errors:
+        return _submit_error(errors[0], 400, errors=errors)
+
+    response = _save_response(request, survey, snapshot, response_data, pending_attachments)
+    return JsonResponse({'success': True, 'redirect_url': _finish_submission(request, survey, response)})
+
+
+@never_cache
+def survey_csrf_token(request):
+    """CSRF token for static pages, which cannot embed one."""
+    return JsonResponse({'csrfToken': get_token(request)})
+
+
 def survey_take_token(request, token):
     try:
         pk = signing.loads(token, salt="survey-share", max_age=None)
     except signing.BadSignature:
         messages.error(request, 'Link khảo sát không hợp lệ hoặc đã bị thay đổi.')
         return redirect('surveys:home')
+
+    # Personal invitation link: remember that the recipient opened it
+    invite_token = request.GET.get('invite')
+    if invite_token:
+        try:
+            invite_id = parse_invite_token(invite_token)
+        except (signing.BadSignature, ValueError):
+            invite_id = None
+        if invite_id:
+            SurveyInvite.objects.filter(pk=invite_id, survey_id=pk, opened_at__isnull=True).update(
+                opened_at=timezone.now()
+            )
     return redirect('surveys:survey_take', pk=pk)
 
 
@@ -388,7 +506,11 @@ def survey_review_response(request, response_id):
             messages.error(request, 'Bạn không có quyền xem câu trả lời này.')
             return redirect('surveys:home')
 
-    questions = survey.questions.all()
+    # Show the questions as they were when this response was submitted
+    if response.revision_id:
+        questions = revision_questions(response.revision)
+    else:
+        questions = survey.questions.all()
     response_data = response.response_data or {}
 
     attachments = (